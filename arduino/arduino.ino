@@ -1,3 +1,6 @@
+// Control from Raspberry PI with binary protocol (link.h) instead of Firmata (rpi.h)
+// #define RPI_LINK
+
 // Include
 #include "Arduino.h" // basic library
 #include "reset.h" // rescure reset
@@ -5,7 +8,8 @@
 #include "motors.h" // motors driver library
 #include "manipulator.h" // manipulator library
 #include "rpi.h" // rpi library (no code)
-// #include "gyro.h" // gyto library (no code)
+#include "gyro.h" // gyro library (yaw rate for link.h)
+#include "link.h" // rpi binary protocol (instead of Firmata, see RPI_LINK)
 #include "automotive.h" // automatisation library
 
 
@@ -29,7 +33,8 @@ void setup(){
 
     setupMan(); // manipulator
     Serial.println("[+] Manipulator has been configurated!!");
-    // setupGyro(); // gyro & acceleration
+    setupGyro(); // gyro & acceleration
+    Serial.println("[+] Gyro has been configurated!!");
 
 }
 
@@ -71,6 +76,7 @@ void loop(){
     // control robot components
     
     controlMan(); // manipulator
+    updateMan(); // manipulator sequence (non-blocking)
     
 
     // automotive
@@ -1,9 +1,10 @@
 #include "Arduino.h"
-#include "MPU6050.h"
+#include "MPU6050.h" // mpu instance in gyro.h
 #include "GyverPID.h" // pid regulator
 
 // banka automotive
 #define PODEZD_K_BANKE 40  // max 255
+#define CATCH_TIMEOUT 3000  // max approach time (ms)
 
 // autopilot directions
 #define FORWARD 1
@@ -18,24 +19,11 @@ const float ki = 1.0;
 const float kd = 1.0;
 const float DT = 30;
 
-MPU6050 mpu;
 GyverPID regulator(kp, ki, kd, DT);
 
-// Automotive banka
+// Automotive banka (non-blocking: sequence runs in updateMan(), manState == MAN_IDLE when done)
 void autoCatch(){
-  man2Pos(defaultPos);
-  readCap();
-  while (!capState){
-    manualPower(LEFT, PODEZD_K_BANKE);
-    manualPower(RIGHT, PODEZD_K_BANKE);
-    readCap();
-  }
-  manualPower(LEFT, 0);
-  manualPower(RIGHT, 0);
-  manCatch(true);
-  delay(500);
-  man2Pos(workPos);
-  delay(1000);
+  manStartCatch(PODEZD_K_BANKE, CATCH_TIMEOUT);
 }
 
 void time_banka(){
@@ -70,7 +58,11 @@ void checkAutomotive(){
   if (midTumbler > tumblerRange[1]){  // middle thembler down
     delay(50);
     // control Arduino from Raspberry PI
+#ifdef RPI_LINK
+    runLink();
+#else
     runRPI(); 
+#endif
   }
 }
 
@@ -1,3 +1,52 @@
 // https://alexgyver.ru/arduino-mpu6050/
-// TODO: GYRO
+// yaw rate from MPU6050 (I2Cdev library), integrated on board between link reports
+#include <Wire.h>
+#include "MPU6050.h"
 
+#define GYRO_PERIOD 2000UL  // gyro read period (us): 500 Hz, DLPF 98 Hz
+#define GYRO_CALIBRATION 500  // samples for bias at rest
+#define GYRO_SCALE 65.5  // LSB per deg/s (MPU6050_GYRO_FS_500)
+
+MPU6050 mpu;
+
+bool gyroReady = false;
+float gyroBias = 0;  // raw units
+float gyroRate = 0;  // yaw rate (deg/s), counterclockwise positive
+float gyroYaw = 0;  // integrated yaw (deg)
+unsigned long gyroLastRead = 0;  // micros
+
+// setup gyro: +-500 deg/s, bias averaged while the robot stands still
+void setupGyro(){
+    Wire.begin();
+    Wire.setClock(400000);
+    mpu.initialize();
+    gyroReady = mpu.testConnection();
+    if (!gyroReady){
+        Serial.println("[!] MPU6050 not found");
+        return;
+    }
+    mpu.setFullScaleGyroRange(MPU6050_GYRO_FS_500);
+    mpu.setDLPFMode(MPU6050_DLPF_BW_98);
+
+    long sum = 0;
+    for (int i = 0; i < GYRO_CALIBRATION; i++){
+        sum += mpu.getRotationZ();
+        delayMicroseconds(GYRO_PERIOD);
+    }
+    gyroBias = (float)sum / GYRO_CALIBRATION;
+    gyroYaw = 0;
+    gyroLastRead = micros();
+}
+
+// read yaw rate and integrate yaw (call as often as possible, reads every GYRO_PERIOD)
+// return true if new sample
+bool updateGyro(){
+    if (!gyroReady) return false;
+    unsigned long now = micros();
+    unsigned long dt = now - gyroLastRead;
+    if (dt < GYRO_PERIOD) return false;
+    gyroLastRead = now;
+    gyroRate = (mpu.getRotationZ() - gyroBias) / GYRO_SCALE;
+    gyroYaw += gyroRate * dt * 1e-6;
+    return true;
+}
@@ -0,0 +1,235 @@
+/*
+  Compact binary protocol with Raspberry Pi (raspberry/robot/protocol.py)
+  packet: 0xA5 0x5A | type (1) | seq (2, LE) | payload | CRC-8 poly 0x07 over type..payload
+*/
+
+#define LINK_SYNC0 0xA5
+#define LINK_SYNC1 0x5A
+
+// packet types (high bit = board -> rpi)
+#define LINK_DRIVE 0x01      // int16 left, int16 right (-255..255)
+#define LINK_MAN_POSE 0x02   // uint8 low, uint8 middle (servo degrees)
+#define LINK_MAN_GRIP 0x03   // uint8 compress (0|1)
+#define LINK_MAN_CATCH 0x04  // uint8 approach power (0..255), uint16 approach timeout (ms)
+#define LINK_MAN_STOP 0x05   // uint8 release claw (0|1)
+#define LINK_TELEMETRY 0x81  // uint32 millis, uint8 flags, int16 left, int16 right
+#define LINK_MAN_STATE 0x82  // uint32 millis, uint8 state, uint8 flags, uint16 command seq (manipulator.h)
+#define LINK_IMU 0x83  // uint32 micros, int16 yaw rate (0.01 deg/s), int32 yaw (0.01 deg) (gyro.h)
+
+#define LINK_FLAG_WATCHDOG 0x01  // motors stopped: no commands from rpi
+#define LINK_FLAG_MANIPULATOR 0x02  // motors driven by auto catch: LINK_DRIVE ignored
+
+#define LINK_TIMEOUT 250  // stop motors if no commands (ms)
+#define LINK_MAX_PACKET 32
+#define LINK_BUTTON_PERIOD 200  // reboot button check period (ms)
+#define LINK_IMU_PERIOD 10000UL  // imu report period (us): 100 Hz
+
+uint8_t linkBuffer[LINK_MAX_PACKET];
+uint8_t linkLength = 0;  // bytes in linkBuffer
+uint8_t linkExpected = 0;  // full packet length (0 - unknown yet)
+unsigned long linkLastCommand = 0;
+uint8_t linkFlags = 0;
+int16_t linkLeft = 0, linkRight = 0;  // applied powers
+
+// crc-8 (poly 0x07)
+uint8_t linkCrc8(const uint8_t *data, uint8_t len){
+    uint8_t crc = 0;
+    for (uint8_t i = 0; i < len; i++){
+        crc ^= data[i];
+        for (uint8_t bit = 0; bit < 8; bit++){
+            crc = (crc & 0x80) ? (crc << 1) ^ 0x07 : crc << 1;
+        }
+    }
+    return crc;
+}
+
+// payload length by packet type (0 - unknown type)
+uint8_t linkPayloadSize(uint8_t type){
+    switch (type){
+        case LINK_DRIVE: return 4;
+        case LINK_MAN_POSE: return 2;
+        case LINK_MAN_GRIP: return 1;
+        case LINK_MAN_CATCH: return 3;
+        case LINK_MAN_STOP: return 1;
+        default: return 0;
+    }
+}
+
+// send packet to rpi
+void linkSend(uint8_t type, uint16_t seq, const uint8_t *payload, uint8_t len){
+    uint8_t packet[LINK_MAX_PACKET];
+    packet[0] = LINK_SYNC0;
+    packet[1] = LINK_SYNC1;
+    packet[2] = type;
+    packet[3] = seq & 0xFF;
+    packet[4] = seq >> 8;
+    memcpy(packet + 5, payload, len);
+    packet[5 + len] = linkCrc8(packet + 2, 3 + len);
+    Serial.write(packet, 6 + len);
+}
+
+// set motor power the same way as pyfirmata Motor.set_power (inA, inB, pwm)
+void linkMotor(const uint8_t pinA, const uint8_t pinB, const uint8_t pinPwm, const int16_t value){
+    if (value == 0){
+        digitalWrite(pinA, LOW);
+        digitalWrite(pinB, LOW);
+        analogWrite(pinPwm, 0);
+        return;
+    }
+    digitalWrite(pinA, value > 0 ? HIGH : LOW);
+    digitalWrite(pinB, value > 0 ? LOW : HIGH);
+    analogWrite(pinPwm, min(abs(value), 255));
+}
+
+void linkDrive(const int16_t left, const int16_t right){
+    linkLeft = left;
+    linkRight = right;
+    linkMotor(LEFT_A, LEFT_B, LEFT_PWM, left);
+    linkMotor(RIGHT_A, RIGHT_B, RIGHT_PWM, right);
+}
+
+// answer every command with telemetry (rpi measures round trip time by seq)
+void linkTelemetry(uint16_t seq){
+    uint8_t payload[9];
+    unsigned long now = millis();
+    memcpy(payload, &now, 4);
+    payload[4] = linkFlags;
+    memcpy(payload + 5, &linkLeft, 2);
+    memcpy(payload + 7, &linkRight, 2);
+    linkSend(LINK_TELEMETRY, seq, payload, 9);
+}
+
+// report manipulator state (on every change and on every command)
+void linkManState(){
+    uint8_t payload[8];
+    unsigned long now = millis();
+    memcpy(payload, &now, 4);
+    payload[4] = manState;
+    payload[5] = manFlags;
+    memcpy(payload + 6, &manSeq, 2);
+    linkSend(LINK_MAN_STATE, manSeq, payload, 8);
+    manChanged = false;
+}
+
+// report yaw rate and integrated yaw (seq counts reports, rpi detects lost packets)
+void linkImu(){
+    static uint16_t imuSeq = 0;
+    uint8_t payload[10];
+    unsigned long now = micros();
+    int16_t rate = constrain(gyroRate * 100, -32767, 32767);
+    int32_t yaw = gyroYaw * 100;
+    memcpy(payload, &now, 4);
+    memcpy(payload + 4, &rate, 2);
+    memcpy(payload + 6, &yaw, 4);
+    linkSend(LINK_IMU, imuSeq++, payload, 10);
+}
+
+// handle complete packet
+void linkHandle(const uint8_t *packet){
+    uint8_t type = packet[2];
+    uint16_t seq = packet[3] | (packet[4] << 8);
+    const uint8_t *payload = packet + 5;
+
+    if (type == LINK_DRIVE){
+        int16_t left, right;
+        memcpy(&left, payload, 2);
+        memcpy(&right, payload + 2, 2);
+        // auto catch drives motors itself until the can is caught
+        if (manState == MAN_APPROACH) linkFlags |= LINK_FLAG_MANIPULATOR;
+        else {
+            linkFlags &= ~LINK_FLAG_MANIPULATOR;
+            linkDrive(left, right);
+        }
+        linkLastCommand = millis();
+        linkFlags &= ~LINK_FLAG_WATCHDOG;
+        linkTelemetry(seq);
+        return;
+    }
+
+    // manipulator: a new command replaces the running one
+    if (manState != MAN_IDLE) manStop(false);
+    manFlags &= MAN_FLAG_GRIP;
+    manSeq = seq;
+    if (type == LINK_MAN_POSE){
+        const int pos[2] = {payload[0], payload[1]};
+        manStartPose(pos);
+    }
+    else if (type == LINK_MAN_GRIP) manStartGrip(payload[0]);
+    else if (type == LINK_MAN_CATCH){
+        uint16_t timeout;
+        memcpy(&timeout, payload + 1, 2);
+        manStartCatch(payload[0], timeout);
+    }
+    else if (type == LINK_MAN_STOP) manStop(payload[0]);
+    linkManState(); // accepted
+}
+
+// feed one received byte into parser
+void linkRead(uint8_t byte){
+    if (linkLength == 0 && byte != LINK_SYNC0) return;
+    if (linkLength == 1 && byte != LINK_SYNC1){
+        linkLength = (byte == LINK_SYNC0) ? 1 : 0;
+        return;
+    }
+    linkBuffer[linkLength++] = byte;
+
+    if (linkLength == 3){
+        uint8_t size = linkPayloadSize(byte);
+        if (size == 0){ // unknown type: resync
+            linkLength = 0;
+            return;
+        }
+        linkExpected = 6 + size;
+    }
+
+    if (linkLength > 3 && linkLength == linkExpected){
+        if (linkCrc8(linkBuffer + 2, linkExpected - 3) == linkBuffer[linkExpected - 1]){
+            linkHandle(linkBuffer);
+        }
+        linkLength = 0;
+    }
+}
+
+// control Arduino from Raspberry PI with binary protocol (instead of Firmata)
+void runLink(){
+    linkDrive(0, 0);
+    linkLastCommand = millis();
+    unsigned long buttonCheck = millis();
+    unsigned long imuReport = micros();
+    while (true){
+        // READ JOYSTICK BUTTON (pulseIn blocks, so not on every iteration)
+        if (millis() - buttonCheck > LINK_BUTTON_PERIOD){
+            buttonCheck = millis();
+            // REBOOT ARDUINO
+            if (pulseIn(LEFT_BUTTON, 1, 25000) > buttonRange){
+                linkDrive(0, 0);
+                resetArduino(); // hardware reset
+                resetFunc(); // software reset
+                return;
+            }
+        }
+
+        while (Serial.available()){
+            linkRead(Serial.read());
+        }
+
+        // imu stream (integrated at gyro rate, reported at LINK_IMU_PERIOD)
+        updateGyro();
+        if (gyroReady && micros() - imuReport >= LINK_IMU_PERIOD){
+            imuReport += LINK_IMU_PERIOD;
+            if (micros() - imuReport >= LINK_IMU_PERIOD) imuReport = micros(); // late (pulseIn): skip missed reports
+            linkImu();
+        }
+
+        // manipulator sequence runs while driving
+        updateMan();
+        if (manChanged) linkManState();
+
+        // watchdog: rpi stopped sending commands
+        if (!(linkFlags & LINK_FLAG_WATCHDOG) && millis() - linkLastCommand > LINK_TIMEOUT){
+            if (manState == MAN_APPROACH) manStop(false);
+            linkDrive(0, 0);
+            linkFlags |= LINK_FLAG_WATCHDOG;
+        }
+    }
+}
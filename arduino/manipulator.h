@@ -21,6 +21,45 @@ bool manMode = false;
 bool catchFlag = false;
 bool capState = false;
 
+// non-blocking manipulator: commands start a sequence, updateMan() advances it by millis()
+#define MAN_ZERO_DELAY 300  // servo travel to zero (ms)
+#define MAN_MOVE_DELAY 300  // servo travel to target (ms)
+#define MAN_LIFT_DELAY 1000  // lift with a can after auto catch (ms)
+#define MAN_GRIP_DELAY 500  // claw compress|decompress (ms)
+#define MAN_CAP_PERIOD 20  // cap sensor check period while approaching (ms)
+#define MAN_CAP_TIMEOUT 3000  // cap sensor pulseIn timeout while approaching (us)
+
+// states
+#define MAN_IDLE 0
+#define MAN_ZERO_MID 1  // middle servo to zero
+#define MAN_ZERO_LOW 2  // low servo to zero
+#define MAN_MOVE 3  // servos to target position
+#define MAN_GRIP 4  // claw compress|decompress
+#define MAN_APPROACH 5  // drive forward until cap sensor (auto catch)
+
+// result flags
+#define MAN_FLAG_CAP 0x01  // can touched the cap sensor
+#define MAN_FLAG_GRIP 0x02  // claw compressed
+#define MAN_FLAG_TIMEOUT 0x04  // no can within approach timeout
+#define MAN_FLAG_ABORTED 0x08  // sequence stopped
+
+uint8_t manState = MAN_IDLE;
+uint8_t manFlags = 0;
+bool manChanged = false;  // state changed since last report (link.h)
+uint16_t manSeq = 0;  // command being executed (link.h packet seq)
+unsigned long manSince = 0;  // state start (ms)
+unsigned long manWait = 0;  // state duration (ms)
+short int manTarget[2] = {0, 0};  // target position
+short int manPose[2] = {-1, -1};  // reached position (-1 - unknown)
+unsigned long manSettle = MAN_MOVE_DELAY;  // travel to target (ms)
+
+// auto catch sequence: to default position, approach, compress, lift to work position
+bool manCatching = false;
+uint8_t manCatchStage = 0;
+short int manApproachPower = 0;
+unsigned long manApproachTimeout = 0;
+unsigned long manCapCheck = 0;
+
 short int lowServoPos = 1, midServoPos = 1, highServoPos = 1;
 
 const int camPose[2] = {50, 10};
@@ -32,6 +71,14 @@ Servo midServo;
 Servo highServo;
 Servo camSwitch;
 
+// set state and its duration
+void manSetState(uint8_t state, unsigned long wait){
+    manState = state;
+    manSince = millis();
+    manWait = wait;
+    manChanged = true;
+}
+
 // go to zero position
 void man2zero(){
     midServo.write(0); // strighten middle servo
@@ -56,9 +103,57 @@ void man2Pos(const short int pos[3]){
 void manCatch(bool flag){
     if (flag) highServo.write(catchBanka);
     else highServo.write(highServoRange[0]);
+    if (flag) manFlags |= MAN_FLAG_GRIP;
+    else manFlags &= ~MAN_FLAG_GRIP;
     // delay(500);
 }
 
+// start moving to position (non-blocking man2Pos: motors are not stopped)
+void manStartPose(const int pos[2], unsigned long settle = MAN_MOVE_DELAY){
+    manTarget[0] = pos[0];
+    manTarget[1] = pos[1];
+    manSettle = settle;
+    manPose[0] = manPose[1] = -1;
+    midServo.write(0); // strighten middle servo
+    manSetState(MAN_ZERO_MID, MAN_ZERO_DELAY);
+}
+
+// start compress|decompress
+void manStartGrip(bool flag){
+    manCatch(flag);
+    manSetState(MAN_GRIP, MAN_GRIP_DELAY);
+}
+
+// start auto catch: default position, drive with power until cap sensor (or timeout), compress, work position
+void manStartCatch(const short int power, unsigned long timeout){
+    manCatching = true;
+    manCatchStage = 0;
+    manApproachPower = power;
+    manApproachTimeout = timeout;
+    manFlags &= MAN_FLAG_GRIP;
+    manStartPose(defaultPos);
+}
+
+// stop current sequence (and approach motors)
+void manStop(bool release){
+    if (manState == MAN_APPROACH){
+        manualPower(LEFT, 0);
+        manualPower(RIGHT, 0);
+    }
+    manCatching = false;
+    if (release) manCatch(false);
+    manFlags |= MAN_FLAG_ABORTED;
+    manSetState(MAN_IDLE, 0);
+}
+
+// start moving to position if not there yet (joystick mode)
+void manRequestPose(const int pos[2]){
+    if (manState != MAN_IDLE || (manPose[0] == pos[0] && manPose[1] == pos[1])) return;
+    manualPower(LEFT, 0); // остановка левой стороны
+    manualPower(RIGHT, 0); // остновка правой стороны
+    manStartPose(pos);
+}
+
 // setup manipulator
 void setupMan(){
     camSwitch.attach(CAM_SWITHER);
@@ -135,13 +230,11 @@ void manualMan(){
 void controlMan(){
     // low tumbler
     if (lowTumbler > tumblerRange[1]){ // low tumbler down
-        delay(50);
-        man2Pos(defaultPos);
+        manRequestPose(defaultPos);
         return;
     }
     if (lowTumbler < tumblerRange[0]){ // low tumbler up
-        delay(50);
-        man2Pos(workPos);
+        manRequestPose(workPos);
         return;
     }
 
@@ -178,8 +271,77 @@ void controlMan(){
 }
 
 // read manipulator cap button
-void readCap(){
-    capState = pulseIn(CAP, 1);
+void readCap(unsigned long timeout = 1000000UL){
+    capState = pulseIn(CAP, 1, timeout);
+}
+
+// current step finished: next step of auto catch or idle
+void manDone(){
+    if (manCatching){
+        manCatchStage++;
+        if (manCatchStage == 1){ // default position reached: approach the can
+            capState = false;
+            manCapCheck = 0;
+            manualPower(LEFT, manApproachPower);
+            manualPower(RIGHT, manApproachPower);
+            manSetState(MAN_APPROACH, manApproachTimeout);
+            return;
+        }
+        if (manCatchStage == 2){ // compressed: lift
+            manStartPose(workPos, MAN_LIFT_DELAY);
+            return;
+        }
+        manCatching = false;
+    }
+    manSetState(MAN_IDLE, 0);
+}
+
+// advance manipulator sequence (call on every loop iteration)
+void updateMan(){
+    if (manState == MAN_IDLE) return;
+    unsigned long now = millis();
+
+    if (manState == MAN_APPROACH){
+        if (now - manCapCheck >= MAN_CAP_PERIOD){
+            manCapCheck = now;
+            readCap(MAN_CAP_TIMEOUT);
+        }
+        if (capState || now - manSince >= manWait){
+            manualPower(LEFT, 0);
+            manualPower(RIGHT, 0);
+            if (capState){
+                manFlags |= MAN_FLAG_CAP;
+                manStartGrip(true);
+            }
+            else { // no can: lift empty claw
+                manFlags |= MAN_FLAG_TIMEOUT;
+                manCatchStage = 2;
+                manStartPose(workPos);
+            }
+        }
+        return;
+    }
+
+    if (now - manSince < manWait) return;
+    switch (manState){
+        case MAN_ZERO_MID:
+            lowServo.write(0); // strighten low servo
+            manSetState(MAN_ZERO_LOW, MAN_ZERO_DELAY);
+            break;
+        case MAN_ZERO_LOW:
+            lowServo.write(manTarget[0]); // low servo to target position
+            midServo.write(manTarget[1]); // middle servo to target position
+            manSetState(MAN_MOVE, manSettle);
+            break;
+        case MAN_MOVE:
+            manPose[0] = manTarget[0];
+            manPose[1] = manTarget[1];
+            manDone();
+            break;
+        case MAN_GRIP:
+            manDone();
+            break;
+    }
 }
 
 // test man positions only ( declarate after setupMan() )
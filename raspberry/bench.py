@@ -0,0 +1,247 @@
+import argparse
+import gc
+import time
+import tracemalloc
+from typing import Dict, List
+
+import cv2
+import numpy as np
+
+from replay import open_source
+from robot.capture import PROFILES, CaptureProfile
+from robot.software import Camera
+
+
+def load_frames(source: str, limit: int) -> List[cv2.Mat]:
+    """
+    Загружает кадры записи в память, чтобы декодирование не влияло на замеры.
+
+    :param source: Видеофайл или папка с изображениями.
+    :param limit: Максимальное число кадров.
+    """
+    cap = open_source(source)
+    frames = []
+    while len(frames) < limit:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+class _FrameSource:
+    """
+    Источник с размером кадра для инициализации Camera без камеры.
+    """
+
+    def __init__(self, frame: cv2.Mat):
+        self.shape = frame.shape
+
+    def read(self):
+        return False, None
+
+    def get(self, prop: int) -> float:
+        return {cv2.CAP_PROP_FRAME_WIDTH: self.shape[1], cv2.CAP_PROP_FRAME_HEIGHT: self.shape[0]}.get(prop, 0.0)
+
+    def release(self) -> None:
+        pass
+
+
+def bench_alloc(frames: List[cv2.Mat], repeat: int, **options) -> Dict[str, float]:
+    """
+    Замеряет время и выделение памяти на кадр для Camera.process_frame.
+
+    :param frames: Кадры.
+    :param repeat: Сколько раз прогнать кадры.
+    :param options: Параметры Camera (preallocate, threshold, bands).
+    :return: Сводка: время кадра (среднее, p99, разброс) и выделено байт на кадр.
+    """
+    camera = Camera(_FrameSource(frames[0]), save_video=False, headless=True, **options)
+    for frame in frames[:10]:  # Прогрев
+        camera.process_frame(frame)
+
+    times = []
+    gc_before = sum(stat["collections"] for stat in gc.get_stats())
+    for _ in range(repeat):
+        for frame in frames:
+            started = time.perf_counter()
+            camera.process_frame(frame)
+            times.append(time.perf_counter() - started)
+    collections = sum(stat["collections"] for stat in gc.get_stats()) - gc_before
+
+    # Пиковое выделение памяти внутри process_frame (временные массивы)
+    allocated = []
+    tracemalloc.start()
+    for frame in frames:
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        camera.process_frame(frame)
+        _, peak = tracemalloc.get_traced_memory()
+        allocated.append(peak - current)
+    tracemalloc.stop()
+    camera.stop()
+
+    times = np.array(times) * 1000
+    return {
+        "mean_ms": float(times.mean()),
+        "p99_ms": float(np.percentile(times, 99)),
+        "std_ms": float(times.std()),
+        "allocated_bytes": float(np.mean(allocated)),
+        "gc_collections": collections,
+    }
+
+
+def alloc(args):
+    frames = load_frames(args.source, args.limit)
+    print(f"[+] Кадров: {len(frames)}, повторов: {args.repeat}")
+    for preallocate in (False, True):
+        result = bench_alloc(frames, args.repeat, preallocate=preallocate, threshold=args.threshold, bands=args.bands)
+        print(f"    preallocate={preallocate!s:<5}  mean {result['mean_ms']:.3f} ms  p99 {result['p99_ms']:.3f} ms  "
+              f"std {result['std_ms']:.3f} ms  выделено {result['allocated_bytes']:.0f} Б/кадр  "
+              f"сборок мусора {result['gc_collections']}")
+
+
+def bench_profile(camera_index: int, profile: CaptureProfile, frames: int, **options) -> Dict[str, float]:
+    """
+    Замеряет FPS от захвата до результата детектора на живой камере с заданным профилем захвата.
+
+    :param camera_index: Индекс камеры.
+    :param profile: Профиль захвата.
+    :param frames: Число кадров замера.
+    :param options: Параметры Camera (threshold, bands, preallocate).
+    :return: Сводка: фактические разрешение и FPS, доля кадров с найденной линией, время обработки кадра.
+    """
+    camera = Camera(camera_index, save_video=False, headless=True, profile=profile, **options)
+    for _ in range(10):  # Прогрев: камера подстраивает экспозицию после смены формата
+        camera.read()
+
+    detected = 0
+    count = 0
+    process = []
+    started = time.perf_counter()
+    while count < frames:
+        ret, frame = camera.read()
+        if not ret:
+            break
+        t0 = time.perf_counter()
+        _, _, center = camera.process_frame(frame)
+        process.append(time.perf_counter() - t0)
+        detected += center is not None
+        count += 1
+    elapsed = time.perf_counter() - started
+    shape = frame.shape if count else (0, 0)
+    camera.stop()
+
+    return {
+        "width": shape[1],
+        "height": shape[0],
+        "fps": count / elapsed if elapsed else 0.0,
+        "detection_rate": detected / count if count else 0.0,
+        "process_ms": float(np.mean(process) * 1000) if process else 0.0,
+    }
+
+
+def profiles(args):
+    names = args.names or list(PROFILES)
+    options = dict(preallocate=args.preallocate, threshold=args.threshold, bands=args.bands)
+    results = []
+    for name in names:
+        profile = CaptureProfile.load(name) if name.endswith(".json") else PROFILES[name]
+        result = bench_profile(args.camera, profile, args.frames, **options)
+        results.append((name, result))
+        print(f"    {name:<16} {result['width']}x{result['height']}  {result['fps']:6.1f} FPS  "
+              f"линия {result['detection_rate'] * 100:5.1f}%  обработка {result['process_ms']:.3f} ms")
+
+    # Самый быстрый профиль из тех, что надёжно находят линию
+    reliable = [item for item in results if item[1]["detection_rate"] >= args.min_detection]
+    if reliable:
+        name, result = max(reliable, key=lambda item: item[1]["fps"])
+        print(f"[+] Лучший профиль: {name} ({result['fps']:.1f} FPS)")
+    else:
+        print(f"[!] Ни один профиль не находит линию в {args.min_detection * 100:.0f}% кадров")
+
+
+def bench_temporal(frames: List[cv2.Mat], **options) -> Dict[str, float]:
+    """
+    Сравнивает обработку кадров по всей полосе и в режиме temporal (окно и пропуск кадров) на одной записи.
+
+    :param frames: Кадры подряд.
+    :param options: Параметры Camera (threshold, preallocate).
+    :return: Время кадра в обоих режимах, расхождение центров, счётчики Camera.temporal_stats.
+    """
+    results = {}
+    for temporal in (False, True):
+        camera = Camera(_FrameSource(frames[0]), save_video=False, headless=True, temporal=temporal, **options)
+        times = []
+        centers = []
+        for frame in frames:
+            started = time.perf_counter()
+            _, _, center = camera.process_frame(frame)
+            times.append(time.perf_counter() - started)
+            centers.append(center)
+        results[temporal] = (np.mean(times) * 1000, centers, camera.temporal_stats())
+        camera.stop()
+
+    (full_ms, full, _), (temporal_ms, tracked, stats) = results[False], results[True]
+    both = [(a[0], b[0]) for a, b in zip(full, tracked) if a and b]
+    offsets = np.array([abs(a - b) for a, b in both]) if both else np.zeros(1)
+    return {
+        "full_ms": float(full_ms),
+        "temporal_ms": float(temporal_ms),
+        "mismatch": sum((a is None) != (b is None) for a, b in zip(full, tracked)) / len(frames),
+        "offset_mean_px": float(offsets.mean()),
+        "offset_max_px": float(offsets.max()),
+        **stats,
+    }
+
+
+def temporal(args):
+    frames = load_frames(args.source, args.limit)
+    print(f"[+] Кадров: {len(frames)}")
+    result = bench_temporal(frames, threshold=args.threshold, preallocate=args.preallocate)
+    print(f"    вся полоса {result['full_ms']:.3f} ms  temporal {result['temporal_ms']:.3f} ms  "
+          f"пропущено {result['skip_rate'] * 100:.1f}%  в окне {result.get('window_rate', 0) * 100:.1f}%  "
+          f"возвратов {result.get('fallback_rate', 0) * 100:.1f}%  столбцов {result.get('pixel_ratio', 1) * 100:.1f}%")
+    print(f"    расхождение с обработкой всей полосы: линия найдена/не найдена {result['mismatch'] * 100:.1f}% кадров, "
+          f"центр {result['offset_mean_px']:.1f} px в среднем, {result['offset_max_px']:.1f} px max")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарки обработки кадра")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    parser_alloc = commands.add_parser("alloc", help="время и выделение памяти с заранее выделенными буферами и без")
+    parser_alloc.add_argument("source", help="видеофайл или папка с изображениями")
+    parser_alloc.add_argument("--limit", type=int, default=200, help="число кадров")
+    parser_alloc.add_argument("--repeat", type=int, default=5, help="число прогонов")
+    parser_alloc.add_argument("--threshold", choices=["adaptive", "global", "fixed"], default="adaptive")
+    parser_alloc.add_argument("--bands", type=int, default=1)
+    parser_alloc.set_defaults(run=alloc)
+
+    parser_profiles = commands.add_parser("profiles", help="FPS от захвата до детектора для профилей камеры")
+    parser_profiles.add_argument("names", nargs="*",
+                                 help=f"профили ({', '.join(PROFILES)}) или JSON-файлы; по умолчанию все")
+    parser_profiles.add_argument("--camera", type=int, default=0, help="индекс камеры")
+    parser_profiles.add_argument("--frames", type=int, default=300, help="число кадров на профиль")
+    parser_profiles.add_argument("--min-detection", type=float, default=0.95,
+                                 help="минимальная доля кадров с найденной линией")
+    parser_profiles.add_argument("--threshold", choices=["adaptive", "global", "fixed"], default="adaptive")
+    parser_profiles.add_argument("--bands", type=int, default=1)
+    parser_profiles.add_argument("--preallocate", action="store_true")
+    parser_profiles.set_defaults(run=profiles)
+
+    parser_temporal = commands.add_parser("temporal", help="окно вокруг предыдущего центра и пропуск кадров "
+                                                           "против обработки всей полосы")
+    parser_temporal.add_argument("source", help="видеофайл или папка с изображениями (кадры подряд)")
+    parser_temporal.add_argument("--limit", type=int, default=500, help="число кадров")
+    parser_temporal.add_argument("--threshold", choices=["adaptive", "global", "fixed"], default="adaptive")
+    parser_temporal.add_argument("--preallocate", action="store_true")
+    parser_temporal.set_defaults(run=temporal)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
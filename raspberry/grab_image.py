@@ -1,6 +1,8 @@
 import cv2
 from typing import List, Optional
 
+from robot.threshold import autoconf_dt
+
 
 # Список значений порога для бинаризации
 dts = [10, 20, 30, 40, 50]
@@ -23,49 +25,6 @@ def apply_dt(dt: int, img: cv2.Mat) -> cv2.Mat:
     return thrsh1
 
 
-def autoconf_dt(img: cv2.Mat) -> int:
-    """
-    Автоматически определяет подходящее значение порога для бинаризации.
-
-    :param img: Входное изображение в формате BGR.
-    :return: Оптимальное значение порога.
-    """
-    dt = []  # Список подходящих значений порога
-    height, width, _ = img.shape  # Размеры изображения
-
-    # Координаты и размеры области анализа
-    work_pos = 400
-    work_width = 245
-    work_height = 20
-
-    # Размер размытия
-    blur = 13
-
-    # Обрезка области анализа
-    crop = img[work_pos:work_pos + work_height,
-               (width - work_width) // 2: (width + work_width) // 2]
-
-    # Преобразование обрезанной области в оттенки серого и размытие
-    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
-    gray = cv2.GaussianBlur(gray, (blur, blur), 0)
-
-    # Поиск подходящего значения порога
-    for i in range(0, 256):
-        _, thrsh1 = cv2.threshold(gray, i, 255, cv2.THRESH_BINARY_INV)
-        m = cv2.moments(thrsh1)["m00"]  # Площадь белых пикселей
-
-        # Проверка, соответствует ли площадь заданному диапазону
-        if 255 * work_height * 30 < m < 255 * work_height * 60:
-            dt.append(i)
-
-    # Возвращение медианного значения, если список не пуст
-    if dt:
-        return dt[len(dt) // 2]
-
-    # Возвращение значения по умолчанию, если список пуст
-    return 115
-
-
 def main() -> None:
     """
     Основная функция для работы с камерой и бинаризацией изображений.
@@ -1,34 +1,94 @@
+import json
 import sys
-from robot import Robot, Callback
+from robot import Robot, Callback, ControllerConfig
+from robot.capture import PROFILES, CaptureProfile
+from robot.runtime import Runtime
+from robot.shared import VisionPipeline
 
 def main():
     """
     Основная функция для запуска робота с параметрами, переданными через аргументы командной строки.
     """
+    robot = None
     try:
+        # Флаги: --quiet — без отладочного вывода на каждом кадре, --telemetry — замеры времени этапов,
+        # --profile=<имя|файл.json> — профиль захвата камеры (см. robot/capture.py и bench.py profiles),
+        # --vision — захват в отдельном процессе и распознавание QR-кодов параллельно со следованием по линии,
+        # --signs=<model.npz> — также распознавание знаков (модель ml/classifier.py),
+        # --route=left,straight,right — команды на перекрёстках по порядку,
+        # --track — прежний блокирующий цикл Camera.track вместо Runtime (asyncio),
+        # --camera=<camera.json> — параметры обработки кадра (и max_power/k, если подобраны), подобранные sweep.py,
+        # --temporal — окно вокруг центра линии на предыдущем кадре и пропуск неизменившихся кадров
+        flags = {arg for arg in sys.argv[1:] if arg.startswith("--")}
+        profile = next((flag.split("=", 1)[1] for flag in flags if flag.startswith("--profile=")), None)
+        signs = next((flag.split("=", 1)[1] for flag in flags if flag.startswith("--signs=")), None)
+        route = next((flag.split("=", 1)[1].split(",") for flag in flags if flag.startswith("--route=")), [])
+        camera_config = next((flag.split("=", 1)[1] for flag in flags if flag.startswith("--camera=")), None)
+        argv = [arg for arg in sys.argv if not arg.startswith("--")]
+
         # Убедимся, что переданы нужные аргументы
-        if len(sys.argv) < 4:
-            print("[!] Usage: python script.py <max_power> <k>")
+        if len(argv) < 4 and not (len(argv) == 2 and argv[1].endswith(".json")):
+            print("[!] Usage: python script.py <port> <max_power> <k> | python script.py <config.json> "
+                  "[--quiet] [--telemetry] [--profile=<name|profile.json>] [--vision] [--signs=<model.npz>] [--route=left,straight,right] [--track] [--camera=<camera.json>] [--temporal]")
             return
 
         # Создаем объект робота
         print("[+] Initializing robot...")
-        robot = Robot('/dev/ttyUSB0')  # Измените на '/dev/tty.usbmodem14201' для MacBook
+        # Порт платы — первый аргумент; с файлом параметров — порт по умолчанию ('/dev/tty.usbmodem14201' для MacBook)
+        port = argv[1] if len(argv) >= 4 else '/dev/ttyUSB0'
+        robot = Robot(port, verbose="--quiet" not in flags)
+        if "--telemetry" in flags:
+            # Сводки p50/p95/p99 в консоль и на UDP-порт 9870
+            robot.setup_telemetry(export=("127.0.0.1", 9870))
+
+        # Параметры регулятора (максимальная мощность, коэффициент K, ПИД)
+        config = ControllerConfig.from_argv(argv)
+        if camera_config:
+            with open(camera_config) as f:
+                gains = json.load(f).get("chassis")
+            if gains:
+                config.max_power, config.k = gains["max_power"], gains["k"]
 
         # Настройка моторов (порты, максимальная мощность, коэффициент K)
-        max_power = float(sys.argv[2])
-        k = float(sys.argv[3])
-        robot.setup_motors((3, 7, 5), (2, 4, 6), max_power=max_power, k=k)
-        print(f"[+] Motors configured: max_power={max_power}, k={k}")
+        robot.setup_motors((3, 7, 5), (2, 4, 6), max_power=config.max_power, k=config.k)
+        print(f"[+] Motors configured: max_power={config.max_power}, k={config.k}")
+
+        # Регулятор с фиксированной частотой тактов
+        robot.setup_controller(config)
+
+        # Прогноз линии при коротких пропаданиях, затем поиск и остановка
+        robot.setup_tracker()
 
         # Настройка камеры
-        robot.setup_camera(0)
+        if profile:
+            profile = CaptureProfile.load(profile) if profile.endswith(".json") else PROFILES[profile]
+        if "--vision" in flags or signs:
+            # Распознавание подключается только в этом режиме: pyzbar требует системную библиотеку zbar
+            from read_qr import QrScanner
+
+            pipeline = VisionPipeline(0, profile)
+            pipeline.add_worker("qr", QrScanner(every=1), rate=10)
+            if signs:
+                from ml.classifier import SignClassifier
+
+                pipeline.add_worker("sign", SignClassifier.load(signs), rate=15)
+            robot.setup_vision(pipeline, junctions=bool(route), config=camera_config, temporal="--temporal" in flags)
+        else:
+            robot.setup_camera(0, threaded=True, profile=profile, junctions=bool(route), config=camera_config,
+                               temporal="--temporal" in flags)
         print("[+] Camera configured.")
 
         # Настройка обратного вызова и запуск трекинга линии
-        callback = Callback(robot)
+        callback = Callback(robot, route=route)
         print("[+] Starting line tracking...")
-        robot.camera.track(callback.follow_line)
+        if "--track" in flags:
+            robot.controller.start()
+            print(f"[+] Controller started: {1 / config.period:.0f} Hz")
+            robot.camera.track(callback.follow_line)
+        else:
+            # Такты регулятора, обработка кадров, запись в порт и вывод — отдельные задачи
+            print(f"[+] Runtime started: controller {1 / config.period:.0f} Hz")
+            Runtime(robot, callback.follow_line).start()
 
     except KeyboardInterrupt:
         print("\n[!] Program interrupted by user.")
@@ -38,6 +98,8 @@ def main():
 
     finally:
         # Останавливаем робота и освобождаем ресурсы
+        if robot:
+            robot.stop()
         print("[+] Robot stopped. Exiting program.")
 
 if __name__ == "__main__":
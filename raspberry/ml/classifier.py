@@ -0,0 +1,362 @@
+import argparse
+import os
+import re
+import sys
+import time
+from typing import List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+# Имена файлов набора данных: <класс>.<номер>.png (см. creative_dataset.py)
+DATASET_FILE = re.compile(r"^(?P<name>.+)\.(?P<index>\d+)\.(png|jpg|jpeg)$", re.IGNORECASE)
+
+# Размер входа классификатора (изображение в оттенках серого)
+INPUT_SIZE = 64
+
+# Параметры HOG: ячейка 8x8 пикселей, блок 2x2 ячейки с шагом в ячейку, 9 направлений (0-180°)
+HOG_CELL = 8
+HOG_BINS = 9
+
+
+def load_dataset(directory: str, size: int = INPUT_SIZE) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """
+    Загружает набор данных вида <класс>.<номер>.png.
+
+    :param directory: Папка с изображениями.
+    :param size: Размер входа классификатора.
+    :return: (изображения N x size x size, номера классов N, имена классов).
+    """
+    items = []
+    for name in sorted(os.listdir(directory)):
+        match = DATASET_FILE.match(name)
+        if match:
+            items.append((match["name"], int(match["index"]), os.path.join(directory, name)))
+    items.sort()
+    classes = sorted({label for label, _, _ in items})
+
+    images = np.empty((len(items), size, size), np.uint8)
+    labels = np.empty(len(items), np.int64)
+    for i, (label, _, path) in enumerate(items):
+        images[i] = prepare(cv2.imread(path), size)
+        labels[i] = classes.index(label)
+    return images, labels, classes
+
+
+def read_dataset(path: str, size: int = INPUT_SIZE) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """
+    Загружает набор данных из папки со снимками или из упакованного набора (ml/pack.py).
+
+    :param path: Папка набора или упакованного набора.
+    :param size: Размер входа классификатора.
+    :return: (изображения, номера классов, имена классов).
+    """
+    if not os.path.exists(os.path.join(path, "index.json")):
+        return load_dataset(path, size)
+    try:
+        from .pack import PackedDataset
+    except ImportError:  # Запуск из папки ml как скрипта
+        from pack import PackedDataset
+    dataset = PackedDataset(path)
+    if dataset.size != size:
+        raise ValueError(f"Набор {path} упакован с размером {dataset.size}, а не {size}")
+    return dataset.images, dataset.labels.astype(np.int64), dataset.classes
+
+
+def prepare(image: cv2.Mat, size: int = INPUT_SIZE) -> np.ndarray:
+    """
+    Приводит кадр к входу классификатора: оттенки серого, фиксированный размер.
+
+    :param image: Кадр BGR или в оттенках серого.
+    :param size: Размер входа.
+    """
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(image, (size, size), interpolation=cv2.INTER_AREA)
+
+
+def hog(images: np.ndarray, cell: int = HOG_CELL, bins: int = HOG_BINS) -> np.ndarray:
+    """
+    Признаки HOG пакета изображений (как cv2.HOGDescriptor: блоки 2x2 ячейки, нормировка L2-Hys),
+    вычисляются сразу для всего пакета.
+
+    :param images: Изображения N x H x W (uint8).
+    :param cell: Размер ячейки, пикселей.
+    :param bins: Число направлений градиента.
+    :return: Матрица признаков N x F (float32).
+    """
+    x = images.astype(np.float32)
+    n, height, width = x.shape
+    gx = np.zeros_like(x)
+    gy = np.zeros_like(x)
+    gx[:, :, 1:-1] = x[:, :, 2:] - x[:, :, :-2]
+    gy[:, 1:-1, :] = x[:, 2:, :] - x[:, :-2, :]
+    magnitude = np.hypot(gx, gy)
+    position = (np.rad2deg(np.arctan2(gy, gx)) % 180) / (180 / bins)
+
+    # Вклад пикселя делится между двумя соседними направлениями
+    low = np.floor(position)
+    high_weight = position - low
+    low = low.astype(np.int64) % bins
+    high = (low + 1) % bins
+
+    cells_y, cells_x = height // cell, width // cell
+    rows = np.minimum(np.arange(height) // cell, cells_y - 1)
+    cols = np.minimum(np.arange(width) // cell, cells_x - 1)
+    base = ((np.arange(n)[:, None, None] * cells_y + rows[None, :, None]) * cells_x + cols[None, None, :]) * bins
+    size = n * cells_y * cells_x * bins
+    histogram = (np.bincount((base + low).ravel(), (magnitude * (1 - high_weight)).ravel(), size)
+                 + np.bincount((base + high).ravel(), (magnitude * high_weight).ravel(), size))
+    histogram = histogram.reshape(n, cells_y, cells_x, bins)
+
+    # Блоки 2x2 ячейки с шагом в одну ячейку
+    blocks = np.concatenate([histogram[:, i:cells_y - 1 + i, j:cells_x - 1 + j] for i in (0, 1) for j in (0, 1)],
+                            axis=3)
+    blocks /= np.sqrt((blocks ** 2).sum(axis=3, keepdims=True) + 1e-6)
+    np.minimum(blocks, 0.2, out=blocks)
+    blocks /= np.sqrt((blocks ** 2).sum(axis=3, keepdims=True) + 1e-6)
+    return blocks.reshape(n, -1).astype(np.float32)
+
+
+class SignClassifier:
+    """
+    Классификатор знаков: признаки HOG и линейная модель softmax на NumPy.
+    Модель хранится в одном файле .npz (веса, нормировка признаков, имена классов).
+    """
+
+    def __init__(self, classes: Sequence[str], size: int = INPUT_SIZE, background: str = "nothing",
+                 min_confidence: float = 0.6):
+        """
+        :param classes: Имена классов.
+        :param size: Размер входа (изображение size x size в оттенках серого).
+        :param background: Класс «нет знака» (не возвращается при вызове на кадре).
+        :param min_confidence: Минимальная вероятность класса при вызове на кадре.
+        """
+        self.classes = list(classes)
+        self.size = size
+        self.background = background
+        self.min_confidence = min_confidence
+        cells = size // HOG_CELL
+        features = (cells - 1) ** 2 * 4 * HOG_BINS
+        self.weights = np.zeros((features, len(self.classes)), np.float32)
+        self.bias = np.zeros(len(self.classes), np.float32)
+        self.mean = np.zeros(features, np.float32)
+        self.scale = np.ones(features, np.float32)
+
+    def features(self, images: np.ndarray) -> np.ndarray:
+        """
+        Нормированные признаки HOG пакета изображений.
+
+        :param images: Изображения N x size x size (uint8).
+        :return: Матрица признаков N x F.
+        """
+        result = hog(images)
+        result -= self.mean
+        result *= self.scale
+        return result
+
+    def fit(self, images: np.ndarray, labels: np.ndarray, epochs: int = 300, lr: float = 0.5,
+            l2: float = 1e-3) -> List[float]:
+        """
+        Обучает модель полным градиентным спуском с нулевых весов (повторный вызов обучает заново).
+
+        :param images: Изображения N x size x size.
+        :param labels: Номера классов.
+        :param epochs: Число эпох.
+        :param lr: Шаг обучения.
+        :param l2: Коэффициент L2-регуляризации.
+        :return: Значения функции потерь по эпохам.
+        """
+        self.weights[:] = 0
+        self.bias[:] = 0
+        self.mean[:] = 0
+        self.scale[:] = 1
+        x = self.features(images)
+        self.mean = x.mean(axis=0)
+        self.scale = (1.0 / (x.std(axis=0) + 1e-6)).astype(np.float32)
+        x = (x - self.mean) * self.scale
+
+        target = np.eye(len(self.classes), dtype=np.float32)[labels]
+        losses = []
+        for _ in range(epochs):
+            probabilities = self._softmax(x @ self.weights + self.bias)
+            losses.append(float(-np.log(probabilities[np.arange(len(labels)), labels] + 1e-9).mean()))
+            error = (probabilities - target) / len(labels)
+            self.weights -= lr * (x.T @ error + l2 * self.weights)
+            self.bias -= lr * error.sum(axis=0)
+        return losses
+
+    @staticmethod
+    def _softmax(logits: np.ndarray) -> np.ndarray:
+        logits = logits - logits.max(axis=1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def predict_proba(self, images: np.ndarray) -> np.ndarray:
+        """
+        Вероятности классов для пакета изображений.
+
+        :param images: Изображения N x size x size (uint8), см. prepare.
+        :return: Матрица вероятностей N x число классов.
+        """
+        return self._softmax(self.features(images) @ self.weights + self.bias)
+
+    def predict(self, images: np.ndarray) -> np.ndarray:
+        """
+        Номера классов для пакета изображений.
+        """
+        return self.predict_proba(images).argmax(axis=1)
+
+    def __call__(self, frame: cv2.Mat) -> Optional[Tuple[str, float]]:
+        """
+        Классифицирует кадр (обработчик для robot.shared.VisionPipeline).
+
+        :param frame: Кадр с камеры.
+        :return: (класс, вероятность) или None, если знака нет или модель не уверена.
+        """
+        probabilities = self.predict_proba(prepare(frame, self.size)[None])[0]
+        index = int(probabilities.argmax())
+        if self.classes[index] == self.background or probabilities[index] < self.min_confidence:
+            return None
+        return self.classes[index], float(probabilities[index])
+
+    def save(self, path: str) -> None:
+        """
+        Сохраняет модель в файл .npz.
+        """
+        np.savez_compressed(path, classes=np.array(self.classes), size=self.size, weights=self.weights,
+                            bias=self.bias, mean=self.mean, scale=self.scale)
+
+    @classmethod
+    def load(cls, path: str, **options) -> "SignClassifier":
+        """
+        Загружает модель из файла .npz.
+
+        :param path: Путь к модели.
+        :param options: Параметры SignClassifier (background, min_confidence).
+        """
+        with np.load(path) as data:
+            model = cls([str(name) for name in data["classes"]], int(data["size"]), **options)
+            model.weights, model.bias = data["weights"], data["bias"]
+            model.mean, model.scale = data["mean"], data["scale"]
+        return model
+
+
+def split(labels: np.ndarray, every: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Делит набор на обучающую и проверочную части: каждый every-й снимок класса — в проверку.
+
+    :return: Индексы обучающей и проверочной частей.
+    """
+    check = np.zeros(len(labels), bool)
+    for label in np.unique(labels):
+        check[np.nonzero(labels == label)[0][every - 1::every]] = True
+    return np.nonzero(~check)[0], np.nonzero(check)[0]
+
+
+def benchmark(model: SignClassifier, images: np.ndarray, labels: np.ndarray, batch: int = 16,
+              repeat: int = 3) -> dict:
+    """
+    Точность и время классификации: по одному изображению и пакетами.
+
+    :param model: Модель.
+    :param images: Изображения N x size x size.
+    :param labels: Номера классов.
+    :param batch: Размер пакета.
+    :param repeat: Число прогонов.
+    """
+    accuracy = float((model.predict(images) == labels).mean()) if len(images) else 0.0
+
+    single = []
+    for _ in range(repeat):
+        for image in images:
+            started = time.perf_counter()
+            model.predict_proba(image[None])
+            single.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for i in range(0, len(images), batch):
+            model.predict_proba(images[i:i + batch])
+    batched = (time.perf_counter() - started) / max(repeat * len(images), 1)
+
+    single = np.array(single) * 1000
+    return {"accuracy": accuracy, "single_ms": float(single.mean()), "single_p95_ms": float(np.percentile(single, 95)),
+            "batched_ms": batched * 1000}
+
+
+def train(args):
+    started = time.perf_counter()
+    images, labels, classes = read_dataset(args.dataset, args.size)
+    if not len(images):
+        print(f"[!] В {args.dataset} нет изображений вида <класс>.<номер>.png")
+        sys.exit(1)
+    print(f"[+] Изображений: {len(images)}, классы: {', '.join(classes)} "
+          f"(загрузка {time.perf_counter() - started:.2f} с)")
+
+    fit, check = split(labels, args.check_every)
+    model = SignClassifier(classes, args.size)
+    losses = model.fit(images[fit], labels[fit], args.epochs, args.lr, args.l2)
+    accuracy = (model.predict(images[check]) == labels[check]).mean() if len(check) else float("nan")
+    print(f"[+] Потери {losses[0]:.3f} -> {losses[-1]:.3f}, точность на проверке {accuracy * 100:.1f}% "
+          f"({len(check)} изображений)")
+
+    # Итоговая модель — на всём наборе
+    model.fit(images, labels, args.epochs, args.lr, args.l2)
+    model.save(args.output)
+    print(f"[+] Модель сохранена: {args.output} ({os.path.getsize(args.output) / 1024:.0f} КБ)")
+
+
+def bench(args):
+    model = SignClassifier.load(args.model)
+    images, labels, classes = read_dataset(args.dataset, model.size)
+    # Номера классов набора -> номера классов модели
+    labels = np.array([model.classes.index(classes[label]) if classes[label] in model.classes else -1
+                       for label in labels], np.int64)
+    result = benchmark(model, images, labels, args.batch, args.repeat)
+    print(f"[+] Изображений: {len(images)}, точность {result['accuracy'] * 100:.1f}%")
+    print(f"    по одному: {result['single_ms']:.3f} ms (p95 {result['single_p95_ms']:.3f} ms), "
+          f"пакетами по {args.batch}: {result['batched_ms']:.3f} ms на изображение")
+
+
+def predict(args):
+    model = SignClassifier.load(args.model)
+    images = np.stack([prepare(cv2.imread(path), model.size) for path in args.images])
+    for path, probabilities in zip(args.images, model.predict_proba(images)):
+        index = int(probabilities.argmax())
+        print(f"{path}: {model.classes[index]} ({probabilities[index]:.2f})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Классификатор знаков (HOG + линейная модель)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    parser_train = commands.add_parser("train", help="обучить модель на наборе <класс>.<номер>.png")
+    parser_train.add_argument("dataset", help="папка набора, например traffic/dataset, или упакованный набор "
+                                              "(ml/pack.py)")
+    parser_train.add_argument("-o", "--output", default="model.npz", help="файл модели")
+    parser_train.add_argument("--size", type=int, default=INPUT_SIZE, help="размер входа")
+    parser_train.add_argument("--epochs", type=int, default=300)
+    parser_train.add_argument("--lr", type=float, default=0.5)
+    parser_train.add_argument("--l2", type=float, default=1e-3)
+    parser_train.add_argument("--check-every", type=int, default=5, help="каждый N-й снимок класса — в проверку")
+    parser_train.set_defaults(run=train)
+
+    parser_bench = commands.add_parser("bench", help="точность и время классификации")
+    parser_bench.add_argument("model", help="файл модели")
+    parser_bench.add_argument("dataset", help="папка набора или упакованный набор")
+    parser_bench.add_argument("--batch", type=int, default=16)
+    parser_bench.add_argument("--repeat", type=int, default=3)
+    parser_bench.set_defaults(run=bench)
+
+    parser_predict = commands.add_parser("predict", help="классифицировать изображения")
+    parser_predict.add_argument("model", help="файл модели")
+    parser_predict.add_argument("images", nargs="+")
+    parser_predict.set_defaults(run=predict)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
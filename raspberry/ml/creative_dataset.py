@@ -1,8 +1,20 @@
-import cv2
+import argparse
+import csv
+import hashlib
 import os
 import sys
+import threading
 import logging
-from typing import Dict
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Tuple
+
+import cv2
+
+try:
+    from .classifier import DATASET_FILE
+except ImportError:  # Запуск из папки ml как скрипта
+    from classifier import DATASET_FILE
 
 # Настройка логирования
 log_file = "dataset_creation.log"
@@ -17,7 +29,7 @@ logging.basicConfig(
 
 # Словарь для управления клавишами
 keys: Dict[str, int] = {
-    "shot": ord("s"),  # Клавиша для создания снимка
+    "shot": ord("s"),  # Клавиша для создания снимка (серии снимков)
     "next": ord("n"),  # Клавиша для перехода к следующему классу
     "quit": ord("q")   # Клавиша для выхода из программы
 }
@@ -26,19 +38,17 @@ keys: Dict[str, int] = {
 classes: Dict[str, int] = {"left": 100, "right": 100, "stop": 100, "nothing": 70}
 
 # Классы знаков опасности
-# classes: Dict[str, int] = {"explosive": 35, "blasting_agent": 35, "flammable_gas": 35, "non-flammable_gas": 35, "flammable_liquid": 35, "inhalation_hazard": 35,
-#                            "flammable_solid": 35, "dangerous_wet": 35, "combustible": 35, "oxidizer": 35, "poison": 35, "infectious": 35, "radioactive": 35,
-#                            "corrosive": 35, "nothong": 35}
+danger_classes: Dict[str, int] = {"explosive": 35, "blasting_agent": 35, "flammable_gas": 35, "non-flammable_gas": 35,
+                                  "flammable_liquid": 35, "inhalation_hazard": 35, "flammable_solid": 35,
+                                  "dangerous_wet": 35, "combustible": 35, "oxidizer": 35, "poison": 35,
+                                  "infectious": 35, "radioactive": 35, "corrosive": 35, "nothong": 35}
 
 # Директория для сохранения набора данных
 dataset_dir: str = "traffic/dataset"
-# dataset_dir: str = "danger-signes/dataset"
-
-# Настройка камеры
-cam = cv2.VideoCapture(0)
-cam.set(cv2.CAP_PROP_FRAME_WIDTH, 720)
-cam.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+danger_dataset_dir: str = "danger-signes/dataset"
 
+# Размер сохраняемых снимков
+image_size: Tuple[int, int] = (720, 480)
 
 
 def ensure_dataset_dir(directory: str):
@@ -54,76 +64,184 @@ def ensure_dataset_dir(directory: str):
         logging.info(f"Dataset directory already exists: {directory}")
 
 
-def shot(name: str, cnt: int, image: cv2.Mat):
+class DatasetWriter:
     """
-    Делает снимок и сохраняет его в директорию.
-
-    :param name: Название класса (например, "left").
-    :param cnt: Текущий номер снимка.
-    :param image: Кадр, полученный с камеры.
+    Фоновая запись снимков: кодирование и запись на диск выполняются пулом потоков,
+    номера снимков продолжаются с уже сохранённых, каждый снимок сразу добавляется в манифест.
     """
-    image_resized = cv2.resize(image, (720, 480))
-    filepath = os.path.join(dataset_dir, f"{name}.{cnt}.png")
-    cv2.imwrite(filepath, image_resized)
-    logging.info(f"Captured image: {filepath} ({cnt + 1}/{classes[name]})")
-
 
-def read_traffic_sign(name: str, num: int):
+    def __init__(self, directory: str, fmt: str = "png", quality: int = 95, compression: int = 1,
+                 workers: int = 2, max_pending: int = 64, manifest: str = "manifest.csv"):
+        """
+        :param directory: Папка набора данных.
+        :param fmt: Формат снимков: "png" или "jpg".
+        :param quality: Качество JPEG (0-100).
+        :param compression: Степень сжатия PNG (0-9; меньше — быстрее, файлы больше).
+        :param workers: Число потоков записи.
+        :param max_pending: Максимум снимков в очереди записи (захват ждёт, если диск не успевает).
+        :param manifest: Имя CSV-манифеста в папке набора (класс, путь, время, SHA-1).
+        """
+        self.directory = directory
+        self.extension = ".jpg" if fmt in ("jpg", "jpeg") else ".png"
+        self.params = ([cv2.IMWRITE_JPEG_QUALITY, quality] if self.extension == ".jpg"
+                       else [cv2.IMWRITE_PNG_COMPRESSION, compression])
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="dataset-writer")
+        self.slots = threading.Semaphore(max_pending)
+        self.lock = threading.Lock()
+        self.errors = 0
+
+        # Продолжаем нумерацию с уже сохранённых снимков
+        self.counters: Dict[str, int] = {}
+        for name in os.listdir(directory):
+            match = DATASET_FILE.match(name)
+            if match:
+                label = match["name"]
+                self.counters[label] = max(self.counters.get(label, 0), int(match["index"]) + 1)
+        self.saved: Dict[str, int] = dict(self.counters)  # Записано на диск
+
+        manifest_path = os.path.join(directory, manifest)
+        exists = os.path.exists(manifest_path)
+        self.manifest = open(manifest_path, "a", newline="")
+        self.manifest_writer = csv.writer(self.manifest)
+        if not exists:
+            self.manifest_writer.writerow(["class", "path", "timestamp", "sha1"])
+
+    def count(self, name: str) -> int:
+        """
+        Число снимков класса (сохранённых и в очереди записи).
+        """
+        return self.counters.get(name, 0)
+
+    def submit(self, name: str, image: cv2.Mat) -> str:
+        """
+        Ставит снимок в очередь записи.
+
+        :param name: Название класса.
+        :param image: Кадр с камеры (не должен изменяться после передачи).
+        :return: Путь, по которому будет сохранён снимок.
+        """
+        self.slots.acquire()
+        index = self.counters.get(name, 0)
+        self.counters[name] = index + 1
+        path = os.path.join(self.directory, f"{name}.{index}{self.extension}")
+        self.executor.submit(self._write, name, path, image, time.time())
+        return path
+
+    def _write(self, name: str, path: str, image: cv2.Mat, timestamp: float) -> None:
+        try:
+            if (image.shape[1], image.shape[0]) != image_size:
+                image = cv2.resize(image, image_size)
+            ok, data = cv2.imencode(self.extension, image, self.params)
+            if not ok:
+                raise ValueError("encoding failed")
+            with open(path, "wb") as f:
+                f.write(data.tobytes())
+            digest = hashlib.sha1(data).hexdigest()
+            with self.lock:
+                self.manifest_writer.writerow([name, path, f"{timestamp:.3f}", digest])
+                self.manifest.flush()
+                self.saved[name] = self.saved.get(name, 0) + 1
+        except Exception as e:
+            self.errors += 1
+            logging.error(f"Failed to save {path}: {e}")
+        finally:
+            self.slots.release()
+
+    def close(self) -> None:
+        """
+        Дожидается записи всех снимков и закрывает манифест.
+        """
+        self.executor.shutdown(wait=True)
+        self.manifest.close()
+
+
+def read_traffic_sign(cam: cv2.VideoCapture, writer: DatasetWriter, name: str, num: int, burst: int = 1) -> bool:
     """
     Читает изображения для определённого дорожного знака и сохраняет их.
 
+    :param cam: Камера.
+    :param writer: Фоновая запись снимков.
     :param name: Название дорожного знака (например, "left").
-    :param num: Количество снимков, которые нужно сделать.
+    :param num: Количество снимков, которые нужно сделать (с учётом уже сохранённых).
+    :param burst: Число снимков подряд на одно нажатие клавиши.
+    :return: False, если пользователь завершил программу.
     """
-    cnt = 0
-    logging.info(f"Starting capture for class: {name}")
+    logging.info(f"Starting capture for class: {name} ({writer.count(name)}/{num} already captured)")
 
-    while cnt < num:
+    while writer.count(name) < num:
         ret, image = cam.read()
         if not ret:
             logging.warning("Camera frame not captured. Retrying...")
             continue
 
         # Изменение размера изображения для отображения
-        image_resized = cv2.resize(image, (720, 480))
-        cv2.imshow("Camera", image_resized)
+        cv2.imshow("Camera", cv2.resize(image, image_size))
 
         key = cv2.waitKey(1) & 0xFF
 
         if key == keys["quit"]:
             logging.info("Exiting...")
-            cam.release()
-            cv2.destroyAllWindows()
-            sys.exit(0)
+            return False
         elif key == keys["shot"]:
-            shot(name, cnt, image)
-            cnt += 1
+            for i in range(min(burst, num - writer.count(name))):
+                if i:
+                    ret, image = cam.read()
+                    if not ret:
+                        break
+                path = writer.submit(name, image)
+                logging.info(f"Captured image: {path} ({writer.count(name)}/{num})")
         elif key == keys["next"]:
             logging.info(f"Moving to the next class from: {name}")
-            return
+            return True
+    return True
 
 
 def main():
     """
     Основная функция для сбора набора данных.
     """
-    logging.info("Dataset creation process started.")
-    ensure_dataset_dir(dataset_dir)
-
-    for sign in classes:
-        read_traffic_sign(sign, classes[sign])
-        logging.info(f"Finished capturing for sign: {sign}")
+    parser = argparse.ArgumentParser(description="Сбор набора данных знаков с камеры")
+    parser.add_argument("--danger", action="store_true", help="знаки опасности вместо дорожных знаков")
+    parser.add_argument("--dir", help="папка набора данных")
+    parser.add_argument("--camera", type=int, default=0, help="индекс камеры")
+    parser.add_argument("--format", choices=["png", "jpg"], default="png", help="формат снимков")
+    parser.add_argument("--quality", type=int, default=95, help="качество JPEG (0-100)")
+    parser.add_argument("--compression", type=int, default=1, help="степень сжатия PNG (0-9)")
+    parser.add_argument("--burst", type=int, default=1, help="снимков на одно нажатие")
+    parser.add_argument("--workers", type=int, default=2, help="потоков записи")
+    args = parser.parse_args()
+
+    targets = danger_classes if args.danger else classes
+    directory = args.dir or (danger_dataset_dir if args.danger else dataset_dir)
 
-    logging.info("Dataset creation complete.")
-    cam.release()
-    cv2.destroyAllWindows()
+    logging.info("Dataset creation process started.")
+    ensure_dataset_dir(directory)
 
+    # Настройка камеры
+    cam = cv2.VideoCapture(args.camera)
+    cam.set(cv2.CAP_PROP_FRAME_WIDTH, image_size[0])
+    cam.set(cv2.CAP_PROP_FRAME_HEIGHT, image_size[1])
+    writer = DatasetWriter(directory, args.format, args.quality, args.compression, args.workers)
 
-if __name__ == '__main__':
     try:
-        main()
+        for sign in targets:
+            if not read_traffic_sign(cam, writer, sign, targets[sign], args.burst):
+                break
+            logging.info(f"Finished capturing for sign: {sign}")
+        else:
+            logging.info("Dataset creation complete.")
     except Exception as e:
         logging.error(f"An error occurred: {e}")
+        raise
+    finally:
         cam.release()
         cv2.destroyAllWindows()
+        writer.close()
+        logging.info(f"Saved: {writer.saved}, errors: {writer.errors}")
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except Exception:
         sys.exit(1)
@@ -0,0 +1,169 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+try:
+    from .classifier import DATASET_FILE, INPUT_SIZE, prepare
+except ImportError:  # Запуск из папки ml как скрипта
+    from classifier import DATASET_FILE, INPUT_SIZE, prepare
+
+# Файлы упакованного набора
+PACK_INDEX = "index.json"  # Размер, число изображений, классы, исходные файлы
+PACK_IMAGES = "images.u8"  # Изображения count x size x size (uint8, подряд)
+PACK_LABELS = "labels.i16"  # Номера классов (int16)
+
+
+class PackedDataset:
+    """
+    Упакованный набор данных: изображения фиксированного размера в оттенках серого в одном файле,
+    отображённом в память (np.memmap) — без декодирования PNG и без копирования при чтении.
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: Папка упакованного набора.
+        """
+        self.path = path
+        with open(os.path.join(path, PACK_INDEX)) as f:
+            self.index = json.load(f)
+        self.size = self.index["size"]
+        self.classes: List[str] = self.index["classes"]
+        count = self.index["count"]
+        # Файлы могут быть длиннее count, если дописывание было прервано: лишнее не читается
+        self.images = (np.memmap(os.path.join(path, PACK_IMAGES), np.uint8, "r", shape=(count, self.size, self.size))
+                       if count else np.empty((0, self.size, self.size), np.uint8))
+        self.labels = (np.memmap(os.path.join(path, PACK_LABELS), np.int16, "r", shape=(count,))
+                       if count else np.empty(0, np.int16))
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def batch(self, indices) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Пакет изображений и меток (срез — без копирования, список индексов — копия только пакета).
+
+        :param indices: Срез или массив индексов.
+        """
+        return self.images[indices], self.labels[indices]
+
+    def batches(self, batch_size: int, shuffle: bool = True, seed: int = 0):
+        """
+        Перебор пакетов для обучения.
+
+        :param batch_size: Размер пакета.
+        :param shuffle: Перемешивать порядок.
+        :param seed: Начальное значение генератора.
+        """
+        order = np.random.default_rng(seed).permutation(len(self)) if shuffle else np.arange(len(self))
+        for start in range(0, len(order), batch_size):
+            # Индексы по возрастанию: чтение с диска последовательнее
+            yield self.batch(np.sort(order[start:start + batch_size]))
+
+
+def pack(directory: str, output: str, size: int = INPUT_SIZE, workers: int = 4) -> Dict[str, float]:
+    """
+    Упаковывает набор <класс>.<номер>.png в папку output; при повторном запуске дописывает только новые снимки.
+
+    :param directory: Папка набора данных.
+    :param output: Папка упакованного набора.
+    :param size: Размер изображений.
+    :param workers: Число потоков декодирования.
+    :return: Число добавленных изображений, время, изображений в секунду и МБ/с прочитанных файлов.
+    """
+    os.makedirs(output, exist_ok=True)
+    index_path = os.path.join(output, PACK_INDEX)
+    if os.path.exists(index_path):
+        with open(index_path) as f:
+            index = json.load(f)
+        if index["size"] != size:
+            raise ValueError(f"Набор {output} упакован с размером {index['size']}, а не {size}")
+    else:
+        index = {"size": size, "count": 0, "classes": [], "files": []}
+
+    def order(name):
+        match = DATASET_FILE.match(name)
+        return match["name"], int(match["index"])
+
+    packed = set(index["files"])
+    names = sorted((name for name in os.listdir(directory) if DATASET_FILE.match(name) and name not in packed),
+                   key=order)
+    for label, _ in map(order, names):
+        if label not in index["classes"]:
+            index["classes"].append(label)  # Новые классы — в конец: номера старых не меняются
+
+    def load(name):
+        path = os.path.join(directory, name)
+        return prepare(cv2.imread(path), size), os.path.getsize(path)
+
+    started = time.perf_counter()
+    read_bytes = 0
+    count = index["count"]
+    with open(os.path.join(output, PACK_IMAGES), "r+b" if count else "wb") as images, \
+            open(os.path.join(output, PACK_LABELS), "r+b" if count else "wb") as labels, \
+            ThreadPoolExecutor(workers) as executor:
+        # Обрезаем остаток прерванного дописывания
+        images.truncate(count * size * size)
+        labels.truncate(count * 2)
+        images.seek(0, os.SEEK_END)
+        labels.seek(0, os.SEEK_END)
+        for name, (image, file_size) in zip(names, executor.map(load, names)):
+            images.write(image.tobytes())
+            labels.write(np.int16(index["classes"].index(order(name)[0])).tobytes())
+            read_bytes += file_size
+
+    # Индекс обновляется после записи данных: прерванная упаковка не портит набор
+    index["count"] = count + len(names)
+    index["files"] += names
+    with open(index_path + ".tmp", "w") as f:
+        json.dump(index, f)
+    os.replace(index_path + ".tmp", index_path)
+
+    elapsed = time.perf_counter() - started
+    return {"added": len(names), "total": index["count"], "seconds": elapsed,
+            "images_per_s": len(names) / elapsed if elapsed else 0.0,
+            "mb_per_s": read_bytes / 2 ** 20 / elapsed if elapsed else 0.0}
+
+
+def load_throughput(path: str, batch_size: int = 64) -> Dict[str, float]:
+    """
+    Время открытия упакованного набора и полного прохода пакетами.
+
+    :param path: Папка упакованного набора.
+    :param batch_size: Размер пакета.
+    """
+    started = time.perf_counter()
+    dataset = PackedDataset(path)
+    opened = time.perf_counter() - started
+    checksum = 0
+    for images, _ in dataset.batches(batch_size):
+        checksum += int(images[:, 0, 0].sum())  # Обращение к данным пакета
+    elapsed = time.perf_counter() - started
+    return {"count": len(dataset), "open_ms": opened * 1000, "seconds": elapsed,
+            "images_per_s": len(dataset) / elapsed if elapsed else 0.0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Упаковка набора данных в файл, отображаемый в память")
+    parser.add_argument("dataset", help="папка набора <класс>.<номер>.png, например traffic/dataset")
+    parser.add_argument("-o", "--output", help="папка упакованного набора (по умолчанию <dataset>.pack)")
+    parser.add_argument("--size", type=int, default=INPUT_SIZE, help="размер изображений")
+    parser.add_argument("--workers", type=int, default=4, help="потоков декодирования")
+    args = parser.parse_args()
+    output = args.output or args.dataset.rstrip("/") + ".pack"
+
+    result = pack(args.dataset, output, args.size, args.workers)
+    print(f"[+] Упаковано: +{result['added']} (всего {result['total']}) за {result['seconds']:.2f} с, "
+          f"{result['images_per_s']:.0f} изобр./с, {result['mb_per_s']:.1f} МБ/с")
+    result = load_throughput(output)
+    print(f"[+] Загрузка: {result['count']} изображений, открытие {result['open_ms']:.2f} ms, "
+          f"проход {result['seconds'] * 1000:.1f} ms ({result['images_per_s']:.0f} изобр./с)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,275 @@
+import threading
+import time
+
 import cv2
+import numpy as np
 import pyzbar.pyzbar as zbar
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
+
+# Область кадра (x, y, ширина, высота)
+Region = Tuple[int, int, int, int]
+
+
+def decode_qr(img: cv2.Mat) -> Optional[str]:
+    """
+    Декодирует QR-код на кадре.
+
+    :param img: Кадр с камеры.
+    :return: Строка с данными первого найденного QR-кода или None.
+    """
+    decoded_objects = zbar.decode(img)
+    if decoded_objects:
+        return decoded_objects[0].data.decode()  # Извлекаем данные из первого QR-кода
+    return None
+
+
+def find_finder_patterns(gray: cv2.Mat, block: int = 41) -> List[Region]:
+    """
+    Ищет поисковые узоры QR-кода (квадрат в квадрате в квадрате) по вложенности контуров.
+
+    :param gray: Изображение в оттенках серого.
+    :param block: Размер окрестности адаптивного порога (больше центрального квадрата узора).
+    :return: Ограничивающие прямоугольники узоров.
+    """
+    binary = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, block, 5)
+    contours, hierarchy = cv2.findContours(binary, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
+    if hierarchy is None:
+        return []
+    # Внешняя граница тёмной рамки -> граница светлого кольца -> центральный тёмный квадрат
+    child = hierarchy[0, :, 2]
+    grandchild = np.where(child >= 0, hierarchy[0, child, 2], -1)
 
+    patterns = []
+    for i in np.nonzero(grandchild >= 0)[0]:
+        contour = contours[i]
+        x, y, w, h = cv2.boundingRect(contour)
+        if w < 7 or h < 7 or not 0.5 < w / h < 2.0:
+            continue
+        # Центр узора — 3x3 модуля из 7x7: отношение площадей около 0.18
+        ratio = cv2.contourArea(contours[grandchild[i]]) / max(cv2.contourArea(contour), 1.0)
+        if 0.05 < ratio < 0.45:
+            patterns.append((x, y, w, h))
+    return patterns
 
-def find_qr_code(camera_index: int = 0) -> Optional[str]:
+
+def group_patterns(patterns: List[Region], reach: float = 10.0) -> List[Region]:
+    """
+    Объединяет поисковые узоры одного кода в области-кандидаты.
+
+    :param patterns: Прямоугольники поисковых узоров.
+    :param reach: Максимальное расстояние между узорами одного кода в размерах узора.
+    :return: Ограничивающие прямоугольники групп с полем в размер узора (тихая зона кода).
+    """
+    groups = list(range(len(patterns)))
+
+    def root(i):
+        while groups[i] != i:
+            groups[i] = groups[groups[i]]
+            i = groups[i]
+        return i
+
+    centers = np.array([(x + w / 2, y + h / 2) for x, y, w, h in patterns], dtype=np.float32).reshape(-1, 2)
+    sizes = np.array([max(w, h) for _, _, w, h in patterns], dtype=np.float32)
+    for i in range(len(patterns)):
+        distances = np.hypot(*(centers[i + 1:] - centers[i]).T)
+        for j in np.nonzero(distances < reach * np.maximum(sizes[i + 1:], sizes[i]))[0] + i + 1:
+            groups[root(j)] = root(i)
+
+    regions: Dict[int, List[Region]] = {}
+    for i, pattern in enumerate(patterns):
+        regions.setdefault(root(i), []).append(pattern)
+    result = []
+    for members in regions.values():
+        pad = max(max(w, h) for _, _, w, h in members)
+        x0 = min(x for x, _, _, _ in members) - pad
+        y0 = min(y for _, y, _, _ in members) - pad
+        x1 = max(x + w for x, _, w, _ in members) + pad
+        y1 = max(y + h for _, y, _, h in members) + pad
+        if len(members) == 1:
+            # Виден один узор: код может продолжаться в любую сторону
+            x0, y0, x1, y1 = x0 - 4 * pad, y0 - 4 * pad, x1 + 4 * pad, y1 + 4 * pad
+        result.append((x0, y0, x1 - x0, y1 - y0))
+    return result
+
+
+class QrScanner:
+    """
+    Поиск QR-кодов в цикле робота: дешёвый поиск поисковых узоров на уменьшенном кадре,
+    zbar только на вырезанных областях-кандидатах в оттенках серого, прореживание кадров,
+    ограничение времени на кадр и кэш результатов по области.
+    """
+
+    def __init__(self, every: int = 3, scale: float = 0.5, deadline: float = 0.02, cache_ttl: float = 1.0,
+                 cache_step: int = 32, fallback_every: int = 0):
+        """
+        :param every: Обрабатывать каждый every-й кадр.
+        :param scale: Масштаб кадра для поиска кандидатов.
+        :param deadline: Время на кадр, сек: после него оставшиеся кандидаты не декодируются (0 — без ограничения).
+        :param cache_ttl: Время жизни результата в кэше, сек.
+        :param cache_step: Шаг квантования области для ключа кэша, пикселей.
+        :param fallback_every: Декодировать весь кадр каждый fallback_every-й обработанный кадр без кандидатов
+                               (0 — никогда).
+        """
+        self.every = max(1, every)
+        self.scale = scale
+        self.deadline = deadline
+        self.cache_ttl = cache_ttl
+        self.cache_step = cache_step
+        self.fallback_every = fallback_every
+        self.cache: Dict[Region, Tuple[float, str]] = {}  # Квантованная область -> (время, данные)
+        self.frames = 0  # Поступило кадров
+        self.empty = 0  # Обработанных кадров подряд без кандидатов
+
+        # Счётчики
+        self.scanned = 0  # Обработано кадров
+        self.decoded = 0  # Вызовов zbar
+        self.hits = 0  # Результатов из кэша
+        self.missed = 0  # Кандидатов, пропущенных по времени
+
+        # Фоновый режим (feed)
+        self.result: Optional[str] = None  # Последний найденный код
+        self.result_time = 0.0
+        self.thread: Optional[threading.Thread] = None
+        self.pending: Optional[cv2.Mat] = None
+        self.cond: Optional[threading.Condition] = None
+        self.running = False
+
+    def candidates(self, gray: cv2.Mat) -> List[Region]:
+        """
+        Области-кандидаты в координатах полного кадра, от больших к меньшим.
+
+        :param gray: Кадр в оттенках серого.
+        """
+        small = gray if self.scale == 1 else cv2.resize(gray, None, fx=self.scale, fy=self.scale,
+                                                         interpolation=cv2.INTER_AREA)
+        height, width = gray.shape
+        regions = []
+        for x, y, w, h in group_patterns(find_finder_patterns(small)):
+            x0, y0 = max(0, int(x / self.scale)), max(0, int(y / self.scale))
+            x1, y1 = min(width, int((x + w) / self.scale)), min(height, int((y + h) / self.scale))
+            if x1 > x0 and y1 > y0:
+                regions.append((x0, y0, x1 - x0, y1 - y0))
+        return sorted(regions, key=lambda region: region[2] * region[3], reverse=True)
+
+    def _key(self, region: Region) -> Region:
+        step = self.cache_step
+        x, y, w, h = region
+        return (x + w // 2) // step, (y + h // 2) // step, w // step, h // step
+
+    def scan(self, frame: cv2.Mat) -> Optional[str]:
+        """
+        Ищет QR-код на кадре с учётом прореживания (синхронно).
+
+        :param frame: Кадр BGR или в оттенках серого.
+        :return: Данные QR-кода или None (кадр пропущен или код не найден).
+        """
+        self.frames += 1
+        if (self.frames - 1) % self.every:
+            return None
+        self.scanned += 1
+        started = time.monotonic()
+        gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+        # Устаревшие записи кэша
+        self.cache = {key: value for key, value in self.cache.items() if started - value[0] < self.cache_ttl}
+
+        regions = self.candidates(gray)
+        if not regions:
+            self.empty += 1
+            if self.fallback_every and self.empty % self.fallback_every == 0:
+                self.decoded += 1
+                return decode_qr(gray)
+            return None
+        self.empty = 0
+
+        for i, (x, y, w, h) in enumerate(regions):
+            key = self._key((x, y, w, h))
+            cached = self.cache.get(key)
+            if cached:
+                self.hits += 1
+                return cached[1]
+            if self.deadline and i and time.monotonic() - started > self.deadline:
+                self.missed += len(regions) - i
+                break
+            self.decoded += 1
+            data = decode_qr(gray[y:y + h, x:x + w])
+            if data is not None:
+                self.cache[key] = (time.monotonic(), data)
+                return data
+        return None
+
+    __call__ = scan  # Обработчик для robot.shared.VisionPipeline
+
+    def feed(self, frame: cv2.Mat) -> Optional[str]:
+        """
+        Передаёт кадр фоновому потоку и сразу возвращает последний найденный код (не блокирует цикл робота).
+        Если поток занят, кадр заменяет ожидающий.
+
+        :param frame: Кадр BGR или в оттенках серого (не должен изменяться после передачи).
+        :return: Последний найденный код не старше cache_ttl или None.
+        """
+        if self.thread is None:
+            self.start()
+        with self.cond:
+            self.pending = frame
+            self.cond.notify()
+        if self.result is not None and time.monotonic() - self.result_time < self.cache_ttl:
+            return self.result
+        return None
+
+    def start(self) -> "QrScanner":
+        """
+        Запускает фоновый поток поиска для feed.
+        """
+        self.cond = threading.Condition()
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="qr-scanner", daemon=True)
+        self.thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self.pending is not None or not self.running)
+                if not self.running:
+                    break
+                frame, self.pending = self.pending, None
+            data = self.scan(frame)
+            if data is not None:
+                self.result, self.result_time = data, time.monotonic()
+
+    def stop(self) -> None:
+        """
+        Останавливает фоновый поток.
+        """
+        if self.thread is None:
+            return
+        with self.cond:
+            self.running = False
+            self.cond.notify()
+        self.thread.join(timeout=1.0)
+        self.thread = None
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Счётчики: поступило и обработано кадров, вызовов zbar, попаданий в кэш, кандидатов пропущено по времени.
+        """
+        return {"frames": self.frames, "scanned": self.scanned, "decoded": self.decoded,
+                "hits": self.hits, "missed": self.missed}
+
+    def __getstate__(self):
+        # Для передачи в процесс обработчика: без потока и условия
+        state = self.__dict__.copy()
+        state.update(thread=None, cond=None, pending=None, running=False)
+        return state
+
+
+def find_qr_code(camera_index: int = 0, timeout: float = 0.0) -> Optional[str]:
     """
     Ищет QR-код с камеры и возвращает его содержимое.
 
     :param camera_index: Индекс камеры для захвата видео (по умолчанию 0).
+    :param timeout: Максимальное время поиска, сек (0 — без ограничения).
     :return: Строка с данными из QR-кода или None, если QR-код не найден.
     """
     # Открытие видеопотока с указанной камеры
@@ -18,21 +280,22 @@ def find_qr_code(camera_index: int = 0) -> Optional[str]:
         return None
 
     print("Видеопоток запущен. Поиск QR-кода...")
+    scanner = QrScanner(every=1, fallback_every=10)
+    started = time.monotonic()
 
     try:
-        while True:
+        while not timeout or time.monotonic() - started < timeout:
             # Считываем кадр с камеры
             ret, img = cap.read()
             if not ret:
                 print("Ошибка: Не удалось получить кадр с камеры.")
                 break
 
-            # Декодируем QR-коды в кадре
-            decoded_objects = zbar.decode(img)
+            # Ищем QR-код в областях-кандидатах кадра
+            data = scanner.scan(img)
 
-            # Если QR-коды найдены
-            if decoded_objects:
-                data = decoded_objects[0].data.decode()  # Извлекаем данные из первого QR-кода
+            # Если QR-код найден
+            if data is not None:
                 print("QR-код найден:", f"'{data}'")
                 return data
     finally:
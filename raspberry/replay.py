@@ -0,0 +1,170 @@
+import argparse
+import csv
+import os
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from robot import Robot, Callback
+from robot.hardware import Chassis
+from robot.software import Camera
+
+# Этапы обработки кадра, для которых измеряется время
+STAGES = ["decode", "crop", "blur", "threshold", "moments", "callback"]
+
+# Расширения изображений для воспроизведения папки с кадрами
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+
+class ImageDirectory:
+    """
+    Источник кадров из папки с изображениями с интерфейсом cv2.VideoCapture (read/get/release).
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: Папка с изображениями (сортируются по номеру в имени).
+        """
+        def natural(name):
+            return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", name)]
+
+        names = sorted((name for name in os.listdir(path) if name.lower().endswith(IMAGE_EXTENSIONS)), key=natural)
+        self.files = [os.path.join(path, name) for name in names]
+        self.index = 0
+        first = cv2.imread(self.files[0]) if self.files else None
+        self.shape = first.shape if first is not None else (0, 0, 3)
+
+    def read(self) -> Tuple[bool, Optional[cv2.Mat]]:
+        if self.index >= len(self.files):
+            return False, None
+        frame = cv2.imread(self.files[self.index])
+        self.index += 1
+        return frame is not None, frame
+
+    def get(self, prop: int) -> float:
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self.shape[1]
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self.shape[0]
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return len(self.files)
+        return 0.0
+
+    def release(self) -> None:
+        pass
+
+
+class RecordingChassis(Chassis):
+    """
+    Шасси без моторов: запоминает последний угол и мощности вместо отправки на плату.
+    """
+
+    def __init__(self, max_power: float, k: float, verbose: bool = True):
+        super().__init__(None, None, max_power, k, verbose)
+        self.angle: Optional[float] = None
+        self.power: Optional[Tuple[float, float]] = None
+
+    def direction(self, angle: float, scale: float = 1.0) -> None:
+        self.angle = angle
+        super().direction(angle, scale)
+
+    def set_power(self, lpower: float, rpower: float) -> None:
+        self.power = (lpower, rpower)
+
+
+def open_source(path: str):
+    """
+    Открывает запись: видеофайл или папку с изображениями.
+    """
+    if os.path.isdir(path):
+        return ImageDirectory(path)
+    return cv2.VideoCapture(path)
+
+
+def replay(source: str, output: str, bands: int = 1, threshold: str = "adaptive",
+           max_power: float = 0.3, k: float = 1.5, limit: int = 0) -> Dict[str, np.ndarray]:
+    """
+    Прогоняет запись через обработку кадра и логику Callback без экрана и моторов.
+
+    :param source: Видеофайл или папка с изображениями.
+    :param output: CSV-файл с результатами по кадрам.
+    :param bands: Число полос детектора.
+    :param threshold: Режим бинаризации Camera.
+    :param max_power: Максимальная мощность шасси.
+    :param k: Коэффициент поворота шасси.
+    :param limit: Максимальное число кадров (0 — все).
+    :return: Время этапов по кадрам, сек.
+    """
+    camera = Camera(open_source(source), save_video=False, headless=True, threshold=threshold, bands=bands)
+    robot = Robot(None, verbose=False)
+    robot.camera = camera
+    robot.chassis = RecordingChassis(max_power, k, verbose=False)
+    callback = Callback(robot)
+
+    timings: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+    started = time.perf_counter()
+    frames = 0
+    with open(output, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["frame", "cx", "cy", "angle", "left", "right"] + [f"{stage}_ms" for stage in STAGES])
+
+        while not limit or frames < limit:
+            t0 = time.perf_counter()
+            ret, frame = camera.cap.read()
+            t1 = time.perf_counter()
+            if not ret:
+                break
+
+            crop = camera.crop(frame)
+            t2 = time.perf_counter()
+            gray = camera.preprocess(crop)
+            t3 = time.perf_counter()
+            mask = camera.binarize(gray)
+            t4 = time.perf_counter()
+            center = camera.locate(mask)
+            t5 = time.perf_counter()
+
+            robot.chassis.angle = robot.chassis.power = None
+            callback.follow_line(center)
+            t6 = time.perf_counter()
+
+            stamps = (t0, t1, t2, t3, t4, t5, t6)
+            for stage, begin, end in zip(STAGES, stamps, stamps[1:]):
+                timings[stage].append(end - begin)
+
+            angle = robot.chassis.angle
+            left, right = robot.chassis.power or ("", "")
+            writer.writerow([frames, *(center or ("", "")), "" if angle is None else f"{angle:.3f}", left, right]
+                            + [f"{(end - begin) * 1000:.3f}" for begin, end in zip(stamps, stamps[1:])])
+            frames += 1
+
+    elapsed = time.perf_counter() - started
+    camera.stop()
+
+    result = {stage: np.array(values) for stage, values in timings.items()}
+    print(f"[+] Кадров: {frames}, {frames / elapsed if elapsed else 0:.1f} FPS, результаты: {output}")
+    for stage, values in result.items():
+        if values.size:
+            print(f"    {stage:<10} mean {values.mean() * 1000:7.3f} ms  "
+                  f"p50 {np.percentile(values, 50) * 1000:7.3f} ms  p95 {np.percentile(values, 95) * 1000:7.3f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Воспроизведение записи через обработку кадра без экрана и моторов")
+    parser.add_argument("source", help="видеофайл (например output/output.mp4) или папка с изображениями")
+    parser.add_argument("-o", "--output", default="replay.csv", help="CSV-файл с результатами по кадрам")
+    parser.add_argument("--bands", type=int, default=1, help="число полос детектора")
+    parser.add_argument("--threshold", choices=["adaptive", "global", "fixed"], default="adaptive", help="режим бинаризации")
+    parser.add_argument("--max-power", type=float, default=0.3, help="максимальная мощность шасси")
+    parser.add_argument("--k", type=float, default=1.5, help="коэффициент поворота шасси")
+    parser.add_argument("--limit", type=int, default=0, help="максимальное число кадров")
+    args = parser.parse_args()
+    replay(args.source, args.output, args.bands, args.threshold, args.max_power, args.k, args.limit)
+
+
+if __name__ == "__main__":
+    main()
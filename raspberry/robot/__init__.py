@@ -1,11 +1,17 @@
-from math import atan2, degrees
-from typing import Tuple
+from math import atan2, degrees, isnan
+from typing import Optional, Sequence, Tuple
 
 import pyfirmata
 
 # Импорт оборудования и программного обеспечения
-from .hardware import Motor, Chassis
+from .hardware import Motor, Chassis, LinkChassis, Imu, Manipulator, ManipulatorError, ManState
+from .protocol import SerialLink
 from .software import Camera
+from .control import Controller, ControllerConfig
+from .shared import VisionPipeline
+from .telemetry import NullTelemetry, SocketExporter, Telemetry
+from .tracking import LineTracker
+from .vision import Junction, JunctionFit
 
 
 class Robot:
@@ -13,20 +19,37 @@ class Robot:
     Класс для управления роботом, включая моторы и камеру.
     """
 
-    def __init__(self, serial: str = '/dev/ttyUSB0', camera_offset_x: float = 0.0):
+    def __init__(self, serial: str = '/dev/ttyUSB0', camera_offset_x: float = 0.0, transport: str = 'firmata',
+                 verbose: bool = True):
         """
         Инициализация робота.
 
-        :param serial: Порт для подключения платы Arduino.
+        :param serial: Порт для подключения платы Arduino (None — без платы, например для воспроизведения записей).
         :param camera_offset_x: Смещение камеры от центра робота по оси X (в мм или см).
+        :param transport: Протокол связи с платой: 'firmata' (pyfirmata) или 'link'
+                          (двоичный протокол robot.protocol, прошивка arduino/link.h).
+        :param verbose: Отладочный вывод на каждом кадре (False — без вывода, он замедляет цикл по SSH).
         """
         self.camera = None  # Камера робота
         self.chassis = None  # Шасси робота
         self.right = None  # Правый мотор
         self.left = None  # Левый мотор
-        self.board = pyfirmata.Arduino(serial)  # Плата Arduino
+        self.controller = None  # Регулятор движения
+        self.vision = None  # Многопроцессный конвейер зрения (QR, знаки)
+        self.tracker = None  # Восстановление после потери линии
+        self.verbose = verbose
+        self.telemetry = NullTelemetry()  # Замеры времени этапов
+        self.board = None  # Плата Arduino (Firmata)
+        self.link = None  # Двоичный канал связи с платой
+        self.manipulator = None  # Манипулятор (только по двоичному протоколу)
+        self.imu = None  # Гироскоп платы (только по двоичному протоколу)
+        if serial and transport == 'link':
+            self.link = SerialLink(serial)
+        elif serial:
+            self.board = pyfirmata.Arduino(serial)
         self.camera_offset_x = camera_offset_x  # Смещение камеры по X
-        print("[+] Communication Successfully started")
+        if serial:
+            print("[+] Communication Successfully started")
 
     def setup_motors(self, left: Tuple[int, int, int], right: Tuple[int, int, int], max_power: float = 0.5, k: float = 1.0):
         """
@@ -37,25 +60,107 @@ class Robot:
         :param max_power: Максимальная мощность моторов.
         :param k: Коэффициент чувствительности поворота.
         """
-        self.left = Motor(self.board, *left)
-        self.right = Motor(self.board, *right)
-        self.chassis = Chassis(self.left, self.right, max_power, k)
+        if self.link:
+            # Пины моторов задаются прошивкой, команды передаются одним пакетом
+            self.chassis = LinkChassis(self.link, max_power, k, self.verbose)
+        else:
+            self.left = Motor(self.board, *left)
+            self.right = Motor(self.board, *right)
+            self.chassis = Chassis(self.left, self.right, max_power, k, self.verbose)
+        self.chassis.telemetry = self.telemetry
 
-    def setup_camera(self, camera_number: int = 0):
+    def setup_manipulator(self):
+        """
+        Настройка манипулятора: команды выполняются прошивкой без блокировки, результат — Future.
+        """
+        if not self.link:
+            raise RuntimeError("Манипулятор доступен только при transport='link'")
+        self.manipulator = Manipulator(self.link, self.verbose)
+
+    def setup_imu(self, **options):
+        """
+        Включает приём пакетов гироскопа платы (вызывать до setup_controller: регулятор объединяет курс с углом камеры).
+
+        :param options: Параметры Imu (invert, history).
+        """
+        if not self.link:
+            raise RuntimeError("Гироскоп доступен только при transport='link'")
+        self.imu = Imu(self.link, **options)
+
+    def setup_telemetry(self, interval: float = 5.0, export=None):
+        """
+        Включает замеры времени этапов от захвата кадра до отправки команды моторам.
+
+        :param interval: Период вывода сводки p50/p95/p99, сек.
+        :param export: Адрес для отправки сводок: (хост, порт) UDP или путь к Unix-сокету.
+        """
+        self.telemetry = Telemetry(interval=interval, exporter=SocketExporter(export) if export else None)
+        for component in (self.camera, self.chassis, self.tracker):
+            if component:
+                component.telemetry = self.telemetry
+
+    def setup_tracker(self, **options):
+        """
+        Включает прогноз линии при коротких пропаданиях, поиск и остановку при долгой потере линии.
+
+        :param options: Параметры LineTracker (coast, search, search_angle и т.д.).
+        """
+        self.tracker = LineTracker(**options)
+        self.tracker.telemetry = self.telemetry
+
+    def setup_controller(self, config: ControllerConfig):
+        """
+        Настройка регулятора движения с собственным потоком тактов (вызывать после setup_motors).
+
+        :param config: Параметры регулятора.
+        """
+        self.controller = Controller(self.chassis, config, self.imu)
+
+    def setup_camera(self, camera_number: int = 0, **options):
         """
         Настройка камеры робота.
 
         :param camera_number: Индекс камеры, подключённой к компьютеру.
+        :param options: Дополнительные параметры Camera (threaded, headless, threshold, bands и т.д.).
+        """
+        self.camera = Camera(camera_number, **options)
+        self.camera.telemetry = self.telemetry
+
+    def setup_vision(self, pipeline: VisionPipeline, **options):
         """
-        self.camera = Camera(camera_number)
+        Запускает многопроцессный конвейер зрения; камера следования по линии читает кадры из него.
+
+        :param pipeline: Конвейер с добавленными обработчиками (VisionPipeline.add_worker).
+        :param options: Дополнительные параметры Camera (headless, threshold, bands и т.д.).
+        """
+        self.vision = pipeline.start()
+        self.camera = Camera(pipeline.capture(), **options)
+        self.camera.telemetry = self.telemetry
 
     def stop(self):
         """
         Останавливает робота, включая моторы и камеру.
         """
-        self.chassis.set_power(0, 0)
+        if self.controller:
+            self.controller.stop()
+        if self.chassis:
+            self.chassis.set_power(0, 0)
         if self.camera:
             self.camera.stop()
+        if self.vision:
+            self.vision.stop()
+        self.telemetry.report(force=True)
+        if self.tracker:
+            print(f"[+] Потери линии: {self.tracker.stats()}")
+        if self.manipulator and not self.manipulator.idle.is_set():
+            # Прерываем последовательность или подъезд к банке до закрытия канала
+            self.manipulator.stop()
+            self.manipulator.wait(0.5)
+        if self.imu:
+            print(f"[+] IMU: {self.imu.stats()}")
+        if self.link:
+            print(f"[+] Link: {self.link.stats()}")
+            self.link.close()
 
 
 class Callback:
@@ -63,13 +168,34 @@ class Callback:
     Класс для обработки обратных вызовов, связанных с движением робота.
     """
 
-    def __init__(self, robot: Robot):
+    def __init__(self, robot: Robot, slowdown: float = 0.0, route: Sequence[str] = (), confirm: int = 3):
         """
         Инициализация обработчика обратных вызовов.
 
         :param robot: Экземпляр робота.
+        :param slowdown: Доля снижения мощности перед поворотом по данным look-ahead
+                         (0 — не снижать, 0.5 — вдвое при направлении линии 45° и более).
+        :param route: Команды на перекрёстках по порядку: "left", "right" или "straight"
+                      (нужна камера с junctions=True).
+        :param confirm: Число кадров подряд с ответвлением, после которого перекрёсток считается найденным.
         """
         self.robot = robot
+        self.slowdown = slowdown
+        self.route = list(route)
+        self.confirm = confirm
+        self.turn: Optional[str] = None  # Выполняемая команда перекрёстка
+        self.junction_frames = 0  # Кадров подряд с ответвлением
+
+    def speed_scale(self) -> float:
+        """
+        Множитель мощности по направлению линии впереди: на прямой — полная мощность, перед поворотом — меньше.
+
+        :return: Множитель мощности в диапазоне (0, 1].
+        """
+        fit = self.robot.camera.fit
+        if not self.slowdown or fit is None or fit.valid < 2:
+            return 1.0
+        return 1.0 - self.slowdown * min(1.0, abs(fit.heading) / 45)
 
     def calculate_angle(self, line_center: Tuple[int, int]) -> float:
         """
@@ -90,22 +216,94 @@ class Callback:
         angle = degrees(atan2(dx, dy))
         return angle
 
+    def route_center(self, center: Optional[Tuple[int, int]], junction: JunctionFit) -> Optional[Tuple[int, int]]:
+        """
+        Выбирает точку, на которую ехать, с учётом команд маршрута на перекрёстках.
+
+        :param center: Центр основной линии.
+        :param junction: Тип участка линии.
+        :return: Центр основной линии или конец ответвления, в которое выполняется поворот.
+        """
+        if junction.kind > Junction.STRAIGHT:
+            self.junction_frames += 1
+            if self.turn is None and self.junction_frames == self.confirm and self.route:
+                self.turn = self.route.pop(0)
+                if self.robot.verbose:
+                    print(f"[+] Перекрёсток {junction.kind.name}: {self.turn}")
+        else:
+            self.junction_frames = 0
+            if junction.kind == Junction.STRAIGHT:
+                self.turn = None  # Перекрёсток пройден
+
+        # Поворот на ходу: едем на конец ответвления
+        if self.turn == "left" and not isnan(junction.left):
+            return int(junction.left), int(junction.row)
+        if self.turn == "right" and not isnan(junction.right):
+            return int(junction.right), int(junction.row)
+        return center
+
     def follow_line(self, *args):
         """
         Управляет движением робота, следуя линии.
 
-        :param args: Аргументы, содержащие информацию о линии.
+        :param args: Аргументы, содержащие информацию о линии: первый — центр линии (x, y) или None,
+                     второй (в режиме junctions) — тип участка линии (так их передаёт Camera.track).
         """
+        verbose = self.robot.verbose
+        if self.robot.vision:
+            for name, seq, _, result in self.robot.vision.poll():
+                if verbose:
+                    print(f"[+] {name}: {result} (кадр {seq})")
+
+        if len(args) > 1 and args[1] is not None:
+            args = (self.route_center(args[0], args[1]),) + args[1:]
+
+        tracker = self.robot.tracker
         if not args or not args[0]:
-            print("Линия не обнаружена.")
+            if verbose:
+                print("Линия не обнаружена.")
+            if tracker:
+                command = tracker.update(None)
+                if command is None:
+                    self.stop()
+                else:
+                    self.drive(*command)
             return
 
-        line_center = args[0][0]  # Получаем центр линии из аргументов
-        print(f"Центр линии: {line_center}, Центр кадра: {self.robot.camera.work_width // 2}")
+        line_center = args[0]  # Получаем центр линии из аргументов
+        if verbose:
+            print(f"Центр линии: {line_center}, Центр кадра: {self.robot.camera.work_width // 2}")
 
         # Вычисляем угол поворота
         angle = self.calculate_angle(line_center)
-        print(f"Вычисленный угол (с учётом смещения камеры): {angle}")
+        if verbose:
+            print(f"Вычисленный угол (с учётом смещения камеры): {angle}")
+        if tracker:
+            tracker.update(angle, line_center)
+
+        fit = self.robot.camera.fit
+        heading = fit.heading if fit is not None and fit.valid >= 2 else 0.0
+        self.drive(angle, self.speed_scale(), heading)
+
+    def drive(self, angle: float, scale: float = 1.0, heading: float = 0.0):
+        """
+        Управляет шасси робота: через регулятор, если он настроен, иначе напрямую.
 
-        # Управляем шасси робота
-        self.robot.chassis.direction(angle)
+        :param angle: Угол на линию, градусы.
+        :param scale: Множитель мощности.
+        :param heading: Направление линии впереди (для регулятора).
+        """
+        if self.robot.controller:
+            self.robot.controller.update(angle, heading, scale)
+        else:
+            self.robot.chassis.direction(angle, scale)
+
+    def stop(self):
+        """
+        Останавливает шасси: через регулятор, если он настроен (моторы пишет только поток его тактов,
+        остановка из потока обработки кадров гонялась бы с ним), иначе напрямую.
+        """
+        if self.robot.controller:
+            self.robot.controller.halt()  # Со следующего такта мощности нулевые
+        else:
+            self.robot.chassis.stop()
@@ -0,0 +1,171 @@
+import json
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, fields
+from typing import Dict, Optional, Tuple
+
+import cv2
+
+
+@dataclass
+class CaptureProfile:
+    """
+    Параметры захвата камеры. Нулевые и пустые значения оставляют настройку драйвера.
+    """
+    width: int = 0  # Ширина кадра
+    height: int = 0  # Высота кадра
+    fps: float = 0  # Частота кадров
+    fourcc: str = ""  # Формат пикселей: "MJPG" или "YUYV"
+    buffer_size: int = 0  # Размер буфера драйвера (1 — минимальная задержка)
+    exposure: Optional[float] = None  # Фиксированная экспозиция (отключает автоэкспозицию)
+    gray: bool = False  # Только яркость (Y) без преобразования в BGR; требует fourcc="YUYV"
+
+    def apply(self, cap: cv2.VideoCapture) -> None:
+        """
+        Применяет параметры к открытой камере (формат задаётся первым: от него зависят доступные размеры).
+
+        :param cap: Открытый источник видео.
+        """
+        if self.fourcc:
+            cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*self.fourcc))
+        if self.width and self.height:
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        if self.fps:
+            cap.set(cv2.CAP_PROP_FPS, self.fps)
+        if self.buffer_size:
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, self.buffer_size)
+        if self.exposure is not None:
+            cap.set(cv2.CAP_PROP_AUTO_EXPOSURE, 1)  # V4L2: 1 — ручная экспозиция, 3 — автоматическая
+            cap.set(cv2.CAP_PROP_EXPOSURE, self.exposure)
+        if self.gray:
+            cap.set(cv2.CAP_PROP_CONVERT_RGB, 0)  # Кадр YUYV отдаётся как есть (2 канала: Y и U/V)
+
+    @classmethod
+    def load(cls, path: str) -> "CaptureProfile":
+        """
+        Загружает профиль из JSON-файла.
+
+        :param path: Путь к файлу.
+        """
+        with open(path) as f:
+            data = json.load(f)
+        names = {field.name for field in fields(cls)}
+        return cls(**{key: value for key, value in data.items() if key in names})
+
+
+# Готовые профили захвата
+PROFILES: Dict[str, CaptureProfile] = {
+    "default": CaptureProfile(),
+    "mjpg-640": CaptureProfile(640, 480, 30, "MJPG", 1),
+    "yuyv-640": CaptureProfile(640, 480, 30, "YUYV", 1),
+    "yuyv-640-gray": CaptureProfile(640, 480, 30, "YUYV", 1, gray=True),
+    "yuyv-320-gray": CaptureProfile(320, 240, 60, "YUYV", 1, gray=True),
+    "mjpg-1280": CaptureProfile(1280, 720, 30, "MJPG", 1),
+}
+
+
+class FrameGrabber:
+    """
+    Фоновый захват кадров: поток постоянно читает камеру и хранит только самые свежие кадры
+    в кольцевом буфере ограниченного размера (старые кадры вытесняются).
+    """
+
+    def __init__(self, cap: cv2.VideoCapture, size: int = 2):
+        """
+        Инициализация фонового захвата.
+
+        :param cap: Открытый источник видео.
+        :param size: Размер кольцевого буфера кадров.
+        """
+        self.cap = cap
+        self.buffer: deque = deque(maxlen=max(1, size))  # Кольцевой буфер (timestamp, кадр)
+        self.cond = threading.Condition()
+        self.thread: Optional[threading.Thread] = None
+        self.running = False
+        self.timestamp: float = 0.0  # Время захвата последнего выданного кадра
+
+        # Счётчики кадров
+        self.captured = 0  # Прочитано с камеры
+        self.dropped = 0  # Вытеснено без обработки
+        self.processed = 0  # Выдано на обработку
+        self.started_at = 0.0
+
+    def start(self) -> "FrameGrabber":
+        """
+        Запускает поток захвата.
+        """
+        self.running = True
+        self.started_at = time.monotonic()
+        self.thread = threading.Thread(target=self._run, name="frame-grabber", daemon=True)
+        self.thread.start()
+        return self
+
+    def _run(self):
+        """
+        Цикл захвата: читает кадры и кладёт их в буфер, вытесняя самые старые.
+        """
+        while self.running:
+            ret, frame = self.cap.read()
+            timestamp = time.monotonic()
+            with self.cond:
+                if not ret:
+                    self.running = False
+                    self.cond.notify_all()
+                    break
+                if len(self.buffer) == self.buffer.maxlen:
+                    self.dropped += 1  # Самый старый кадр будет вытеснен
+                self.buffer.append((timestamp, frame))
+                self.captured += 1
+                self.cond.notify()
+
+    def read(self, timeout: Optional[float] = None) -> Tuple[bool, Optional[cv2.Mat]]:
+        """
+        Возвращает самый свежий кадр, ожидая его появления. Более старые кадры отбрасываются.
+        Задержка камеры (запуск, сбой USB) не считается концом потока: (False, None) возвращается
+        только после остановки захвата.
+
+        :param timeout: Максимальное время ожидания кадра в секундах (None — пока идёт захват).
+        :return: Пара (успех, кадр) в формате cv2.VideoCapture.read().
+        :raises TimeoutError: Кадр не получен за timeout, захват продолжается.
+        """
+        with self.cond:
+            self.cond.wait_for(lambda: self.buffer or not self.running, timeout)
+            if not self.buffer:
+                if self.running:
+                    raise TimeoutError(f"кадр не получен за {timeout} сек")
+                return False, None
+            self.timestamp, frame = self.buffer.pop()
+            self.dropped += len(self.buffer)  # Устаревшие кадры не обрабатываются
+            self.buffer.clear()
+            self.processed += 1
+        return True, frame
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Возвращает счётчики кадров и частоты в кадрах в секунду.
+
+        :return: Словарь со счётчиками captured/dropped/processed и их FPS.
+        """
+        elapsed = max(time.monotonic() - self.started_at, 1e-6)
+        with self.cond:
+            return {
+                "captured": self.captured,
+                "dropped": self.dropped,
+                "processed": self.processed,
+                "captured_fps": self.captured / elapsed,
+                "dropped_fps": self.dropped / elapsed,
+                "processed_fps": self.processed / elapsed,
+            }
+
+    def stop(self):
+        """
+        Останавливает поток захвата.
+        """
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()  # Ожидающий read возвращает (False, None)
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+            self.thread = None
@@ -0,0 +1,320 @@
+import json
+import threading
+import time
+from bisect import bisect_right
+from dataclasses import asdict, dataclass, fields
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .hardware import Chassis, Imu
+
+
+@dataclass
+class ControllerConfig:
+    """
+    Параметры регулятора движения по линии.
+    """
+    max_power: float = 0.3  # Максимальная мощность моторов
+    k: float = 1.5  # Коэффициент перевода угла в разность мощностей (как в Chassis)
+    kp: float = 1.0  # Пропорциональный коэффициент
+    ki: float = 0.0  # Интегральный коэффициент
+    kd: float = 0.0  # Дифференциальный коэффициент
+    kff: float = 0.0  # Упреждение по направлению линии впереди (look-ahead)
+    period: float = 0.01  # Период такта регулятора, сек
+    output_limit: float = 90.0  # Ограничение выхода регулятора, градусы
+    integral_limit: float = 30.0  # Ограничение интегральной суммы, градусы * сек
+    d_alpha: float = 0.3  # Коэффициент фильтра производной (0..1], 1 — без фильтра
+    hold: float = 0.1  # Максимальное время экстраполяции угла между кадрами, сек
+    timeout: float = 0.5  # Остановка моторов, если кадров нет дольше, сек
+    fusion: float = 0.5  # Вес угла камеры в комплементарном фильтре (1 — угол камеры, гироскоп только между кадрами)
+    imu_timeout: float = 0.05  # Без пакетов IMU дольше, сек, угол экстраполируется по камере
+
+    @classmethod
+    def load(cls, path: str) -> "ControllerConfig":
+        """
+        Загружает параметры из JSON-файла (неуказанные поля берутся по умолчанию).
+
+        :param path: Путь к файлу.
+        """
+        with open(path) as f:
+            data = json.load(f)
+        names = {field.name for field in fields(cls)}
+        return cls(**{key: value for key, value in data.items() if key in names})
+
+    def save(self, path: str) -> None:
+        """
+        Сохраняет параметры в JSON-файл.
+
+        :param path: Путь к файлу.
+        """
+        with open(path, "w") as f:
+            json.dump(asdict(self), f, indent=4)
+
+    @classmethod
+    def from_argv(cls, argv: Sequence[str]) -> "ControllerConfig":
+        """
+        Параметры из командной строки: `<port> <max_power> <k>` или `<config.json>`
+        (порт платы передаётся в Robot, см. main.py).
+
+        :param argv: Аргументы командной строки (sys.argv).
+        """
+        if len(argv) == 2 and argv[1].endswith(".json"):
+            return cls.load(argv[1])
+        return cls(max_power=float(argv[2]), k=float(argv[3]))
+
+
+class PID:
+    """
+    ПИД-регулятор с ограничением интеграла (anti-windup) и фильтрацией производной.
+    """
+
+    def __init__(self, kp: float, ki: float, kd: float, limit: float, integral_limit: float, d_alpha: float):
+        """
+        :param kp: Пропорциональный коэффициент.
+        :param ki: Интегральный коэффициент.
+        :param kd: Дифференциальный коэффициент.
+        :param limit: Ограничение выхода по модулю.
+        :param integral_limit: Ограничение интегральной суммы по модулю.
+        :param d_alpha: Коэффициент экспоненциального фильтра производной.
+        """
+        self.kp, self.ki, self.kd = kp, ki, kd
+        self.limit = limit
+        self.integral_limit = integral_limit
+        self.d_alpha = d_alpha
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Сбрасывает состояние регулятора.
+        """
+        self.integral = 0.0
+        self.derivative = 0.0
+        self.previous: Optional[float] = None
+
+    def update(self, error: float, dt: float) -> float:
+        """
+        Вычисляет выход регулятора.
+
+        :param error: Ошибка регулирования.
+        :param dt: Время с предыдущего вызова, сек.
+        :return: Выход регулятора, ограниченный по модулю.
+        """
+        if self.previous is not None and dt > 0:
+            raw = (error - self.previous) / dt
+            self.derivative += self.d_alpha * (raw - self.derivative)
+        self.previous = error
+
+        p = self.kp * error
+        d = self.kd * self.derivative
+        integral = min(max(self.integral + error * dt, -self.integral_limit), self.integral_limit)
+        output = p + self.ki * integral + d
+
+        # Интегрируем, только если выход не в насыщении или ошибка выводит из него
+        if abs(output) <= self.limit or output * error < 0:
+            self.integral = integral
+        output = p + self.ki * self.integral + d
+        return min(max(output, -self.limit), self.limit)
+
+
+class TickStats:
+    """
+    Гистограмма длительности тактов регулятора и счётчик опозданий.
+    """
+
+    def __init__(self, period: float, edges: Sequence[float] = (0.5, 1, 2, 5, 10, 20, 50, 100)):
+        """
+        :param period: Номинальный период такта, сек.
+        :param edges: Границы корзин гистограммы интервалов между тактами, мс.
+        """
+        self.period = period
+        self.edges: List[float] = list(edges)
+        self.counts: List[int] = [0] * (len(self.edges) + 1)
+        self.ticks = 0
+        self.overruns = 0  # Такты, которые не уложились в период
+        self.max_interval = 0.0
+
+    def add(self, interval: float, duration: float) -> None:
+        """
+        Учитывает такт.
+
+        :param interval: Время с предыдущего такта, сек.
+        :param duration: Время вычисления такта, сек.
+        """
+        self.ticks += 1
+        self.counts[bisect_right(self.edges, interval * 1000)] += 1
+        self.max_interval = max(self.max_interval, interval)
+        if duration > self.period or interval > 2 * self.period:
+            self.overruns += 1
+
+    def summary(self) -> Dict[str, object]:
+        """
+        Сводка по тактам.
+        """
+        labels = [f"<{edge}ms" for edge in self.edges] + [f">={self.edges[-1]}ms"]
+        return {
+            "ticks": self.ticks,
+            "overruns": self.overruns,
+            "max_interval_ms": self.max_interval * 1000,
+            "histogram": dict(zip(labels, self.counts)),
+        }
+
+
+class Controller:
+    """
+    Регулятор движения по линии с фиксированной частотой тактов в отдельном потоке.
+    Угол от камеры поступает с частотой кадров; между кадрами угол экстраполируется по скорости его изменения,
+    а при наличии гироскопа — уменьшается на поворот робота по курсу (комплементарный фильтр).
+    """
+
+    def __init__(self, chassis: Chassis, config: ControllerConfig, imu: Optional[Imu] = None):
+        """
+        :param chassis: Шасси робота.
+        :param config: Параметры регулятора.
+        :param imu: Гироскоп платы (None — только камера).
+        """
+        self.chassis = chassis
+        self.config = config
+        self.imu = imu
+        self.pid = PID(config.kp, config.ki, config.kd, config.output_limit, config.integral_limit, config.d_alpha)
+        self.stats = TickStats(config.period)
+        self.lock = threading.Lock()
+        self.thread: Optional[threading.Thread] = None
+        self.running = False
+
+        # Последнее измерение камеры
+        self.measured_at: Optional[float] = None
+        self.angle = 0.0
+        self.rate = 0.0  # Скорость изменения угла, град/сек
+        self.heading = 0.0  # Направление линии впереди, градусы
+        self.scale = 1.0  # Множитель мощности
+        self.last_tick: Optional[float] = None
+        self.idle = False  # Моторы остановлены по отсутствию оценки
+
+        # Оценка комплементарного фильтра: угол на момент, когда курс был равен fused_yaw
+        self.fused: Optional[float] = None
+        self.fused_yaw = 0.0
+
+    def update(self, angle: float, heading: float = 0.0, scale: float = 1.0, timestamp: Optional[float] = None) -> None:
+        """
+        Передаёт регулятору новое измерение с камеры.
+
+        :param angle: Угол отклонения линии, градусы.
+        :param heading: Направление линии впереди, градусы.
+        :param scale: Множитель мощности.
+        :param timestamp: Время измерения (time.monotonic()).
+        """
+        now = time.monotonic() if timestamp is None else timestamp
+        imu = self.imu if self.imu is not None and self.imu.fresh(time.monotonic(), self.config.imu_timeout) else None
+        with self.lock:
+            continued = self.measured_at is not None and now - self.measured_at < self.config.timeout
+            if continued:
+                dt = now - self.measured_at
+                if dt > 0:
+                    self.rate = (angle - self.angle) / dt
+            else:
+                self.rate = 0.0
+            if imu is None:
+                self.fused = None
+            else:
+                # Угол камеры переносится на текущий курс: поворот робота против часовой стрелки уменьшает угол
+                yaw = imu.yaw
+                measured = angle - (yaw - imu.yaw_at(now))
+                if continued and self.fused is not None:
+                    predicted = self.fused - (yaw - self.fused_yaw)
+                    measured = predicted + self.config.fusion * (measured - predicted)
+                self.fused, self.fused_yaw = measured, yaw
+            self.measured_at = now
+            self.angle = angle
+            self.heading = heading
+            self.scale = scale
+
+    def halt(self) -> None:
+        """
+        Сбрасывает измерение: со следующего такта моторы остановлены (до нового update).
+        """
+        with self.lock:
+            self.measured_at = None
+
+    def estimate(self, now: float) -> Optional[Tuple[float, float, float]]:
+        """
+        Оценка угла на момент now.
+
+        :return: (угол, направление впереди, множитель мощности) или None, если измерение устарело.
+        """
+        with self.lock:
+            if self.measured_at is None:
+                return None
+            age = now - self.measured_at
+            if age > self.config.timeout:
+                return None
+            if self.fused is not None and self.imu.fresh(now, self.config.imu_timeout):
+                angle = self.fused - (self.imu.yaw - self.fused_yaw)
+            else:
+                angle = self.angle + self.rate * min(age, self.config.hold)
+            return angle, self.heading, self.scale
+
+    def tick(self, now: Optional[float] = None) -> Optional[Tuple[float, float]]:
+        """
+        Один такт регулятора: вычисляет и передаёт мощности на шасси.
+
+        :param now: Время такта (time.monotonic()).
+        :return: Мощности (левая, правая) или None, если моторы остановлены.
+        """
+        now = time.monotonic() if now is None else now
+        dt = now - self.last_tick if self.last_tick is not None else self.config.period
+        self.last_tick = now
+
+        estimate = self.estimate(now)
+        if estimate is None:
+            # Нет свежих данных с камеры — останавливаемся: при потере оценки команда остановки
+            # отправляется принудительно, на последующих тактах — через кэш (без повторной записи)
+            self.pid.reset()
+            if self.idle:
+                self.chassis.set_power(0, 0)
+            else:
+                self.chassis.stop()
+                self.idle = True
+            return None
+        self.idle = False
+
+        angle, heading, scale = estimate
+        output = self.pid.update(angle, dt) + self.config.kff * heading
+        return self.chassis.steer(output / 90 * self.config.k, scale)
+
+    def _run(self):
+        """
+        Цикл тактов с фиксированным периодом.
+        """
+        period = self.config.period
+        deadline = time.monotonic()
+        previous = deadline
+        while self.running:
+            started = time.monotonic()
+            self.tick(started)
+            finished = time.monotonic()
+            self.stats.add(started - previous, finished - started)
+            previous = started
+
+            deadline += period
+            if deadline < finished:
+                deadline = finished  # Опоздали — не пытаемся догнать пропущенные такты
+            time.sleep(deadline - finished)
+
+    def start(self) -> "Controller":
+        """
+        Запускает поток регулятора.
+        """
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="controller", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        """
+        Останавливает поток регулятора и моторы.
+        """
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+            self.thread = None
+            print(f"[+] Такты регулятора: {self.stats.summary()}")
+        self.chassis.stop()
@@ -1,12 +1,53 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import Future
+from enum import IntEnum
+from typing import Callable, Dict, List, Optional, Set, Tuple, Union
+
 import pyfirmata
 
+from .protocol import (IMU, MAN_CATCH, MAN_FLAG_ABORTED, MAN_FLAG_GRIP, MAN_FLAG_TIMEOUT, MAN_GRIP,
+                       MAN_POSE, MAN_STATE, MAN_STOP, SerialLink)
+from .telemetry import NullTelemetry
+
+
+def port_message(port: pyfirmata.Port) -> bytes:
+    """
+    Формирует сообщение Firmata с текущим состоянием всех выходов цифрового порта.
+
+    :param port: Порт платы (8 цифровых пинов).
+    :return: Сообщение DIGITAL_MESSAGE.
+    """
+    mask = 0
+    for pin in port.pins:
+        if pin.mode == pyfirmata.OUTPUT and pin.value == 1:
+            mask |= 1 << (pin.pin_number - port.port_number * 8)
+    return bytes([pyfirmata.DIGITAL_MESSAGE + port.port_number, mask % 128, mask >> 7])
+
+
+def send_batch(board: pyfirmata.Arduino, ports: Set[pyfirmata.Port], pwm: bytes) -> None:
+    """
+    Отправляет изменения нескольких моторов одной записью в порт: сначала направления, затем ШИМ.
+
+    :param board: Плата Arduino.
+    :param ports: Цифровые порты, в которых изменились пины направления.
+    :param pwm: Сообщения ШИМ.
+    """
+    payload = b"".join(port_message(port) for port in ports) + pwm
+    if payload:
+        board.sp.write(payload)
+
 
 class Motor:
     """
     Класс для управления двигателем через Arduino с использованием библиотеки pyfirmata.
+    Последнее записанное состояние пинов кэшируется: на плату отправляются только изменения
+    (state = None — состояние платы неизвестно, отправляются все пины).
     """
 
-    def __init__(self, board: pyfirmata.Arduino, inA: int, inB: int, pwm: int):
+    def __init__(self, board: pyfirmata.Arduino, inA: int, inB: int, pwm: int, resolution: int = 255):
         """
         Инициализация двигателя.
 
@@ -14,11 +55,55 @@ class Motor:
         :param inA: Номер цифрового пина для направления "вперёд".
         :param inB: Номер цифрового пина для направления "назад".
         :param pwm: Номер пина для управления скоростью через ШИМ.
+        :param resolution: Разрешение ШИМ платы (255 для analogWrite).
         """
+        self.board = board
         self.inA: pyfirmata.Pin = board.digital[inA]  # Пин для направления "вперёд"
         self.inB: pyfirmata.Pin = board.digital[inB]  # Пин для направления "назад"
         self.pwm: pyfirmata.Pin = board.digital[pwm]  # Пин для ШИМ-сигнала
         self.pwm.mode = pyfirmata.PWM  # Установка пина в режим ШИМ
+        self.resolution = resolution
+        self.state: Optional[Tuple[int, int, int]] = None  # Последнее записанное (inA, inB, ШИМ)
+
+    def quantize(self, power: float) -> Tuple[int, int, int]:
+        """
+        Переводит мощность в состояние пинов с учётом разрешения ШИМ.
+
+        :param power: Мощность двигателя в диапазоне от -1.0 до 1.0.
+        :return: Значения (inA, inB, ШИМ).
+        """
+        duty = min(int(round(abs(power) * self.resolution)), self.resolution)
+        if duty == 0:
+            return 0, 0, 0  # Полная остановка двигателя
+        if power > 0:
+            return 1, 0, duty  # Вращение вперёд
+        return 0, 1, duty  # Вращение назад
+
+    def stage(self, power: float, ports: Set[pyfirmata.Port]) -> bytes:
+        """
+        Готовит изменения пинов для пакетной отправки.
+
+        :param power: Мощность двигателя в диапазоне от -1.0 до 1.0.
+        :param ports: Множество, в которое добавляются порты с изменёнными пинами направления.
+        :return: Сообщение ШИМ (пустое, если скважность не изменилась).
+        """
+        state = self.quantize(power)
+        if state == self.state:
+            return b""
+
+        inA, inB, duty = state
+        for pin, value in ((self.inA, inA), (self.inB, inB)):
+            if self.state is None or pin.value != value:
+                pin.value = value
+                ports.add(pin.port)
+
+        message = b""
+        if self.state is None or self.state[2] != duty:
+            self.pwm.value = duty / self.resolution
+            value = int(round(duty * 255 / self.resolution))  # Firmata передаёт ШИМ в 8 битах
+            message = bytes([pyfirmata.ANALOG_MESSAGE + self.pwm.pin_number, value % 128, value >> 7])
+        self.state = state
+        return message
 
     def set_power(self, power: float) -> None:
         """
@@ -27,23 +112,9 @@ class Motor:
         :param power: Мощность двигателя в диапазоне от -1.0 до 1.0.
                       Положительное значение — вперёд, отрицательное — назад, 0 — стоп.
         """
-        if power == 0:
-            # Полная остановка двигателя
-            self.inA.write(0)
-            self.inB.write(0)
-            self.pwm.write(0)
-        elif power > 0:
-            # Вращение вперёд
-            power = abs(power)
-            self.inA.write(1)  # Направление "вперёд"
-            self.inB.write(0)  # Направление "назад" выключено
-            self.pwm.write(power)  # Установка скорости через ШИМ
-        else:
-            # Вращение назад
-            power = abs(power)
-            self.inA.write(0)  # Направление "вперёд" выключено
-            self.inB.write(1)  # Направление "назад"
-            self.pwm.write(power)  # Установка скорости через ШИМ
+        ports: Set[pyfirmata.Port] = set()
+        pwm = self.stage(power, ports)
+        send_batch(self.board, ports, pwm)
 
 
 class Chassis:
@@ -51,7 +122,8 @@ class Chassis:
     Класс для управления шасси робота с двумя моторами.
     """
 
-    def __init__(self, left_side: Motor, right_side: Motor, max_power: float = 0.3, k: float = 1.5):
+    def __init__(self, left_side: Motor, right_side: Motor, max_power: float = 0.3, k: float = 1.5,
+                 verbose: bool = True):
         """
         Инициализация шасси.
 
@@ -59,39 +131,58 @@ class Chassis:
         :param right_side: Мотор, управляющий правой стороной.
         :param max_power: Максимальная мощность, передаваемая на моторы (по умолчанию 0.3).
         :param k: Коэффициент коррекции мощности при поворотах.
+        :param verbose: Выводить рассчитанные мощности на каждом кадре.
         """
         self.left: Motor = left_side
         self.right: Motor = right_side
         self.k: float = k
         self.statpower: float = max_power
+        self.verbose = verbose
+        self.telemetry = NullTelemetry()  # Замеры времени отправки команд (robot.telemetry)
+        # Команды приходят из нескольких потоков (регулятор, обработчик кадров, остановка):
+        # кэш состояния моторов и запись в порт — под одной блокировкой
+        self.lock = threading.RLock()
+        self.held = False  # Остановлено с hold=True: такты регулятора (steer) больше не пишут в моторы
 
-    def direction(self, angle: float) -> None:
+    def direction(self, angle: float, scale: float = 1.0) -> None:
         """
         Устанавливает направление движения шасси.
 
         :param angle: Угол поворота в диапазоне от -90 до 90.
                       Отрицательные значения — поворот влево, положительные — вправо.
+        :param scale: Множитель максимальной мощности (например, для снижения скорости перед поворотом).
+        """
+        lpower, rpower = self.steer(angle / 90 * self.k, scale)
+
+        # Вывод рассчитанных мощностей в консоль (для отладки)
+        if self.verbose:
+            print(lpower, rpower)
+
+    def steer(self, turn: float, scale: float = 1.0) -> Tuple[float, float]:
         """
-        sp = self.statpower  # Максимальная мощность
+        Поворот с заданной относительной разницей мощностей сторон.
 
-        # Расчёт мощности для левого и правого мотора в зависимости от угла
-        if angle < 0:
-            lpower = sp - (sp * abs(angle) / 90 * self.k)  # Уменьшаем мощность левого мотора
-            if lpower < 0:
-                lpower = 0  # Минимальная мощность — 0
+        :param turn: Доля снижения мощности одной из сторон: отрицательные значения уменьшают мощность
+                     левого мотора, положительные — правого (1.0 — сторона полностью остановлена).
+        :param scale: Множитель максимальной мощности.
+        :return: Мощности (левая, правая).
+        """
+        sp = self.statpower * scale  # Максимальная мощность
+
+        # Расчёт мощности для левого и правого мотора
+        if turn < 0:
+            lpower = max(sp - sp * abs(turn), 0)  # Уменьшаем мощность левого мотора (минимум — 0)
             rpower = sp  # Правая сторона работает на максимальной мощности
         else:
-            rpower = sp - (sp * abs(angle) / 90 * self.k)  # Уменьшаем мощность правого мотора
-            if rpower < 0:
-                rpower = 0  # Минимальная мощность — 0
+            rpower = max(sp - sp * abs(turn), 0)  # Уменьшаем мощность правого мотора (минимум — 0)
             lpower = sp  # Левая сторона работает на максимальной мощности
 
-        # Вывод рассчитанных мощностей в консоль (для отладки)
-        print(lpower, rpower)
-
         # Передача рассчитанной мощности на моторы (отрицательная мощность — реверс)
-        self.left.set_power(-1 * lpower)
-        self.right.set_power(-1 * rpower)
+        with self.lock:
+            if self.held:
+                return 0.0, 0.0
+            self.set_power(-1 * lpower, -1 * rpower)
+        return lpower, rpower
 
     def set_power(self, lpower: float, rpower: float) -> None:
         """
@@ -100,13 +191,298 @@ class Chassis:
         :param lpower: Мощность для левого мотора в диапазоне от -1.0 до 1.0.
         :param rpower: Мощность для правого мотора в диапазоне от -1.0 до 1.0.
         """
-        self.left.set_power(lpower)
-        self.right.set_power(rpower)
+        # Изменения обоих моторов отправляются одной записью в порт
+        t = self.telemetry.now()
+        with self.lock:
+            ports: Set[pyfirmata.Port] = set()
+            pwm = self.left.stage(lpower, ports) + self.right.stage(rpower, ports)
+            send_batch(self.left.board, ports, pwm)
+        self.telemetry.record("actuate", t)
+        self.telemetry.actuated()
+
+    def stop(self, hold: bool = False) -> None:
+        """
+        Останавливает оба мотора. Команда отправляется всегда, без сравнения с кэшем:
+        кэш мог разойтись с платой, если запись в порт была прервана.
+
+        :param hold: Не применять последующие команды steer (завершение работы: зависший такт регулятора
+                     не должен снова запустить моторы после остановки).
+        """
+        with self.lock:
+            self.held = self.held or hold
+            for motor in (self.left, self.right):
+                if motor:
+                    motor.state = None
+            self.set_power(0, 0)
+
+
+class LinkChassis(Chassis):
+    """
+    Шасси, управляемое по двоичному протоколу (robot.protocol): мощности обоих моторов
+    передаются одним пакетом на такт, пины моторов задаются прошивкой платы.
+    """
+
+    def __init__(self, link: SerialLink, max_power: float = 0.3, k: float = 1.5, verbose: bool = True):
+        """
+        :param link: Канал связи с платой.
+        :param max_power: Максимальная мощность, передаваемая на моторы.
+        :param k: Коэффициент коррекции мощности при поворотах.
+        :param verbose: Выводить рассчитанные мощности на каждом кадре.
+        """
+        super().__init__(None, None, max_power, k, verbose)
+        self.link = link
+
+    def set_power(self, lpower: float, rpower: float) -> None:
+        """
+        Отправляет мощности левого и правого мотора одним пакетом.
+
+        :param lpower: Мощность для левого мотора в диапазоне от -1.0 до 1.0.
+        :param rpower: Мощность для правого мотора в диапазоне от -1.0 до 1.0.
+        """
+        t = self.telemetry.now()
+        self.link.drive(lpower, rpower)
+        self.telemetry.record("actuate", t)
+        self.telemetry.actuated()
+
+
+class ManState(IntEnum):
+    """
+    Состояния манипулятора в прошивке (arduino/manipulator.h).
+    """
+    IDLE = 0  # Команда выполнена
+    ZERO_MID = 1  # Средний сервопривод в нуле
+    ZERO_LOW = 2  # Нижний сервопривод в нуле
+    MOVE = 3  # Переход в заданное положение
+    GRIP = 4  # Сжатие или разжатие клешни
+    APPROACH = 5  # Подъезд к банке до касания датчика
+
+
+class ManipulatorError(Exception):
+    """
+    Команда манипулятора не выполнена: прервана, заменена новой или банка не найдена.
+    """
+
+
+class Manipulator:
+    """
+    Манипулятор, управляемый по двоичному протоколу: последовательности сервоприводов и автозахват
+    выполняются прошивкой без блокировки цикла платы, каждая команда возвращает Future,
+    который завершается по сообщению MAN_STATE о переходе в IDLE.
+    """
+
+    # Положения (нижний, средний сервопривод), как в arduino/manipulator.h
+    POSES: Dict[str, Tuple[int, int]] = {
+        "default": (0, 80),
+        "zero": (0, 0),
+        "work": (80, 0),
+        "up": (0, 30),
+    }
+
+    def __init__(self, link: SerialLink, verbose: bool = True):
+        """
+        :param link: Канал связи с платой.
+        :param verbose: Выводить переходы состояний.
+        """
+        self.link = link
+        self.verbose = verbose
+        self.lock = threading.Lock()
+        self.state = ManState.IDLE
+        self.flags = 0
+        self.seq = 0  # Номер выполняемой команды
+        self.kind = 0  # Тип выполняемой команды
+        self.future: Optional[Future] = None  # Ожидание выполняемой команды
+        self.idle = threading.Event()
+        self.idle.set()
+        self.handlers: List[Callable[[ManState, int], None]] = []
+        link.subscribe(MAN_STATE, self._state)
 
-    def stop(self) -> None:
+    @property
+    def holding(self) -> bool:
+        """
+        Клешня сжата.
         """
-        Останавливает оба мотора.
+        return bool(self.flags & MAN_FLAG_GRIP)
+
+    def subscribe(self, handler: Callable[[ManState, int], None]) -> None:
+        """
+        Подписывает обработчик на изменения состояния (вызывается из потока чтения канала).
+
+        :param handler: Функция (состояние, флаги).
+        """
+        self.handlers.append(handler)
+
+    def pose(self, low: Union[int, str], mid: Optional[int] = None) -> Future:
+        """
+        Переводит манипулятор в положение: сначала средний, затем нижний сервопривод в ноль, затем в цель.
+
+        :param low: Угол нижнего сервопривода (градусы) или имя положения из POSES.
+        :param mid: Угол среднего сервопривода (градусы).
+        """
+        if isinstance(low, str):
+            low, mid = self.POSES[low]
+        return self._command(MAN_POSE, low, mid)
+
+    def grip(self, closed: bool = True) -> Future:
+        """
+        Сжимает или разжимает клешню.
+
+        :param closed: True — сжать, False — разжать.
+        """
+        return self._command(MAN_GRIP, int(closed))
+
+    def catch(self) -> Future:
+        return self.grip(True)
+
+    def release(self) -> Future:
+        return self.grip(False)
+
+    def auto_catch(self, power: float = 0.4, timeout: float = 3.0) -> Future:
+        """
+        Автозахват банки: манипулятор в рабочее положение, подъезд до касания датчика, захват, подъём.
+        На время подъезда плата не применяет команды DRIVE.
+
+        :param power: Мощность подъезда (0.0..1.0).
+        :param timeout: Время подъезда, сек; без касания команда завершается с ManipulatorError.
         """
-        self.left.set_power(0)
-        self.right.set_power(0)
+        return self._command(MAN_CATCH, round(max(0.0, min(1.0, power)) * 255),
+                             max(0, min(0xFFFF, round(timeout * 1000))))
 
+    def stop(self, release: bool = False) -> Future:
+        """
+        Прерывает выполняемую команду и останавливает моторы, если шёл подъезд.
+
+        :param release: Также разжать клешню.
+        """
+        return self._command(MAN_STOP, int(release))
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Ожидает завершения выполняемой команды.
+
+        :param timeout: Время ожидания, сек (None — без ограничения).
+        :return: Манипулятор свободен.
+        """
+        return self.idle.wait(timeout)
+
+    def _command(self, kind: int, *values) -> Future:
+        future = Future()
+        future.set_running_or_notify_cancel()
+        # Отправка и регистрация под одной блокировкой: ответ платы не может опередить регистрацию
+        with self.lock:
+            previous = self.future
+            self.idle.clear()
+            self.seq = self.link.send(kind, *values)
+            self.kind, self.future = kind, future
+        if previous and not previous.done():
+            previous.set_exception(ManipulatorError("заменена новой командой"))
+        return future
+
+    def _state(self, _: int, values: tuple):
+        _, state, flags, seq = values
+        state = ManState(state)
+        future = None
+        with self.lock:
+            changed = (state, flags) != (self.state, self.flags)
+            self.state, self.flags = state, flags
+            if seq == self.seq and state == ManState.IDLE:
+                future, self.future = self.future, None
+                self.idle.set()
+            kind = self.kind
+        if future and not future.done():
+            if flags & MAN_FLAG_TIMEOUT:
+                future.set_exception(ManipulatorError("банка не найдена"))
+            elif flags & MAN_FLAG_ABORTED and kind != MAN_STOP:  # Для stop прерывание — ожидаемый результат
+                future.set_exception(ManipulatorError("команда прервана"))
+            else:
+                future.set_result(flags)
+        if changed:
+            if self.verbose:
+                print(f"[+] Manipulator: {state.name} flags={flags:#04x}")
+            for handler in self.handlers:
+                handler(state, flags)
+
+
+class Imu:
+    """
+    Гироскоп платы (arduino/gyro.h): пакеты IMU со скоростью рыскания и курсом, проинтегрированным платой,
+    принимаются потоком чтения канала; курс хранится с временем приёма для привязки к моменту кадра.
+    """
+
+    def __init__(self, link: SerialLink, invert: bool = False, history: float = 0.5):
+        """
+        :param link: Канал связи с платой.
+        :param invert: Гироскоп установлен осью Z вниз (курс растёт при повороте по часовой стрелке).
+        :param history: Длительность хранимой истории курса, сек.
+        """
+        self.sign = -1.0 if invert else 1.0
+        self.history = history
+        self.lock = threading.Lock()
+        self.rate = 0.0  # Скорость рыскания, град/с (против часовой стрелки — положительная)
+        self.yaw = 0.0  # Курс от включения платы, град
+        self.received_at: Optional[float] = None  # Время приёма последнего пакета (time.monotonic())
+        self.times: deque = deque()  # История: время приёма
+        self.yaws: deque = deque()  # История: курс
+
+        # Статистика
+        self.samples = 0
+        self.lost = 0
+        self.seq: Optional[int] = None
+        self.board_time: Optional[int] = None  # Время платы первого пакета, мкс
+        self.board_span = 0  # Время платы от первого пакета, мкс
+        link.subscribe(IMU, self._sample)
+
+    def fresh(self, now: float, timeout: float = 0.05) -> bool:
+        """
+        Последний пакет получен не раньше чем timeout секунд назад.
+        """
+        received = self.received_at
+        return received is not None and now - received <= timeout
+
+    def yaw_at(self, t: float) -> float:
+        """
+        Курс на момент t (линейная интерполяция по истории; вне истории — ближайшее значение).
+
+        :param t: Время (time.monotonic()).
+        """
+        with self.lock:
+            if not self.times:
+                return self.yaw
+            i = bisect_left(self.times, t)
+            if i == 0:
+                return self.yaws[0]
+            if i == len(self.times):
+                return self.yaws[-1]
+            t0, t1 = self.times[i - 1], self.times[i]
+            y0, y1 = self.yaws[i - 1], self.yaws[i]
+            return y0 + (y1 - y0) * (t - t0) / (t1 - t0)
+
+    def _sample(self, seq: int, values: tuple):
+        received = time.monotonic()
+        micros, rate, yaw = values
+        with self.lock:
+            if self.seq is not None:
+                self.lost += (seq - self.seq - 1) & 0xFFFF
+                self.board_span += (micros - self.board_time) & 0xFFFFFFFF
+            self.seq = seq
+            self.board_time = micros
+            self.samples += 1
+            self.rate = self.sign * rate / 100
+            self.yaw = self.sign * yaw / 100
+            self.received_at = received
+            self.times.append(received)
+            self.yaws.append(self.yaw)
+            while self.times[0] < received - self.history:
+                self.times.popleft()
+                self.yaws.popleft()
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Статистика: принято и потеряно пакетов, частота по времени платы (Гц), курс (град).
+        """
+        with self.lock:
+            return {
+                "samples": self.samples,
+                "lost": self.lost,
+                "rate_hz": (self.samples - 1) / (self.board_span / 1e6) if self.board_span else 0.0,
+                "yaw": self.yaw,
+            }
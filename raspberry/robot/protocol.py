@@ -0,0 +1,372 @@
+import os
+import struct
+import threading
+import time
+import tty
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import serial
+
+# Формат пакета: SYNC(2) | тип(1) | номер(2) | данные | CRC-8(1); длина данных определяется типом.
+# Прошивка: arduino/link.h
+SYNC = b"\xa5\x5a"
+HEADER = struct.Struct("<BH")
+
+# Типы пакетов (старший бит — пакеты от платы)
+DRIVE = 0x01  # Мощности моторов: левый, правый (-255..255)
+MAN_POSE = 0x02  # Положение манипулятора: нижний и средний сервоприводы (градусы)
+MAN_GRIP = 0x03  # Клешня: 1 — сжать, 0 — разжать
+MAN_CATCH = 0x04  # Автозахват банки: мощность подъезда (0..255), время подъезда (мс)
+MAN_STOP = 0x05  # Остановка манипулятора: 1 — также разжать клешню
+TELEMETRY = 0x81  # Подтверждение: время платы (мс), флаги, применённые мощности
+MAN_STATE = 0x82  # Состояние манипулятора: время платы (мс), состояние, флаги, номер выполняемой команды
+IMU = 0x83  # Гироскоп, 100 Гц: время платы (мкс), скорость рыскания (0.01 град/с), курс (0.01 град)
+
+# Флаги телеметрии
+FLAG_WATCHDOG = 0x01  # Моторы остановлены из-за отсутствия команд
+FLAG_MANIPULATOR = 0x02  # Моторами управляет автозахват: команды DRIVE не применяются
+
+# Флаги состояния манипулятора (arduino/manipulator.h)
+MAN_FLAG_CAP = 0x01  # Банка коснулась датчика
+MAN_FLAG_GRIP = 0x02  # Клешня сжата
+MAN_FLAG_TIMEOUT = 0x04  # Банка не найдена за время подъезда
+MAN_FLAG_ABORTED = 0x08  # Команда прервана
+
+PAYLOADS: Dict[int, struct.Struct] = {
+    DRIVE: struct.Struct("<hh"),
+    MAN_POSE: struct.Struct("<BB"),
+    MAN_GRIP: struct.Struct("<B"),
+    MAN_CATCH: struct.Struct("<BH"),
+    MAN_STOP: struct.Struct("<B"),
+    TELEMETRY: struct.Struct("<IBhh"),
+    MAN_STATE: struct.Struct("<IBBH"),
+    IMU: struct.Struct("<Ihi"),
+}
+
+
+def _crc8_table() -> List[int]:
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x07) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+        table.append(crc)
+    return table
+
+
+CRC8_TABLE = _crc8_table()
+
+
+def crc8(data: bytes) -> int:
+    """
+    CRC-8 (полином 0x07).
+
+    :param data: Данные.
+    :return: Контрольная сумма.
+    """
+    crc = 0
+    for byte in data:
+        crc = CRC8_TABLE[crc ^ byte]
+    return crc
+
+
+def encode(kind: int, seq: int, *values) -> bytes:
+    """
+    Формирует пакет.
+
+    :param kind: Тип пакета.
+    :param seq: Номер пакета (0..65535).
+    :param values: Поля данных в порядке формата типа.
+    :return: Байты пакета.
+    """
+    body = HEADER.pack(kind, seq & 0xFFFF) + PAYLOADS[kind].pack(*values)
+    return SYNC + body + bytes([crc8(body)])
+
+
+class Decoder:
+    """
+    Потоковый разбор пакетов с пересинхронизацией по SYNC при ошибках.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.errors = 0  # Пакеты с неверной контрольной суммой или неизвестным типом
+
+    def feed(self, data: bytes) -> List[Tuple[int, int, tuple]]:
+        """
+        Добавляет принятые байты.
+
+        :param data: Принятые байты.
+        :return: Список разобранных пакетов (тип, номер, поля).
+        """
+        self.buffer += data
+        packets = []
+        while True:
+            start = self.buffer.find(SYNC)
+            if start < 0:
+                del self.buffer[:max(0, len(self.buffer) - 1)]
+                return packets
+            del self.buffer[:start]
+            if len(self.buffer) < len(SYNC) + HEADER.size:
+                return packets
+
+            kind, seq = HEADER.unpack_from(self.buffer, len(SYNC))
+            payload = PAYLOADS.get(kind)
+            if payload is None:
+                self.errors += 1
+                del self.buffer[:1]
+                continue
+
+            size = len(SYNC) + HEADER.size + payload.size + 1
+            if len(self.buffer) < size:
+                return packets
+            body = bytes(self.buffer[len(SYNC):size - 1])
+            if crc8(body) != self.buffer[size - 1]:
+                self.errors += 1
+                del self.buffer[:1]
+                continue
+
+            packets.append((kind, seq, payload.unpack_from(body, HEADER.size)))
+            del self.buffer[:size]
+
+
+class SerialLink:
+    """
+    Двоичный канал связи с платой: один пакет на такт управления, ответная телеметрия
+    и измерение времени полного оборота (RTT) по номерам пакетов.
+    """
+
+    def __init__(self, port: str, baudrate: int = 115200):
+        """
+        :param port: Последовательный порт платы.
+        :param baudrate: Скорость порта.
+        """
+        self.serial = serial.Serial(port, baudrate, timeout=0.05)
+        self.decoder = Decoder()
+        self.lock = threading.Lock()
+        self.handlers: Dict[int, List[Callable]] = defaultdict(list)
+        self.seq = 0
+        self.pending: Dict[int, float] = {}  # Номер -> время отправки
+        self.telemetry: Optional[tuple] = None  # Последняя телеметрия
+
+        # Статистика RTT
+        self.rtt = 0.0
+        self.rtt_sum = 0.0
+        self.rtt_max = 0.0
+        self.acked = 0
+        self.sent = 0
+
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="serial-link", daemon=True)
+        self.thread.start()
+
+    def subscribe(self, kind: int, handler: Callable[[int, tuple], None]) -> None:
+        """
+        Подписывает обработчик на пакеты типа kind (вызывается из потока чтения).
+
+        :param kind: Тип пакета.
+        :param handler: Функция (номер, поля).
+        """
+        self.handlers[kind].append(handler)
+
+    def send(self, kind: int, *values, ack: Optional[bool] = None) -> int:
+        """
+        Отправляет пакет.
+
+        :param kind: Тип пакета.
+        :param values: Поля данных.
+        :param ack: Плата отвечает на пакет телеметрией: пакет учитывается в статистике и RTT
+            (по умолчанию — только DRIVE; команды манипулятора подтверждаются MAN_STATE).
+        :return: Номер отправленного пакета.
+        """
+        if ack is None:
+            ack = kind == DRIVE
+        with self.lock:
+            self.seq = (self.seq + 1) & 0xFFFF
+            seq = self.seq
+            if ack:
+                self.pending[seq] = time.monotonic()
+                if len(self.pending) > 64:  # Неподтверждённые пакеты считаем потерянными
+                    self.pending.pop(next(iter(self.pending)))
+                self.sent += 1
+            self.serial.write(encode(kind, seq, *values))
+        return seq
+
+    def drive(self, left: float, right: float) -> int:
+        """
+        Отправляет мощности моторов.
+
+        :param left: Мощность левого мотора (-1.0..1.0).
+        :param right: Мощность правого мотора (-1.0..1.0).
+        :return: Номер пакета.
+        """
+        return self.send(DRIVE, _to_pwm(left), _to_pwm(right))
+
+    def _run(self):
+        """
+        Поток чтения: разбирает пакеты платы и вызывает обработчики.
+        """
+        while self.running:
+            try:
+                data = self.serial.read(max(1, self.serial.in_waiting))
+            except (serial.SerialException, OSError):
+                break
+            if not data:
+                continue
+            received = time.monotonic()
+            for kind, seq, values in self.decoder.feed(data):
+                if kind == TELEMETRY:
+                    self._acknowledge(seq, values, received)
+                for handler in self.handlers[kind]:
+                    handler(seq, values)
+
+    def _acknowledge(self, seq: int, values: tuple, received: float):
+        with self.lock:
+            self.telemetry = values
+            sent = self.pending.pop(seq, None)
+            if sent is None:
+                return
+            self.rtt = received - sent
+            self.rtt_sum += self.rtt
+            self.rtt_max = max(self.rtt_max, self.rtt)
+            self.acked += 1
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Статистика канала: отправлено и подтверждено пакетов DRIVE, RTT (мс), ошибки разбора.
+        """
+        with self.lock:
+            return {
+                "sent": self.sent,
+                "acked": self.acked,
+                "rtt_ms": self.rtt * 1000,
+                "rtt_mean_ms": self.rtt_sum / self.acked * 1000 if self.acked else 0.0,
+                "rtt_max_ms": self.rtt_max * 1000,
+                "errors": self.decoder.errors,
+            }
+
+    def close(self) -> None:
+        """
+        Останавливает поток чтения и закрывает порт.
+        """
+        self.running = False
+        self.thread.join(timeout=1.0)
+        self.serial.close()
+
+
+def _to_pwm(power: float) -> int:
+    return int(round(max(-1.0, min(1.0, power)) * 255))
+
+
+class PtyBoard:
+    """
+    Имитация платы на псевдотерминале для проверки канала без оборудования:
+    отвечает телеметрией на каждую команду DRIVE, как прошивка arduino/link.h;
+    команды манипулятора подтверждаются сразу и завершаются через man_time секунд;
+    при imu=True передаёт пакеты IMU со скоростью рыскания yaw_rate.
+    """
+
+    def __init__(self, delay: float = 0.0, man_time: float = 0.05, can: bool = True, imu: bool = False,
+                 imu_period: float = 0.01):
+        """
+        :param delay: Искусственная задержка ответа, сек.
+        :param man_time: Длительность команды манипулятора, сек.
+        :param can: Автозахват находит банку (иначе — завершается по времени подъезда).
+        :param imu: Передавать пакеты IMU.
+        :param imu_period: Период пакетов IMU, сек.
+        """
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)
+        self.port = os.ttyname(self.slave)
+        self.delay = delay
+        self.decoder = Decoder()
+        self.power: Tuple[int, int] = (0, 0)  # Последние применённые мощности
+        self.started = time.monotonic()
+        self.handlers: Dict[int, Callable[[int, tuple], None]] = {DRIVE: self._drive}
+        for kind in (MAN_POSE, MAN_GRIP, MAN_CATCH, MAN_STOP):
+            self.handlers[kind] = lambda seq, values, kind=kind: self._manipulator(kind, seq, values)
+        self.man_time = man_time
+        self.can = can
+        self.man_timer: Optional[threading.Timer] = None
+        self.man_grip = False
+        self.yaw_rate = 0.0  # Скорость рыскания для пакетов IMU, град/с
+        self.yaw = 0.0
+        self.imu_period = imu_period
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="pty-board", daemon=True)
+        self.thread.start()
+        if imu:
+            threading.Thread(target=self._imu, name="pty-board-imu", daemon=True).start()
+
+    def reply(self, kind: int, seq: int, *values) -> None:
+        """
+        Отправляет пакет от имени платы.
+        """
+        os.write(self.master, encode(kind, seq, *values))
+
+    def millis(self) -> int:
+        return int((time.monotonic() - self.started) * 1000) & 0xFFFFFFFF
+
+    def _drive(self, seq: int, values: tuple):
+        self.power = values
+        self.reply(TELEMETRY, seq, self.millis(), 0, *values)
+
+    def _manipulator(self, kind: int, seq: int, values: tuple):
+        if self.man_timer:
+            self.man_timer.cancel()  # Новая команда заменяет выполняемую
+        if kind == MAN_STOP:
+            self.man_grip = self.man_grip and not values[0]
+            self.reply(MAN_STATE, seq, self.millis(), 0, self._grip() | MAN_FLAG_ABORTED, seq)
+            return
+        # Состояние: 1 — сервоприводы в движении (MAN_ZERO_MID), 4 — клешня (MAN_GRIP)
+        self.reply(MAN_STATE, seq, self.millis(), 4 if kind == MAN_GRIP else 1, self._grip(), seq)
+        if kind == MAN_GRIP:
+            self.man_grip = bool(values[0])
+
+        def done():
+            flags = 0
+            if kind == MAN_CATCH:
+                self.man_grip = self.can
+                flags = MAN_FLAG_CAP if self.can else MAN_FLAG_TIMEOUT
+            self.reply(MAN_STATE, seq, self.millis(), 0, self._grip() | flags, seq)
+
+        self.man_timer = threading.Timer(self.man_time, done)
+        self.man_timer.start()
+
+    def _grip(self) -> int:
+        return MAN_FLAG_GRIP if self.man_grip else 0
+
+    def _run(self):
+        while self.running:
+            try:
+                data = os.read(self.master, 256)
+            except OSError:
+                break
+            for kind, seq, values in self.decoder.feed(data):
+                if self.delay:
+                    time.sleep(self.delay)
+                handler = self.handlers.get(kind)
+                if handler:
+                    handler(seq, values)
+
+    def _imu(self):
+        seq = 0
+        deadline = time.monotonic()
+        while self.running:
+            self.yaw += self.yaw_rate * self.imu_period
+            micros = int((time.monotonic() - self.started) * 1e6) & 0xFFFFFFFF
+            try:
+                self.reply(IMU, seq, micros, round(self.yaw_rate * 100), round(self.yaw * 100))
+            except OSError:
+                break
+            seq = (seq + 1) & 0xFFFF
+            deadline += self.imu_period
+            time.sleep(max(0.0, deadline - time.monotonic()))
+
+    def close(self) -> None:
+        self.running = False
+        if self.man_timer:
+            self.man_timer.cancel()
+        os.close(self.slave)
+        os.close(self.master)
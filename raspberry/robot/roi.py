@@ -0,0 +1,158 @@
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+class TemporalRoi:
+    """
+    Окно поиска линии внутри полосы рабочей области вокруг центра на предыдущем кадре.
+    Ширина окна — ширина линии на маске (измеряется на кадрах, обработанных по всей полосе) плюс поля,
+    расширяемые пропорционально скорости центра; окно сдвигается на скорость центра. Если линия в окне
+    не найдена или касается его края, кадр обрабатывается по всей полосе; каждый refresh-й кадр
+    обрабатывается по всей полосе всегда.
+    """
+
+    def __init__(self, margin: int = 40, gain: float = 4.0, alpha: float = 0.5, cooldown: int = 5,
+                 refresh: int = 15):
+        """
+        :param margin: Поле окна с каждой стороны линии, пиксели.
+        :param gain: Расширение поля на пиксель скорости центра за кадр.
+        :param alpha: Коэффициент сглаживания скорости центра (0..1].
+        :param cooldown: Число кадров по всей полосе после возврата к ней.
+        :param refresh: Период кадров по всей полосе, кадры (ширина линии, устранение накопленной ошибки).
+        """
+        self.margin = margin
+        self.gain = gain
+        self.alpha = alpha
+        self.cooldown = cooldown
+        self.refresh = refresh
+        self.x: Optional[float] = None  # Центр линии на предыдущем кадре (в координатах полосы)
+        self.velocity = 0.0  # Скорость центра, пиксели/кадр
+        self.span = 0  # Ширина линии на маске (крайние столбцы), пиксели
+        self.wait = 0  # Оставшиеся кадры по всей полосе
+
+        # Статистика
+        self.frames = 0
+        self.windowed = 0  # Кадры, обработанные в окне
+        self.fallbacks = 0  # Повторные обработки по всей полосе
+        self.pixels = 0  # Обработано столбцов полосы
+        self.full_pixels = 0  # Столбцов полосы без окна
+
+    def window(self, width: int) -> Tuple[int, int]:
+        """
+        Окно поиска на очередном кадре.
+
+        :param width: Ширина полосы.
+        :return: Границы окна по x (начало, конец) в координатах полосы.
+        """
+        self.frames += 1
+        self.full_pixels += width
+        if self.x is None or self.wait or self.frames % self.refresh == 0:
+            self.wait = max(0, self.wait - 1)
+            self.pixels += width
+            return 0, width
+        half = self.span / 2 + self.margin + self.gain * abs(self.velocity)
+        center = self.x + self.velocity
+        x0, x1 = max(0, int(center - half)), min(width, int(center + half))
+        if x1 - x0 < self.margin:  # Прогноз у края полосы: окно почти пустое
+            x0, x1 = 0, width
+        self.windowed += (x0, x1) != (0, width)
+        self.pixels += x1 - x0
+        return x0, x1
+
+    def update(self, x: Optional[float], window: Tuple[int, int], mask: cv2.Mat, width: int) -> bool:
+        """
+        Учитывает результат обработки окна.
+
+        :param x: Центр линии в координатах полосы или None.
+        :param window: Границы окна, полученные от window.
+        :param mask: Маска окна.
+        :param width: Ширина полосы.
+        :return: True — результат принят; False — нужна обработка по всей полосе (затем update с полным окном).
+        """
+        x0, x1 = window
+        if (x0, x1) != (0, width):
+            # Линия могла выйти за окно: не найдена или маска касается края окна внутри полосы
+            cut = (x0 > 0 and np.count_nonzero(mask[:, 0])) or (x1 < width and np.count_nonzero(mask[:, -1]))
+            if x is None or cut:
+                self.fallbacks += 1
+                self.pixels += width
+                self.wait = self.cooldown
+                return False
+        elif x is not None:
+            # Ширина линии вместе с пятнами маски: при адаптивном пороге широкая линия видна двумя краями
+            columns = np.flatnonzero(mask.any(axis=0))
+            self.span = int(columns[-1] - columns[0] + 1)
+        if x is None:
+            self.x = None
+            self.velocity = 0.0
+        else:
+            if self.x is not None:
+                self.velocity += self.alpha * ((x - self.x) - self.velocity)
+            self.x = x
+        return True
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Доли кадров в окне и повторных обработок по всей полосе, доля обработанных столбцов.
+        """
+        return {
+            "frames": self.frames,
+            "window_rate": self.windowed / self.frames if self.frames else 0.0,
+            "fallback_rate": self.fallbacks / self.frames if self.frames else 0.0,
+            "pixel_ratio": self.pixels / self.full_pixels if self.full_pixels else 1.0,
+        }
+
+
+class FrameSignature:
+    """
+    Пропуск неизменившихся кадров: рабочая область уменьшается в step раз усреднением блоков (шум камеры
+    усредняется) и сравнивается с уменьшенной областью последнего обработанного кадра по наибольшей разности
+    яркости блоков: сдвиг линии даже на доли пикселя меняет блоки на её краях сильнее, чем шум.
+    """
+
+    def __init__(self, step: int = 8, change: float = 8.0, max_skip: int = 3):
+        """
+        :param step: Размер усредняемого блока, пиксели.
+        :param change: Порог разности яркости блоков (0 — не пропускать кадры).
+        :param max_skip: Максимальное число пропусков подряд.
+        """
+        self.step = step
+        self.change = change
+        self.max_skip = max_skip
+        self.previous: Optional[np.ndarray] = None
+        self.skipped = 0  # Пропусков подряд
+
+        # Статистика
+        self.frames = 0
+        self.skips = 0
+
+    def unchanged(self, crop: cv2.Mat) -> bool:
+        """
+        Проверяет, изменилась ли рабочая область с последнего обработанного кадра.
+
+        :param crop: Рабочая область.
+        :return: True — кадр можно не обрабатывать.
+        """
+        self.frames += 1
+        size = (max(1, crop.shape[1] // self.step), max(1, crop.shape[0] // self.step))
+        sample = cv2.resize(crop, size, interpolation=cv2.INTER_AREA).astype(np.int16)
+        if (self.change and self.previous is not None and self.previous.shape == sample.shape
+                and self.skipped < self.max_skip
+                and np.abs(sample - self.previous).max() < self.change):
+            self.skipped += 1
+            self.skips += 1
+            return True
+        self.previous = sample
+        self.skipped = 0
+        return False
+
+    def reset(self) -> None:
+        """
+        Следующий кадр обрабатывается без сравнения (например, после изменения рабочей области).
+        """
+        self.previous = None
+
+    def stats(self) -> Dict[str, float]:
+        return {"frames": self.frames, "skip_rate": self.skips / self.frames if self.frames else 0.0}
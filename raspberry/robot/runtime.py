@@ -0,0 +1,281 @@
+import asyncio
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from .control import ControllerConfig
+from .sinks import PreviewSink
+
+# Исполнители (по одному потоку): медленная работа одного не задерживает остальные
+EXECUTORS = ("capture", "vision", "serial", "sinks", "telemetry", "safety")
+
+
+class Runtime:
+    """
+    Цикл событий asyncio вокруг Robot: захват, обработка кадра, такты регулятора с записью в порт,
+    приёмники кадров (предпросмотр, запись) и телеметрия — отдельные задачи со своими потоками.
+    Окно предпросмотра обновляется в потоке цикла событий (GUI OpenCV должен жить в основном потоке).
+    Сторожевая задача останавливает моторы, если такты регулятора задерживаются;
+    при ошибке, Ctrl-C или SIGTERM моторы останавливаются в первую очередь.
+    """
+
+    def __init__(self, robot, callback: Callable, watchdog: float = 0.3, frame_timeout: float = 1.0,
+                 vision_deadline: float = 0.05, report_interval: float = 5.0):
+        """
+        :param robot: Робот с настроенными моторами и камерой (регулятор создаётся, если его нет).
+        :param callback: Обработчик центра линии (например, Callback.follow_line).
+        :param watchdog: Максимальный интервал между тактами регулятора, сек; дольше — аварийная остановка.
+        :param frame_timeout: Максимальное время ожидания кадра, сек.
+        :param vision_deadline: Бюджет обработки кадра, сек (превышения считаются).
+        :param report_interval: Период вывода сводок, сек.
+        """
+        self.robot = robot
+        self.callback = callback
+        self.watchdog = watchdog
+        self.frame_timeout = frame_timeout
+        self.vision_deadline = vision_deadline
+        self.report_interval = report_interval
+        if robot.controller is None:
+            # Команды моторам отправляются только тактами регулятора (из потока serial)
+            robot.setup_controller(ControllerConfig(max_power=robot.chassis.statpower, k=robot.chassis.k))
+
+        self.executors: Dict[str, ThreadPoolExecutor] = {}
+        self.frames: Optional[asyncio.Queue] = None  # Самый свежий кадр для обработки
+        self.outputs: Optional[asyncio.Queue] = None  # Кадры для приёмников
+        self.stopping: Optional[asyncio.Event] = None
+        self.last_tick: Optional[float] = None
+        self.halted = False  # Моторы остановлены сторожевой задачей
+
+        # Счётчики
+        self.captured = 0
+        self.dropped_frames = 0  # Кадры, вытесненные более свежими до обработки
+        self.dropped_outputs = 0  # Кадры, не переданные приёмникам (приёмники не успевают)
+        self.vision_overruns = 0  # Обработки кадра дольше vision_deadline
+        self.watchdog_stops = 0
+
+    async def _call(self, executor: str, function: Callable, *args):
+        """
+        Выполняет функцию в потоке исполнителя.
+        """
+        return await asyncio.get_running_loop().run_in_executor(self.executors[executor], function, *args)
+
+    async def capture(self):
+        """
+        Задача захвата: читает кадры и оставляет для обработки только самый свежий.
+        """
+        camera = self.robot.camera
+        if camera.grabber:
+            camera.grabber.start()
+        while True:
+            try:
+                ret, frame = await asyncio.wait_for(self._call("capture", camera.read), self.frame_timeout)
+            except asyncio.TimeoutError:
+                print("[!] Нет кадров с камеры.")
+                continue
+            if not ret:
+                print("[!] Проблемы с чтением кадра.")
+                self.stopping.set()
+                return
+            if camera.grabber:
+                captured_at = camera.grabber.timestamp
+            else:
+                captured_at = getattr(camera.cap, "timestamp", None) or time.monotonic()
+            self.captured += 1
+            if self.frames.full():
+                self.frames.get_nowait()
+                self.dropped_frames += 1
+            self.frames.put_nowait((captured_at, frame))
+
+    def _process(self, captured_at: float, frame):
+        """
+        Обработка кадра и обработчик центра линии (в потоке vision).
+        """
+        camera = self.robot.camera
+        camera.telemetry.frame(captured_at)
+        frame, mask, center = camera.process_frame(frame)
+        t = camera.telemetry.now()
+        if camera.junctions:
+            self.callback(center, camera.junction)
+        else:
+            self.callback(center)
+        camera.telemetry.record("callback", t)
+        if camera.buffers and camera.sinks:
+            mask = mask.copy()  # Буфер маски будет перезаписан следующим кадром
+        return frame, mask, center
+
+    async def vision(self):
+        """
+        Задача обработки кадров.
+        """
+        while True:
+            captured_at, frame = await self.frames.get()
+            started = time.monotonic()
+            output = await self._call("vision", self._process, captured_at, frame)
+            if time.monotonic() - started > self.vision_deadline:
+                self.vision_overruns += 1
+            if not self.robot.camera.sinks:
+                continue
+            if self.outputs.full():
+                self.dropped_outputs += 1
+            else:
+                self.outputs.put_nowait(output)
+
+    @staticmethod
+    def _write_sinks(sinks, frame, mask, center) -> bool:
+        running = True
+        for sink in sinks:
+            running = sink.write(frame, mask, center) and running
+        return running
+
+    async def sinks(self):
+        """
+        Задача приёмников кадров: предпросмотр — в потоке цикла событий (imshow/waitKey(1) занимают
+        около миллисекунды), остальные приёмники (запись видео) — в потоке sinks.
+        """
+        previews = [sink for sink in self.robot.camera.sinks if isinstance(sink, PreviewSink)]
+        others = [sink for sink in self.robot.camera.sinks if not isinstance(sink, PreviewSink)]
+        while True:
+            frame, mask, center = await self.outputs.get()
+            running = self._write_sinks(previews, frame, mask, center)
+            if others:
+                running = await self._call("sinks", self._write_sinks, others, frame, mask, center) and running
+            if not running:
+                self.stopping.set()  # Выход из предпросмотра
+                return
+
+    async def control(self):
+        """
+        Задача тактов регулятора с фиксированным периодом; мощности отправляются в порт из потока serial.
+        """
+        controller = self.robot.controller
+        period = controller.config.period
+        deadline = previous = time.monotonic()
+        while True:
+            started = time.monotonic()
+            await self._call("serial", controller.tick, started)
+            finished = time.monotonic()
+            controller.stats.add(started - previous, finished - started)
+            previous = started
+            self.last_tick = finished
+            if self.halted:
+                print("[+] Такты регулятора возобновились.")
+                self.halted = False
+
+            deadline += period
+            if deadline < finished:
+                deadline = finished  # Опоздали — не пытаемся догнать пропущенные такты
+            await asyncio.sleep(deadline - time.monotonic())
+
+    async def safe_stop(self, reason: str) -> None:
+        """
+        Останавливает моторы из отдельного потока (поток serial может быть занят). Если зависший такт ещё
+        внутри записи в порт, остановка ждёт её на блокировке шасси и отправляется следом, без сравнения с кэшем.
+        """
+        print(f"[!] Аварийная остановка моторов: {reason}")
+        self.watchdog_stops += 1
+        try:
+            await asyncio.wait_for(self._call("safety", self.robot.chassis.stop), self.watchdog)
+        except asyncio.TimeoutError:
+            print("[!] Команда остановки не отправлена за отведённое время.")
+
+    async def guard(self):
+        """
+        Сторожевая задача: такты регулятора должны идти не реже watchdog.
+        """
+        while True:
+            await asyncio.sleep(self.watchdog / 4)
+            if self.last_tick is None or self.halted:
+                continue
+            if time.monotonic() - self.last_tick > self.watchdog:
+                self.halted = True
+                await self.safe_stop(f"нет тактов регулятора {time.monotonic() - self.last_tick:.2f} с")
+
+    def report(self) -> None:
+        """
+        Сводки телеметрии и счётчики (в потоке telemetry: вывод не задерживает управление).
+        """
+        self.robot.telemetry.report(force=True)
+        self.robot.camera.print_stats()
+        print(f"[+] Runtime: {self.stats()}")
+
+    async def telemetry(self):
+        """
+        Задача периодического вывода сводок.
+        """
+        while True:
+            await asyncio.sleep(self.report_interval)
+            await self._call("telemetry", self.report)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Счётчики кадров, превышений бюджета и аварийных остановок.
+        """
+        return {"captured": self.captured, "dropped_frames": self.dropped_frames,
+                "dropped_outputs": self.dropped_outputs, "vision_overruns": self.vision_overruns,
+                "watchdog_stops": self.watchdog_stops}
+
+    async def run(self) -> None:
+        """
+        Запускает задачи и ждёт остановки: выход из предпросмотра, конец видео, сигнал или ошибка в задаче.
+        После завершения моторы остановлены; ресурсы робота освобождает robot.stop().
+        """
+        loop = asyncio.get_running_loop()
+        self.executors = {name: ThreadPoolExecutor(1, thread_name_prefix=f"runtime-{name}") for name in EXECUTORS}
+        self.frames = asyncio.Queue(maxsize=1)
+        self.outputs = asyncio.Queue(maxsize=2)
+        self.stopping = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stopping.set)
+            except (NotImplementedError, RuntimeError):
+                pass  # Не главный поток или платформа без сигналов
+
+        tasks = [loop.create_task(coroutine(), name=f"runtime-{coroutine.__name__}")
+                 for coroutine in (self.capture, self.vision, self.sinks, self.control, self.guard, self.telemetry)]
+        stopping = loop.create_task(self.stopping.wait())
+        error = None
+        try:
+            done, _ = await asyncio.wait(tasks + [stopping], return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task is not stopping and not task.cancelled() and task.exception():
+                    error = task.exception()
+                    print(f"[!] Ошибка в задаче {task.get_name()}: {error!r}")
+        finally:
+            for task in tasks + [stopping]:
+                task.cancel()
+            await asyncio.gather(*tasks, stopping, return_exceptions=True)
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                try:
+                    loop.remove_signal_handler(sig)
+                except (NotImplementedError, RuntimeError):
+                    pass
+            await self.shutdown()
+        if error:
+            raise error
+
+    async def shutdown(self) -> None:
+        """
+        Останавливает моторы и потоки исполнителей.
+        """
+        self.robot.controller.halt()
+        # Остановка в потоке serial выполняется после такта, который мог ещё идти (отмена задачи его не прерывает);
+        # если поток serial завис — из потока safety, а зависший такт после неё в моторы уже не пишет (hold)
+        for name in ("serial", "safety"):
+            try:
+                await asyncio.wait_for(self._call(name, self.robot.chassis.stop, True), self.watchdog)
+                break
+            except asyncio.TimeoutError:
+                print(f"[!] Команда остановки не отправлена из потока {name} за отведённое время.")
+        for name, executor in self.executors.items():
+            # Обработка кадра и приёмники завершаются быстро — ждём их до освобождения камеры и записи видео;
+            # чтение камеры и запись в порт могут зависнуть — их не ждём
+            executor.shutdown(wait=name in ("vision", "sinks"), cancel_futures=True)
+        print(f"[+] Runtime остановлен: {self.stats()}")
+
+    def start(self) -> None:
+        """
+        Запускает цикл событий до остановки (блокирует). Вызывать из основного потока: в нём работают
+        окно предпросмотра и обработчики сигналов.
+        """
+        asyncio.run(self.run())
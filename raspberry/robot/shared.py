@@ -0,0 +1,359 @@
+import multiprocessing as mp
+import queue
+import time
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .capture import CaptureProfile
+
+# Описание кадрового буфера для подключения из другого процесса: (имя блока, форма кадра, тип, число слотов)
+BusSpec = Tuple[str, Tuple[int, ...], str, int]
+
+# Результат обработчика: (имя обработчика, номер кадра, время захвата, результат)
+Result = Tuple[str, int, float, Any]
+
+
+class FrameBus:
+    """
+    Кадры в разделяемой памяти: один писатель (процесс захвата) и любое число читателей.
+    Кадры пишутся по кругу в несколько слотов; читатель берёт самый свежий кадр и по номеру
+    слота после копирования проверяет, что кадр не был перезаписан во время чтения.
+    """
+
+    def __init__(self, shape: Tuple[int, ...], dtype: str = "uint8", slots: int = 3, name: Optional[str] = None):
+        """
+        Создаёт новый буфер (name=None) или подключается к существующему.
+
+        :param shape: Форма кадра.
+        :param dtype: Тип элементов кадра.
+        :param slots: Число слотов (кадров) в буфере.
+        :param name: Имя существующего блока разделяемой памяти.
+        """
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.slots = slots
+        frame_size = int(np.prod(self.shape)) * self.dtype.itemsize
+        # Заголовок: строка 0 — (номер последнего кадра, признак завершения), строки 1.. — (номер кадра, время) слотов
+        header_size = (slots + 1) * 2 * 8
+        self.owner = name is None
+        self.memory = shared_memory.SharedMemory(name=name, create=self.owner, size=header_size + frame_size * slots)
+        self.header = np.ndarray((slots + 1, 2), np.float64, self.memory.buf)
+        self.frames = np.ndarray((slots,) + self.shape, self.dtype, self.memory.buf, offset=header_size)
+        if self.owner:
+            self.header[:] = 0
+            self.header[1:, 0] = -1
+
+    @property
+    def spec(self) -> BusSpec:
+        """
+        Описание буфера для FrameBus.attach в другом процессе.
+        """
+        return self.memory.name, self.shape, self.dtype.str, self.slots
+
+    @classmethod
+    def attach(cls, spec: BusSpec) -> "FrameBus":
+        """
+        Подключается к буферу, созданному в другом процессе.
+        """
+        name, shape, dtype, slots = spec
+        return cls(shape, dtype, slots, name)
+
+    @property
+    def latest(self) -> int:
+        """
+        Номер последнего опубликованного кадра (0 — кадров ещё не было).
+        """
+        return int(self.header[0, 0])
+
+    @property
+    def ended(self) -> bool:
+        """
+        Захват завершён, новых кадров не будет.
+        """
+        return bool(self.header[0, 1])
+
+    def publish(self, frame: np.ndarray, timestamp: float) -> int:
+        """
+        Записывает кадр в следующий слот.
+
+        :param frame: Кадр (форма и тип как у буфера).
+        :param timestamp: Время захвата (time.monotonic, общее для всех процессов).
+        :return: Номер кадра.
+        """
+        seq = self.latest + 1
+        slot = seq % self.slots
+        self.header[1 + slot, 0] = -1  # Слот перезаписывается
+        self.frames[slot] = frame
+        self.header[1 + slot] = (seq, timestamp)
+        self.header[0, 0] = seq
+        return seq
+
+    def read(self, out: Optional[np.ndarray] = None) -> Optional[Tuple[int, float, np.ndarray]]:
+        """
+        Копирует самый свежий кадр.
+
+        :param out: Массив для копии кадра (None — выделить новый).
+        :return: (номер кадра, время захвата, кадр) или None, если кадров ещё нет.
+        """
+        while True:
+            seq = self.latest
+            if not seq:
+                return None
+            slot = seq % self.slots
+            if out is None:
+                out = np.empty(self.shape, self.dtype)
+            np.copyto(out, self.frames[slot])
+            stored, timestamp = self.header[1 + slot]
+            if stored == seq:
+                return seq, float(timestamp), out
+            # Писатель успел перезаписать слот — берём более свежий кадр
+
+    def end(self) -> None:
+        """
+        Отмечает завершение захвата.
+        """
+        self.header[0, 1] = 1
+
+    def close(self) -> None:
+        """
+        Отключается от буфера.
+        """
+        del self.header, self.frames
+        self.memory.close()
+
+    def unlink(self) -> None:
+        """
+        Удаляет блок разделяемой памяти (после отключения всех читателей).
+        """
+        self.memory.unlink()
+
+
+class SharedCapture:
+    """
+    Источник кадров из FrameBus с интерфейсом cv2.VideoCapture (read/get/release):
+    позволяет использовать Camera и другие обработчики без собственной камеры.
+    """
+
+    def __init__(self, spec: BusSpec, event=None, timeout: float = 1.0):
+        """
+        :param spec: Описание буфера кадров (FrameBus.spec).
+        :param event: Событие multiprocessing.Event, которое процесс захвата выставляет на каждом кадре
+                      (None — опрос буфера).
+        :param timeout: Максимальное время ожидания нового кадра, сек.
+        """
+        self.bus = FrameBus.attach(spec)
+        self.event = event
+        self.timeout = timeout
+        self.seq = 0  # Номер последнего прочитанного кадра
+        self.timestamp = 0.0  # Время захвата последнего прочитанного кадра
+        self.skipped = 0  # Кадры, опубликованные между чтениями и не прочитанные
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        """
+        Ждёт кадр новее прочитанного и возвращает его копию (промежуточные кадры пропускаются).
+
+        :return: Пара (успех, кадр) в формате cv2.VideoCapture.read().
+        """
+        deadline = time.monotonic() + self.timeout
+        while self.bus.latest <= self.seq:
+            if self.bus.ended:
+                return False, None
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False, None
+            if self.event is not None:
+                self.event.wait(remaining)
+                self.event.clear()
+            else:
+                time.sleep(0.001)
+
+        seq, self.timestamp, frame = self.bus.read()
+        if self.seq:
+            self.skipped += seq - self.seq - 1
+        self.seq = seq
+        return True, frame
+
+    def get(self, prop: int) -> float:
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self.bus.shape[1]
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self.bus.shape[0]
+        return 0.0
+
+    def release(self) -> None:
+        self.bus.close()
+
+
+def _capture_main(source, profile: Optional[CaptureProfile], slots: int, specs, events, stop) -> None:
+    """
+    Процесс захвата: читает камеру и публикует кадры в FrameBus.
+    """
+    cap = cv2.VideoCapture(source)
+    if profile:
+        profile.apply(cap)
+    ret, frame = cap.read()
+    if not ret:
+        cap.release()
+        specs.put(None)
+        return
+
+    bus = FrameBus(frame.shape, frame.dtype.str, slots)
+    specs.put(bus.spec)
+    try:
+        while ret and not stop.is_set():
+            bus.publish(frame, time.monotonic())
+            for event in events:
+                event.set()
+            ret, frame = cap.read()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        bus.end()
+        for event in events:
+            event.set()
+        cap.release()
+        bus.close()  # Блок удаляет VisionPipeline.stop после остановки читателей
+
+
+def _worker_main(name: str, spec: BusSpec, event, handler: Callable[[np.ndarray], Any], rate: float,
+                 results, stop) -> None:
+    """
+    Процесс обработчика: берёт самые свежие кадры со своей частотой и отправляет результаты в очередь.
+    """
+    try:
+        capture = SharedCapture(spec, event, timeout=0.5)
+    except FileNotFoundError:
+        return  # Конвейер остановлен до запуска обработчика
+    period = 1.0 / rate if rate else 0.0
+    try:
+        while not stop.is_set():
+            started = time.monotonic()
+            ret, frame = capture.read()
+            if not ret:
+                if capture.bus.ended:
+                    break
+                continue
+
+            result = handler(frame)
+            if result is not None:
+                try:
+                    results.put_nowait((name, capture.seq, capture.timestamp, result))
+                except queue.Full:
+                    pass  # Главный процесс не успевает забирать результаты: новые важнее
+
+            if period:
+                stop.wait(max(0.0, period - (time.monotonic() - started)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        capture.release()
+
+
+class VisionPipeline:
+    """
+    Многопроцессная обработка кадров: процесс захвата публикует кадры в разделяемую память,
+    обработчики (QR, знаки) работают в отдельных процессах со своей частотой,
+    результаты возвращаются через очередь. Следование по линии читает кадры через capture().
+    """
+
+    def __init__(self, source=0, profile: Optional[CaptureProfile] = None, slots: int = 3, queue_size: int = 64):
+        """
+        :param source: Номер камеры или путь к видеофайлу.
+        :param profile: Параметры захвата камеры.
+        :param slots: Число кадров в разделяемом буфере.
+        :param queue_size: Размер очереди результатов.
+        """
+        self.source = source
+        self.profile = profile
+        self.slots = slots
+        self.context = mp.get_context("spawn")  # Без fork: дочерние процессы не наследуют потоки и камеру
+        self.results = self.context.Queue(queue_size)
+        self.stop_event = self.context.Event()
+        self.workers: Dict[str, Tuple[Callable[[np.ndarray], Any], float]] = {}
+        self.events: Dict[str, Any] = {}
+        self.processes: List[mp.Process] = []
+        self.spec: Optional[BusSpec] = None
+        self.latest: Dict[str, Result] = {}  # Последний результат каждого обработчика
+
+    def add_worker(self, name: str, handler: Callable[[np.ndarray], Any], rate: float = 0.0) -> None:
+        """
+        Добавляет обработчик кадров (вызывать до start).
+
+        :param name: Имя обработчика (ключ результатов).
+        :param handler: Функция кадр -> результат (None — нет результата); должна сериализоваться pickle
+                        (функция модуля или объект класса модуля).
+        :param rate: Максимальная частота обработки, Гц (0 — так быстро, как успевает).
+        """
+        self.workers[name] = (handler, rate)
+
+    def start(self, timeout: float = 10.0) -> "VisionPipeline":
+        """
+        Запускает процесс захвата и процессы обработчиков.
+
+        :param timeout: Максимальное время ожидания первого кадра, сек.
+        """
+        # Событие нового кадра для каждого читателя, включая главный процесс (capture)
+        self.events = {name: self.context.Event() for name in list(self.workers) + ["main"]}
+        specs = self.context.Queue()
+        capture = self.context.Process(target=_capture_main, name="vision-capture", daemon=True,
+                                       args=(self.source, self.profile, self.slots, specs,
+                                             list(self.events.values()), self.stop_event))
+        capture.start()
+        self.processes.append(capture)
+        try:
+            self.spec = specs.get(timeout=timeout)
+        except queue.Empty:
+            self.spec = None
+        if self.spec is None:
+            self.stop()
+            raise RuntimeError(f"Не удалось получить кадр из источника {self.source}")
+
+        for name, (handler, rate) in self.workers.items():
+            process = self.context.Process(target=_worker_main, name=f"vision-{name}", daemon=True,
+                                           args=(name, self.spec, self.events[name], handler, rate,
+                                                 self.results, self.stop_event))
+            process.start()
+            self.processes.append(process)
+        print(f"[+] Конвейер зрения: кадр {self.spec[1]}, обработчики: {', '.join(self.workers) or 'нет'}")
+        return self
+
+    def capture(self) -> SharedCapture:
+        """
+        Источник кадров для главного процесса (например, Camera для следования по линии).
+        """
+        return SharedCapture(self.spec, self.events["main"])
+
+    def poll(self) -> List[Result]:
+        """
+        Забирает накопившиеся результаты обработчиков без ожидания.
+
+        :return: Новые результаты в порядке поступления.
+        """
+        results = []
+        while True:
+            try:
+                result = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self.latest[result[0]] = result
+            results.append(result)
+        return results
+
+    def stop(self, timeout: float = 2.0) -> None:
+        """
+        Останавливает процессы захвата и обработчиков.
+        """
+        self.stop_event.set()
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self.processes = []
+        if self.spec:
+            bus = FrameBus.attach(self.spec)
+            bus.close()
+            bus.unlink()
+            self.spec = None
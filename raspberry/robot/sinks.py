@@ -0,0 +1,133 @@
+import queue
+import threading
+from typing import Callable, Optional, Tuple
+
+import cv2
+
+
+class Sink:
+    """
+    Базовый приёмник обработанных кадров (запись видео, предпросмотр и т.д.).
+    """
+
+    def write(self, frame: cv2.Mat, mask: cv2.Mat, center: Optional[Tuple[int, int]]) -> bool:
+        """
+        Принимает очередной кадр.
+
+        :param frame: Исходный кадр (без разметки).
+        :param mask: Маска рабочей области.
+        :param center: Центр линии или None.
+        :return: False, если трекинг нужно остановить.
+        """
+        return True
+
+    def close(self) -> None:
+        """
+        Освобождает ресурсы приёмника.
+        """
+
+
+class HeadlessSink(Sink):
+    """
+    Пустой приёмник: ничего не показывает и не записывает (без imshow/waitKey).
+    """
+
+
+class PreviewSink(Sink):
+    """
+    Окно предпросмотра. Работает в вызывающем потоке, так как GUI OpenCV должен жить в основном потоке.
+    """
+
+    def __init__(self, annotate: Callable, every: int = 1):
+        """
+        :param annotate: Функция (кадр, центр) -> копия кадра с разметкой.
+        :param every: Показывать каждый every-й кадр.
+        """
+        self.annotate = annotate
+        self.every = max(1, every)
+        self.count = 0
+
+    def write(self, frame, mask, center) -> bool:
+        self.count += 1
+        if self.count % self.every:
+            return True
+        cv2.imshow("Original with Line Center", self.annotate(frame, center))
+        cv2.imshow("Mask", mask)
+
+        # Управление с клавиатуры
+        key = cv2.waitKey(1) & 0xFF
+        return key != ord("q")  # Выход
+
+    def close(self) -> None:
+        cv2.destroyAllWindows()
+
+
+class VideoSink(Sink):
+    """
+    Запись размеченных кадров в видеофайл.
+    """
+
+    def __init__(self, path: str, size: Tuple[int, int], annotate: Callable, fps: float = 20.0, fourcc: str = "XVID"):
+        """
+        :param path: Путь к видеофайлу.
+        :param size: Размер кадра (ширина, высота).
+        :param annotate: Функция (кадр, центр) -> копия кадра с разметкой.
+        :param fps: Частота кадров записи.
+        :param fourcc: Кодек записи.
+        """
+        self.annotate = annotate
+        self.writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, size)
+
+    def write(self, frame, mask, center) -> bool:
+        self.writer.write(self.annotate(frame, center))
+        return True
+
+    def close(self) -> None:
+        self.writer.release()
+
+
+class AsyncSink(Sink):
+    """
+    Выносит приёмник в отдельный поток записи с ограниченной очередью.
+    Для цикла управления запись стоит одной неблокирующей постановки в очередь;
+    при переполнении кадр отбрасывается.
+    """
+
+    def __init__(self, sink: Sink, maxsize: int = 4, every: int = 1):
+        """
+        :param sink: Приёмник, который будет работать в потоке записи.
+        :param maxsize: Размер очереди кадров.
+        :param every: Передавать каждый every-й кадр (прореживание).
+        """
+        self.sink = sink
+        self.every = max(1, every)
+        self.count = 0
+        self.dropped = 0  # Кадры, не попавшие в переполненную очередь
+        self.queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self.thread = threading.Thread(target=self._run, name="sink-writer", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        """
+        Цикл потока записи.
+        """
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            self.sink.write(*item)
+
+    def write(self, frame, mask, center) -> bool:
+        self.count += 1
+        if self.count % self.every:
+            return True
+        try:
+            self.queue.put_nowait((frame, mask, center))
+        except queue.Full:
+            self.dropped += 1
+        return True
+
+    def close(self) -> None:
+        self.queue.put(None)  # Дописываем очередь и завершаем поток
+        self.thread.join()
+        self.sink.close()
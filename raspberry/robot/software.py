@@ -1,43 +1,157 @@
 import cv2
+import json
+import numpy as np
 import os
+import time
+
+from .capture import CaptureProfile, FrameGrabber
+from .roi import FrameSignature, TemporalRoi
+from .sinks import AsyncSink, PreviewSink, VideoSink
+from .telemetry import NullTelemetry
+from .threshold import ThresholdTracker
+from .vision import Junction, band_centroids, classify_junction, fit_line, nearest_center
 
 
 class Camera:
-    def __init__(self, video_source=0, save_video=True, output_dir="./output"):
+    def __init__(self, video_source=0, save_video=True, output_dir="./output", threaded=False, buffer_size=2,
+                 headless=False, record_every=1, threshold="adaptive", threshold_every=10,
+                 bands=1, preallocate=False, profile: CaptureProfile = None, junctions=False, config=None,
+                 temporal=False):
         """
         Инициализация трекера линии.
-        :param video_source: источник видео (номер камеры или путь к видеофайлу).
+        :param video_source: источник видео (номер камеры, путь к видеофайлу или объект с интерфейсом
+                             cv2.VideoCapture: read/get/release).
         :param save_video: сохранять ли видео в файл.
         :param output_dir: папка для сохранения изображений и видео.
+        :param threaded: захватывать кадры в фоновом потоке (обрабатывается только самый свежий кадр).
+        :param buffer_size: размер кольцевого буфера кадров в фоновом режиме.
+        :param headless: работать без окон предпросмотра (без imshow/waitKey).
+        :param record_every: записывать в видео каждый record_every-й кадр.
+        :param threshold: режим бинаризации: "adaptive" (адаптивный порог по окрестности пикселя),
+                          "global" (единый порог, подстраиваемый по гистограмме рабочей области)
+                          или "fixed" (единый порог dt без подстройки).
+        :param threshold_every: в режиме "global" пересчитывать порог каждые threshold_every кадров.
+        :param bands: число полос рабочей области; при bands > 1 над основной полосой анализируются
+                      дополнительные полосы для предсказания направления линии (look-ahead).
+        :param preallocate: обрабатывать кадр в заранее выделенных буферах (без выделения памяти на кадр).
+        :param profile: параметры захвата камеры (разрешение, FPS, формат пикселей, буфер, экспозиция).
+        :param junctions: распознавать перекрёстки (robot.vision.classify_junction); тип участка передаётся
+                          обработчику track вторым аргументом, центр линии считается без ответвлений.
+        :param config: параметры обработки (словарь или путь к JSON, например результат sweep.py):
+                       blur, block, c, dt, threshold, work_pos и work_width (доли кадра), work_height.
+        :param temporal: следить за линией между кадрами: обрабатывать окно вокруг центра на предыдущем кадре
+                         (robot.roi.TemporalRoi; только при bands=1 без junctions) и пропускать неизменившиеся
+                         кадры (robot.roi.FrameSignature).
         """
-        self.cap = cv2.VideoCapture(video_source)
+        self.cap = video_source if hasattr(video_source, "read") else cv2.VideoCapture(video_source)
+        if profile and isinstance(self.cap, cv2.VideoCapture):
+            profile.apply(self.cap)
         self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
         self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
         self.blur = 13
-        self.dt = 100  # Базовый порог (можно настроить автоматически)
+        self.block = 31  # Размер окрестности адаптивного порога (нечётный)
+        self.c = 15  # Смещение адаптивного порога
+        self.dt = 100  # Базовый порог (подстраивается автоматически в режиме "global")
         self.work_pos = int(self.height * 0.8)
         self.work_width = int(self.width * 0.6)
         self.work_height = 40
+        self.bands = max(1, min(bands, self.work_pos // self.work_height + 1))
+        self.threshold = threshold
+        self.threshold_tracker = ThresholdTracker(self.work_height * self.bands, self.dt, threshold_every)
+
+        # Буферы промежуточных изображений рабочей области (режим preallocate)
+        self.preallocate = preallocate
+        self.buffers = None
+        if preallocate:
+            self.allocate()
+
+        # Слежение за линией между кадрами
+        self.roi = TemporalRoi() if temporal else None
+        self.signature = FrameSignature() if temporal else None
+        self.result = None  # (маска, центр) последнего обработанного кадра
+
+        # Параметры обработки из файла (например, подобранные sweep.py)
+        if config:
+            self.apply_config(Camera.load_config(config) if isinstance(config, str) else config)
+
+        # Результаты многополосного детектора
+        self.centroids = None  # Центроиды полос (robot.vision.BAND_DTYPE)
+        self.fit = None  # Направление и кривизна линии (robot.vision.LineFit)
+        self.junctions = junctions
+        self.junction = None  # Тип участка линии (robot.vision.JunctionFit)
+
         self.output_dir = output_dir
         self.save_video = save_video
+        self.stats_interval = 5.0  # Период вывода счётчиков кадров (сек)
+        self.telemetry = NullTelemetry()  # Замеры времени этапов (robot.telemetry)
+
+        # Фоновый захват кадров
+        self.grabber = FrameGrabber(self.cap, buffer_size) if threaded else None
 
         if not os.path.exists(self.output_dir):
             os.makedirs(self.output_dir)
 
+        # Приёмники обработанных кадров (предпросмотр, запись видео)
+        self.sinks = []
+        if not headless:
+            self.sinks.append(PreviewSink(self.annotate))
         if self.save_video:
-            self.fourcc = cv2.VideoWriter_fourcc(*'XVID')
-            self.out = cv2.VideoWriter(
-                f"{self.output_dir}/output.mp4",
-                self.fourcc,
-                20.0,
-                (self.width, self.height)
-            )
-            self.mask_writer = cv2.VideoWriter(
-                f"{self.output_dir}/mask.mp4",
-                self.fourcc,
-                20.0,
-                (self.width, self.height)
-            )
+            # Кодирование видео выполняется в отдельном потоке и не задерживает управление
+            self.sinks.append(AsyncSink(
+                VideoSink(f"{self.output_dir}/output.mp4", (self.width, self.height), self.annotate),
+                every=record_every
+            ))
+
+    def allocate(self):
+        """
+        Выделяет буферы серого изображения, размытия и маски по размеру рабочей области.
+        Вызывается повторно при изменении work_width, work_height или bands.
+        """
+        x0, x1 = (self.width - self.work_width) // 2, (self.width + self.work_width) // 2
+        shape = (self.bands * self.work_height, x1 - x0)
+        self.buffers = {name: np.empty(shape, np.uint8) for name in ("gray", "blur", "mask")}
+
+    def set_roi(self, work_pos=None, work_width=None, work_height=None):
+        """
+        Изменяет положение и размер рабочей области (в пикселях); неуказанные параметры не меняются.
+        :param work_pos: верхняя граница ближней полосы.
+        :param work_width: ширина рабочей области.
+        :param work_height: высота одной полосы.
+        """
+        self.work_pos = work_pos if work_pos is not None else self.work_pos
+        self.work_width = work_width if work_width is not None else self.work_width
+        self.work_height = work_height if work_height is not None else self.work_height
+        self.bands = max(1, min(self.bands, self.work_pos // self.work_height + 1))
+        self.threshold_tracker.work_height = self.work_height * self.bands
+        if self.buffers:
+            self.allocate()
+        if self.signature:
+            self.signature.reset()
+
+    @staticmethod
+    def load_config(path):
+        """
+        Загружает параметры обработки из JSON: из раздела "camera", если он есть (файл sweep.py), иначе весь файл.
+        :param path: путь к файлу.
+        :return: словарь параметров.
+        """
+        with open(path) as f:
+            data = json.load(f)
+        return data.get("camera", data)
+
+    def apply_config(self, config):
+        """
+        Применяет параметры обработки; неуказанные параметры не меняются.
+        :param config: словарь: blur, block, c, dt, threshold, work_pos и work_width (доли высоты и ширины кадра),
+                       work_height (пиксели).
+        """
+        for name in ("blur", "block", "c", "dt", "threshold"):
+            if name in config:
+                setattr(self, name, config[name])
+        self.threshold_tracker.dt = self.dt
+        self.set_roi(int(self.height * config["work_pos"]) if "work_pos" in config else None,
+                     int(self.width * config["work_width"]) if "work_width" in config else None,
+                     config.get("work_height"))
 
     def calculate_center(self, moments):
         """
@@ -51,30 +165,151 @@ class Camera:
             return x, y
         return None
 
-    def process_frame(self, frame):
+    def buffer(self, name, shape):
         """
-        Обрабатывает кадр, выделяя линию и её центр.
+        Заранее выделенный буфер, если он подходит по размеру (окно TemporalRoi уже полосы — без буфера).
+        :param name: имя буфера: gray, blur или mask.
+        :param shape: размер изображения (высота, ширина).
+        :return: буфер или None.
+        """
+        if self.buffers and self.buffers[name].shape == shape:
+            return self.buffers[name]
+        return None
+
+    def crop(self, frame):
+        """
+        Вырезает рабочую область (вместе с полосами look-ahead над ней).
         :param frame: входное изображение.
-        :return: обработанный кадр, маска, центр линии.
+        :return: рабочая область (без копирования).
         """
-        # Обрезаем рабочую область
-        crop = frame[self.work_pos:self.work_pos + self.work_height,
+        top = self.work_pos - (self.bands - 1) * self.work_height
+        return frame[top:self.work_pos + self.work_height,
                      (self.width - self.work_width) // 2:(self.width + self.work_width) // 2]
 
-        # Преобразуем в серый и размываем
-        gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
-        gray = cv2.GaussianBlur(gray, (self.blur, self.blur), 0)
+    def preprocess(self, crop):
+        """
+        Преобразует рабочую область в оттенки серого и размывает.
+        Кадры в оттенках серого и YUYV (профиль gray) не преобразуются: берётся яркость (Y).
+        :param crop: рабочая область.
+        :return: размытое изображение в оттенках серого.
+        """
+        dst = self.buffer("gray", crop.shape[:2])
+        if crop.ndim == 2:
+            gray = crop
+        elif crop.shape[2] == 2:
+            gray = crop[..., 0]  # Плоскость Y кадра YUYV
+            if dst is not None:
+                np.copyto(dst, gray)
+                gray = dst
+        else:
+            gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY, dst=dst)
+        return cv2.GaussianBlur(gray, (self.blur, self.blur), 0, dst=self.buffer("blur", gray.shape))
+
+    def binarize(self, gray):
+        """
+        Выделяет линию (белым) на размытой рабочей области.
+        :param gray: размытое изображение в оттенках серого.
+        :return: маска линии (в режиме preallocate — общий буфер, перезаписываемый следующим кадром).
+        """
+        dst = self.buffer("mask", gray.shape)
+        if self.threshold in ("global", "fixed"):
+            if self.threshold == "global":
+                # Единый порог с периодической подстройкой по гистограмме
+                self.dt = self.threshold_tracker.update(gray)
+            _, mask = cv2.threshold(gray, self.dt, 255, cv2.THRESH_BINARY_INV, dst=dst)
+            return mask
+
+        # Адаптивный порог (инвертированный сразу, без отдельного прохода bitwise_not)
+        return cv2.adaptiveThreshold(
+            gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, self.block, self.c, dst=dst)
 
-        # Адаптивный порог
-        mask = cv2.adaptiveThreshold(
-            gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY, 31, 15)
-        mask = cv2.bitwise_not(mask)
+    def locate(self, mask):
+        """
+        Находит центр линии на маске.
+        :param mask: маска линии.
+        :return: координаты центра линии (x, y) или None.
+        """
+        if self.junctions:
+            # На перекрёстке центр по моментам смещён ответвлениями: берётся центр основной линии
+            junction = classify_junction(mask)
+            offset = (self.bands - 1) * self.work_height  # y отсчитывается от верхнего края ближней полосы
+            if offset and junction.center:
+                junction = junction._replace(center=(junction.center[0], junction.center[1] - offset),
+                                             row=junction.row - offset)
+            self.junction = junction
+        if self.bands > 1:
+            # Центроиды всех полос и аппроксимация линии
+            self.centroids = band_centroids(mask, self.bands)
+            self.fit = fit_line(self.centroids)
+            if self.junction is not None and self.junction.kind > Junction.STRAIGHT:
+                return self.junction.center
+            return nearest_center(self.centroids)
+        if self.junction is not None:
+            return self.junction.center
 
         # Вычисляем моменты
         moments = cv2.moments(mask)
-        center = self.calculate_center(moments)
+        return self.calculate_center(moments)
+
+    def process_frame(self, frame):
+        """
+        Обрабатывает кадр, выделяя линию и её центр.
+        В режиме temporal неизменившийся кадр не обрабатывается (возвращается предыдущий результат),
+        а при одной полосе обрабатывается окно вокруг предыдущего центра (маска — только окна).
+        :param frame: входное изображение.
+        :return: исходный кадр, маска, центр линии.
+        """
+        t = self.telemetry.now()
+        crop = self.crop(frame)
+        self.telemetry.record("crop", t)
+        if self.signature and self.signature.unchanged(crop) and self.result:
+            # Рабочая область не изменилась: результат предыдущего кадра
+            return (frame,) + self.result
+
+        if self.roi and self.bands == 1 and not self.junctions:
+            width = crop.shape[1]
+            x0, x1 = self.roi.window(width)
+            mask, center = self.detect(crop[:, x0:x1])
+            if center:
+                center = (center[0] + x0, center[1])
+            if not self.roi.update(center[0] if center else None, (x0, x1), mask, width):
+                # Линия не найдена в окне или выходит за него: вся полоса
+                mask, center = self.detect(crop)
+                self.roi.update(center[0] if center else None, (0, width), mask, width)
+        else:
+            mask, center = self.detect(crop)
+        if self.signature:
+            self.result = (mask, center)
+        return frame, mask, center
 
-        # Отображаем центр на оригинальном кадре
+    def detect(self, crop):
+        """
+        Размытие, бинаризация и поиск центра линии в рабочей области или окне.
+        :param crop: рабочая область или её часть.
+        :return: маска, центр линии (x, y) или None.
+        """
+        t = self.telemetry.now()
+        gray = self.preprocess(crop)
+        t = self.telemetry.record("blur", t)
+        mask = self.binarize(gray)
+        t = self.telemetry.record("threshold", t)
+        center = self.locate(mask)
+        self.telemetry.record("locate", t)
+        return mask, center
+
+    def annotate(self, frame, center):
+        """
+        Рисует центр линии на копии кадра (вызывается только приёмниками кадров).
+        :param frame: исходный кадр.
+        :param center: центр линии в координатах рабочей области или None.
+        :return: копия кадра с разметкой.
+        """
+        if frame.ndim == 2:
+            frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+        elif frame.shape[2] == 2:
+            frame = cv2.cvtColor(frame, cv2.COLOR_YUV2BGR_YUYV)
+        else:
+            frame = frame.copy()
         if center:
             cx, cy = center
             # Преобразуем координаты в глобальные для всего кадра
@@ -83,42 +318,103 @@ class Camera:
             cv2.circle(frame, (global_x, global_y), 5, (0, 255, 0), -1)
             cv2.putText(frame, f"Center: ({global_x}, {global_y})", (10, 50),
                         cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 0, 255), 2)
+        if self.junction is not None:
+            cv2.putText(frame, self.junction.kind.name, (10, 90), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (255, 0, 0), 2)
+        return frame
 
-        return frame, mask, center
+    def emit(self, frame, mask, center):
+        """
+        Передаёт кадр всем приёмникам.
+        :return: False, если один из приёмников запросил остановку.
+        """
+        if self.buffers and self.sinks:
+            mask = mask.copy()  # Буфер маски будет перезаписан следующим кадром
+        running = True
+        for sink in self.sinks:
+            running = sink.write(frame, mask, center) and running
+        return running
+
+    def read(self):
+        """
+        Читает очередной кадр: из фонового буфера (самый свежий) или напрямую с камеры.
+        :return: пара (успех, кадр).
+        """
+        if self.grabber:
+            return self.grabber.read()
+        return self.cap.read()
+
+    def stats(self):
+        """
+        Счётчики кадров фонового захвата (captured/dropped/processed и их FPS).
+        :return: словарь со счётчиками или None, если фоновый захват выключен.
+        """
+        if self.grabber:
+            return self.grabber.stats()
+        return None
+
+    def temporal_stats(self):
+        """
+        Счётчики слежения между кадрами: доля пропущенных кадров; среди обработанных — доли кадров в окне,
+        возвратов ко всей полосе и обработанных столбцов полосы.
+        :return: словарь со счётчиками или None, если режим temporal выключен.
+        """
+        if not self.signature:
+            return None
+        stats = self.signature.stats()
+        if self.roi.frames:
+            stats.update({key: value for key, value in self.roi.stats().items() if key != "frames"})
+        return stats
+
+    def print_stats(self):
+        """
+        Выводит счётчики кадров фонового захвата.
+        """
+        stats = self.stats()
+        if stats:
+            print("[+] Кадры: захвачено {captured} ({captured_fps:.1f}/с), "
+                  "обработано {processed} ({processed_fps:.1f}/с), "
+                  "отброшено {dropped} ({dropped_fps:.1f}/с)".format(**stats))
 
     def track(self, callback=print):
         """
         Основной метод для запуска трекера.
         """
+        if self.grabber:
+            self.grabber.start()
+        last_report = time.monotonic()
 
         while True:
-            ret, frame = self.cap.read()
+            t = self.telemetry.now()
+            ret, frame = self.read()
             if not ret:
                 print("[!] Проблемы с чтением кадра.")
                 break
+            # Время захвата: из фонового буфера или от источника, который его сообщает (robot.shared.SharedCapture)
+            captured_at = self.grabber.timestamp if self.grabber else getattr(self.cap, "timestamp", None)
+            self.telemetry.frame(captured_at or self.telemetry.now())
+            self.telemetry.record("read", t)
 
             # Обрабатываем текущий кадр
-            processed_frame, mask, center = self.process_frame(frame)
-
-            callback(center)
+            frame, mask, center = self.process_frame(frame)
 
-            # Отображаем результат
-            cv2.imshow("Original with Line Center", processed_frame)
-            cv2.imshow("Mask", mask)
+            t = self.telemetry.now()
+            if self.junctions:
+                callback(center, self.junction)
+            else:
+                callback(center)
+            t = self.telemetry.record("callback", t)
 
-            # Сохраняем маску и оригинальный кадр
-            # cv2.imwrite(f"{self.output_dir}/frame_{frame_count}.png", processed_frame)
-            # cv2.imwrite(f"{self.output_dir}/mask_{frame_count}.png", mask)
+            # Отображаем и сохраняем результат
+            running = self.emit(frame, mask, center)
+            self.telemetry.record("sinks", t)
+            self.telemetry.report()
 
-            # Сохраняем видео, если включено
-            if self.save_video:
-                self.out.write(processed_frame)
-                # self.mask_writer.write(mask)
+            # Периодический вывод счётчиков кадров
+            if self.grabber and time.monotonic() - last_report > self.stats_interval:
+                self.print_stats()
+                last_report = time.monotonic()
 
-
-            # Управление с клавиатуры
-            key = cv2.waitKey(1) & 0xFF
-            if key == ord("q"):  # Выход
+            if not running:  # Выход
                 break
 
         self.stop()
@@ -127,10 +423,14 @@ class Camera:
         """
         Освобождает ресурсы камеры и закрывает окна.
         """
+        if self.grabber:
+            self.grabber.stop()
+            self.print_stats()
+        if self.signature:
+            print(f"[+] Слежение между кадрами: {self.temporal_stats()}")
         self.cap.release()
-        if self.save_video:
-            self.out.release()
-        cv2.destroyAllWindows()
+        for sink in self.sinks:
+            sink.close()
         print("[+] Трекер остановлен.")
 
 
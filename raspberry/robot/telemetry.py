@@ -0,0 +1,160 @@
+import json
+import socket
+import threading
+import time
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+
+
+class SocketExporter:
+    """
+    Отправка сводок телеметрии датаграммами JSON на локальный UDP-порт или Unix-сокет.
+    """
+
+    def __init__(self, address: Union[str, Tuple[str, int]] = ("127.0.0.1", 9870)):
+        """
+        :param address: (хост, порт) для UDP или путь к Unix-сокету.
+        """
+        self.address = address
+        family = socket.AF_UNIX if isinstance(address, str) else socket.AF_INET
+        self.socket = socket.socket(family, socket.SOCK_DGRAM)
+        self.socket.setblocking(False)
+
+    def send(self, summary: Dict[str, Dict[str, float]]) -> None:
+        """
+        Отправляет сводку; ошибки (нет получателя, переполнен буфер) игнорируются.
+        """
+        try:
+            self.socket.sendto(json.dumps(summary).encode(), self.address)
+        except OSError:
+            pass
+
+    def close(self) -> None:
+        self.socket.close()
+
+
+class Telemetry:
+    """
+    Замеры времени этапов обработки: кольцевые буферы последних значений по этапам
+    и периодические сводки p50/p95/p99.
+    """
+
+    def __init__(self, size: int = 1024, interval: float = 5.0, exporter: Optional[SocketExporter] = None):
+        """
+        :param size: Число хранимых значений на этап.
+        :param interval: Период вывода сводки, сек (0 — не выводить).
+        :param exporter: Получатель сводок (например, SocketExporter).
+        """
+        self.size = size
+        self.interval = interval
+        self.exporter = exporter
+        self.lock = threading.Lock()
+        self.samples: Dict[str, np.ndarray] = {}
+        self.counts: Dict[str, int] = {}
+        self.captured_at: Optional[float] = None  # Время захвата кадра, ещё не дошедшего до моторов
+        self.last_report = time.monotonic()
+
+    @staticmethod
+    def now() -> float:
+        """
+        Монотонная отметка времени, сек.
+        """
+        return time.monotonic()
+
+    def add(self, stage: str, value: float) -> None:
+        """
+        Добавляет значение этапа (сек).
+        """
+        with self.lock:
+            samples = self.samples.get(stage)
+            if samples is None:
+                samples = self.samples[stage] = np.zeros(self.size)
+                self.counts[stage] = 0
+            samples[self.counts[stage] % self.size] = value
+            self.counts[stage] += 1
+
+    def record(self, stage: str, start: float) -> float:
+        """
+        Записывает длительность этапа от start до текущего момента.
+
+        :param stage: Название этапа.
+        :param start: Отметка начала этапа (Telemetry.now()).
+        :return: Отметка конца этапа (удобно как начало следующего).
+        """
+        end = time.monotonic()
+        self.add(stage, end - start)
+        return end
+
+    def frame(self, captured_at: float) -> None:
+        """
+        Отмечает время захвата кадра для измерения задержки от захвата до моторов.
+        """
+        self.captured_at = captured_at
+
+    def actuated(self) -> None:
+        """
+        Отмечает отправку команды моторам: задержка считается один раз на кадр.
+        """
+        captured_at, self.captured_at = self.captured_at, None
+        if captured_at is not None:
+            self.record("capture_to_actuation", captured_at)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Сводка по этапам: число значений, среднее и перцентили в миллисекундах.
+        """
+        with self.lock:
+            snapshot = {stage: samples[:min(self.counts[stage], self.size)].copy()
+                        for stage, samples in self.samples.items()}
+            counts = dict(self.counts)
+        result = {}
+        for stage, values in snapshot.items():
+            if not values.size:
+                continue
+            p50, p95, p99 = np.percentile(values, (50, 95, 99)) * 1000
+            result[stage] = {"count": counts[stage], "mean": float(values.mean() * 1000),
+                             "p50": float(p50), "p95": float(p95), "p99": float(p99)}
+        return result
+
+    def report(self, force: bool = False) -> None:
+        """
+        Выводит и экспортирует сводку, если прошёл период interval.
+
+        :param force: Вывести сводку независимо от периода.
+        """
+        now = time.monotonic()
+        if not force and (not self.interval or now - self.last_report < self.interval):
+            return
+        self.last_report = now
+        summary = self.summary()
+        print("[+] Телеметрия (мс):")
+        for stage, values in summary.items():
+            print(f"    {stage:<22} p50 {values['p50']:7.3f}  p95 {values['p95']:7.3f}  "
+                  f"p99 {values['p99']:7.3f}  (n={values['count']})")
+        if self.exporter:
+            self.exporter.send(summary)
+
+
+class NullTelemetry(Telemetry):
+    """
+    Отключённая телеметрия: замеры не сохраняются.
+    """
+
+    def __init__(self):
+        super().__init__(size=1, interval=0)
+
+    def add(self, stage: str, value: float) -> None:
+        pass
+
+    def record(self, stage: str, start: float) -> float:
+        return start
+
+    def frame(self, captured_at: float) -> None:
+        pass
+
+    def actuated(self) -> None:
+        pass
+
+    def report(self, force: bool = False) -> None:
+        pass
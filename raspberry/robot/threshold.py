@@ -0,0 +1,110 @@
+from typing import Optional
+
+import cv2
+import numpy as np
+
+
+def histogram(gray: cv2.Mat) -> np.ndarray:
+    """
+    Гистограмма яркости изображения в оттенках серого за один проход.
+
+    :param gray: Изображение в оттенках серого (uint8).
+    :return: Массив из 256 счётчиков.
+    """
+    return np.bincount(gray.ravel(), minlength=256)
+
+
+def dt_from_histogram(hist: np.ndarray, work_height: int, min_width: int = 30, max_width: int = 60,
+                      default: Optional[int] = None) -> Optional[int]:
+    """
+    Подбирает порог бинаризации по гистограмме рабочей области.
+
+    При THRESH_BINARY_INV с порогом i белыми становятся пиксели со значением <= i, поэтому площадь линии
+    для всех порогов сразу — накопленная гистограмма. Подходящими считаются пороги, при которых ширина
+    линии лежит в диапазоне (min_width, max_width); возвращается медиана подходящих порогов.
+
+    :param hist: Гистограмма яркости (256 значений).
+    :param work_height: Высота рабочей области в пикселях.
+    :param min_width: Минимальная ширина линии в пикселях.
+    :param max_width: Максимальная ширина линии в пикселях.
+    :param default: Значение, если подходящих порогов нет.
+    :return: Порог бинаризации.
+    """
+    area = np.cumsum(hist)
+    dt = np.flatnonzero((area > work_height * min_width) & (area < work_height * max_width))
+    if dt.size:
+        return int(dt[dt.size // 2])
+    return default
+
+
+def autoconf_dt(img: cv2.Mat, work_pos: int = 400, work_width: int = 245, work_height: int = 20,
+                blur: int = 13) -> int:
+    """
+    Автоматически определяет подходящее значение порога для бинаризации.
+
+    :param img: Входное изображение в формате BGR.
+    :param work_pos: Верхняя граница области анализа.
+    :param work_width: Ширина области анализа.
+    :param work_height: Высота области анализа.
+    :param blur: Размер размытия.
+    :return: Оптимальное значение порога (115, если подобрать не удалось).
+    """
+    height, width, _ = img.shape  # Размеры изображения
+
+    # Обрезка области анализа
+    crop = img[work_pos:work_pos + work_height,
+               (width - work_width) // 2: (width + work_width) // 2]
+
+    # Преобразование обрезанной области в оттенки серого и размытие
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+    gray = cv2.GaussianBlur(gray, (blur, blur), 0)
+
+    return dt_from_histogram(histogram(gray), work_height, default=115)
+
+
+class ThresholdTracker:
+    """
+    Онлайн-подстройка глобального порога: раз в несколько кадров гистограмма рабочей области
+    подмешивается к скользящей (экспоненциальное сглаживание), и по ней пересчитывается порог.
+    """
+
+    def __init__(self, work_height: int, dt: int = 100, every: int = 10, alpha: float = 0.2,
+                 min_width: int = 30, max_width: int = 60):
+        """
+        :param work_height: Высота рабочей области в пикселях.
+        :param dt: Начальный порог.
+        :param every: Пересчитывать порог каждые every кадров.
+        :param alpha: Коэффициент экспоненциального сглаживания гистограммы (0..1].
+        :param min_width: Минимальная ширина линии в пикселях.
+        :param max_width: Максимальная ширина линии в пикселях.
+        """
+        self.work_height = work_height
+        self.dt = dt
+        self.every = max(1, every)
+        self.alpha = alpha
+        self.min_width = min_width
+        self.max_width = max_width
+        self.hist: Optional[np.ndarray] = None  # Скользящая гистограмма
+        self.count = 0
+
+    def update(self, gray: cv2.Mat) -> int:
+        """
+        Учитывает очередной кадр рабочей области.
+
+        :param gray: Размытая рабочая область в оттенках серого.
+        :return: Текущий порог.
+        """
+        self.count += 1
+        if self.hist is not None and self.count % self.every:
+            return self.dt
+
+        hist = histogram(gray)
+        if self.hist is None:
+            self.hist = hist.astype(np.float64)
+        else:
+            self.hist += self.alpha * (hist - self.hist)
+
+        dt = dt_from_histogram(self.hist, self.work_height, self.min_width, self.max_width)
+        if dt is not None:  # Если подобрать не удалось — оставляем прежний порог
+            self.dt = dt
+        return self.dt
@@ -0,0 +1,148 @@
+import time
+from collections import deque
+from enum import IntEnum
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .telemetry import NullTelemetry
+
+
+class TrackState(IntEnum):
+    """
+    Состояние слежения за линией.
+    """
+    TRACKING = 0  # Линия видна
+    COASTING = 1  # Линия потеряна недавно: движение по прогнозу
+    SEARCHING = 2  # Поиск линии поворотом в стороны
+    STOPPED = 3  # Линия не найдена: остановка
+
+
+class LineTracker:
+    """
+    Слежение за углом на линию с восстановлением после потери: фильтр Калмана с постоянной скоростью
+    изменения угла прогнозирует положение линии при коротких пропаданиях, затем выполняется
+    ограниченный по времени поиск, после чего робот останавливается.
+    """
+
+    def __init__(self, coast: float = 0.3, search: float = 2.0, search_angle: float = 45.0,
+                 coast_scale: float = 0.7, search_scale: float = 0.5, process_noise: float = 200.0,
+                 measurement_noise: float = 4.0, history: int = 16):
+        """
+        :param coast: Время движения по прогнозу после потери линии, сек.
+        :param search: Время поиска после прогноза, сек.
+        :param search_angle: Угол поворота при поиске, градусы.
+        :param coast_scale: Множитель мощности при движении по прогнозу.
+        :param search_scale: Множитель мощности при поиске.
+        :param process_noise: Дисперсия ускорения изменения угла, (град/с²)².
+        :param measurement_noise: Дисперсия измерения угла, град².
+        :param history: Число хранимых измерений.
+        """
+        self.coast = coast
+        self.search = search
+        self.search_angle = search_angle
+        self.coast_scale = coast_scale
+        self.search_scale = search_scale
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self.history: deque = deque(maxlen=history)  # (время, центр, угол)
+        self.telemetry = NullTelemetry()
+
+        self.state = TrackState.STOPPED
+        self.x = np.zeros(2)  # Угол (град) и скорость его изменения (град/с)
+        self.p = np.eye(2) * 1e3  # Ковариация оценки
+        self.updated_at: Optional[float] = None  # Время последнего шага фильтра
+        self.lost_at: Optional[float] = None  # Время потери линии
+        self.side = 1.0  # Сторона, в которой линия была видна последней (+1 — слева)
+
+        # Счётчики
+        self.losses = 0  # Потерь линии
+        self.recovered = 0  # Линия найдена снова
+        self.failed = 0  # Остановок: линия не найдена за время поиска
+
+    def _predict(self, now: float) -> None:
+        """
+        Шаг прогноза фильтра до момента now.
+        """
+        if self.updated_at is None:
+            self.updated_at = now
+            return
+        dt = max(now - self.updated_at, 0.0)
+        self.updated_at = now
+        f = np.array([[1.0, dt], [0.0, 1.0]])
+        q = self.process_noise * np.array([[dt ** 4 / 4, dt ** 3 / 2], [dt ** 3 / 2, dt ** 2]])
+        self.x = f @ self.x
+        self.p = f @ self.p @ f.T + q
+
+    def _correct(self, angle: float) -> None:
+        """
+        Шаг коррекции фильтра по измеренному углу.
+        """
+        s = self.p[0, 0] + self.measurement_noise
+        k = self.p[:, 0] / s
+        self.x = self.x + k * (angle - self.x[0])
+        self.p = self.p - np.outer(k, self.p[0])
+
+    def update(self, angle: Optional[float], center: Optional[Tuple[int, int]] = None,
+               now: Optional[float] = None) -> Optional[Tuple[float, float]]:
+        """
+        Обновляет состояние по очередному кадру.
+
+        :param angle: Измеренный угол на линию (градусы) или None, если линия не найдена.
+        :param center: Центр линии (для истории).
+        :param now: Время кадра (time.monotonic), по умолчанию — текущее.
+        :return: (угол, множитель мощности) для движения или None — остановиться.
+        """
+        now = time.monotonic() if now is None else now
+
+        if angle is not None:
+            if self.lost_at is not None:
+                # Линия найдена снова
+                self.telemetry.add("reacquire", now - self.lost_at)
+                self.recovered += 1
+                self.lost_at = None
+            if self.state == TrackState.STOPPED:
+                # Первое измерение (или после остановки): фильтр начинается с измерения
+                self.x = np.array([angle, 0.0])
+                self.p = np.diag([self.measurement_noise, 1e3])
+                self.updated_at = now
+            else:
+                self._predict(now)
+                self._correct(angle)
+            self.state = TrackState.TRACKING
+            self.history.append((now, center, angle))
+            if angle:
+                self.side = 1.0 if angle > 0 else -1.0
+            return angle, 1.0
+
+        if self.state == TrackState.TRACKING:
+            self.state = TrackState.COASTING
+            self.lost_at = now
+            self.losses += 1
+        if self.lost_at is None:
+            return None  # Линии ещё не было или робот уже остановлен
+
+        lost = now - self.lost_at
+        if lost < self.coast:
+            # Прогноз угла по постоянной скорости изменения
+            self._predict(now)
+            return float(np.clip(self.x[0], -90.0, 90.0)), self.coast_scale
+
+        if lost < self.coast + self.search:
+            # Поиск: сначала в сторону, где линия была видна последней, затем в противоположную
+            self.state = TrackState.SEARCHING
+            phase = (lost - self.coast) / self.search
+            side = self.side if phase < 1 / 3 else -self.side
+            return side * self.search_angle, self.search_scale
+
+        self.state = TrackState.STOPPED
+        self.lost_at = None
+        self.failed += 1
+        self.telemetry.add("reacquire_failed", lost)
+        return None
+
+    def stats(self) -> dict:
+        """
+        Счётчики потерь линии.
+        """
+        return {"state": self.state.name, "losses": self.losses, "recovered": self.recovered, "failed": self.failed}
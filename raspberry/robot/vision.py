@@ -0,0 +1,162 @@
+from enum import IntEnum
+from math import atan, degrees
+from typing import NamedTuple, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Центроиды полос: координаты относительно рабочей области (y < 0 — полосы выше work_pos) и площадь в пикселях
+BAND_DTYPE = np.dtype([("x", np.float32), ("y", np.float32), ("area", np.float32)])
+
+# Минимальная площадь линии в пикселях (как m00 > 2000 для маски 0/255)
+MIN_AREA = 2000 / 255
+
+
+class Junction(IntEnum):
+    """
+    Тип участка линии в рабочей области.
+    """
+    LOST = 0  # Линия не найдена
+    STRAIGHT = 1  # Линия без ответвлений
+    LEFT = 2  # Ответвление влево (поворот или Т-образный перекрёсток)
+    RIGHT = 3  # Ответвление вправо
+    CROSS = 4  # Ответвления в обе стороны
+
+
+class JunctionFit(NamedTuple):
+    """
+    Результат распознавания перекрёстка в координатах рабочей области.
+    """
+    kind: Junction
+    forward: bool  # Линия продолжается вперёд над ответвлениями
+    center: Optional[Tuple[int, int]]  # Центр основной линии (без ответвлений)
+    row: float  # y ответвлений (NaN, если их нет)
+    left: float  # x конца левого ответвления (NaN, если его нет)
+    right: float  # x конца правого ответвления (NaN, если его нет)
+
+
+class LineFit(NamedTuple):
+    """
+    Аппроксимация линии по центроидам полос.
+    """
+    heading: float  # Направление линии в ближней полосе, градусы (знак как у Callback.calculate_angle)
+    curvature: float  # Кривизна x(y) в ближней полосе, 1/пиксель
+    valid: int  # Число полос, в которых найдена линия
+
+
+def band_centroids(mask: cv2.Mat, bands: int, min_area: float = MIN_AREA) -> np.ndarray:
+    """
+    Вычисляет центроиды линии в bands полосах одинаковой высоты за один векторизованный проход.
+
+    :param mask: Маска объединённой рабочей области (полосы сверху вниз, нижняя — ближайшая).
+    :param bands: Число полос.
+    :param min_area: Минимальная площадь линии в полосе; в полосах без линии x и y равны NaN.
+    :return: Массив BAND_DTYPE длины bands; индекс 0 — ближняя (нижняя) полоса,
+             y отсчитывается от верхнего края ближней полосы.
+    """
+    height, width = mask.shape[:2]
+    band_height = height // bands
+    m = (mask[height - bands * band_height:] > 0).reshape(bands, band_height, width)[::-1]
+
+    cols = m.sum(axis=1, dtype=np.float32)  # (bands, width)
+    rows = m.sum(axis=2, dtype=np.float32)  # (bands, band_height)
+    area = cols.sum(axis=1)
+
+    result = np.empty(bands, dtype=BAND_DTYPE)
+    result["area"] = area
+    with np.errstate(invalid="ignore", divide="ignore"):
+        result["x"] = cols @ np.arange(width, dtype=np.float32) / area
+        result["y"] = rows @ np.arange(band_height, dtype=np.float32) / area \
+            - np.arange(bands, dtype=np.float32) * band_height
+    result["x"][area <= min_area] = np.nan
+    result["y"][area <= min_area] = np.nan
+    return result
+
+
+def fit_line(centroids: np.ndarray) -> LineFit:
+    """
+    Аппроксимирует линию x(y) по центроидам полос (парабола при 3+ точках, иначе прямая).
+
+    :param centroids: Массив BAND_DTYPE из band_centroids.
+    :return: Направление и кривизна линии в ближней полосе.
+    """
+    valid = ~np.isnan(centroids["x"])
+    count = int(valid.sum())
+    if count < 2:
+        return LineFit(0.0, 0.0, count)
+
+    x = centroids["x"][valid].astype(np.float64)
+    y = centroids["y"][valid].astype(np.float64)
+    if count >= 3:
+        a, b, _ = np.polyfit(y, x, 2)
+    else:
+        a, (b, _) = 0.0, np.polyfit(y, x, 1)
+
+    # Наклон dx/dy в ближней точке: положительный — линия уходит влево по ходу движения
+    slope = 2 * a * y[0] + b
+    curvature = 2 * a / (1 + slope * slope) ** 1.5
+    return LineFit(degrees(atan(slope)), float(curvature), count)
+
+
+def nearest_center(centroids: np.ndarray) -> Optional[Tuple[int, int]]:
+    """
+    Центр линии в ближней полосе в формате Camera.calculate_center.
+
+    :param centroids: Массив BAND_DTYPE из band_centroids.
+    :return: Координаты (x, y) или None.
+    """
+    x, y, _ = centroids[0]
+    if np.isnan(x):
+        return None
+    return int(x), int(y)
+
+
+def classify_junction(mask: cv2.Mat, arm: float = 3.0, min_rows: int = 3, min_area: float = MIN_AREA) -> JunctionFit:
+    """
+    Распознаёт перекрёсток по профилю строк маски: строки, где линия намного шире обычного,
+    принадлежат ответвлениям; по их краям относительно основной линии определяется направление.
+
+    :param mask: Маска рабочей области.
+    :param arm: Во сколько раз строка ответвления шире линии (и насколько ширин линии ответвление
+                выходит за основную линию).
+    :param min_rows: Минимальное число строк ответвления (и основной линии над ним).
+    :param min_area: Минимальная площадь линии в пикселях.
+    :return: Тип участка, центр основной линии и концы ответвлений.
+    """
+    nan = float("nan")
+    m = mask > 0
+    height, width = m.shape[:2]
+    counts = m.sum(axis=1)
+    present = counts > 0
+    if counts.sum() <= min_area:
+        return JunctionFit(Junction.LOST, False, None, nan, nan, nan)
+
+    # Ширина линии — по узким строкам (ответвления занимают меньшую часть строк)
+    line_width = max(float(np.percentile(counts[present], 25)), 1.0)
+    wide = counts > arm * line_width
+    trunk = present & ~wide
+
+    columns = np.arange(width, dtype=np.float32)
+    rows = np.arange(height, dtype=np.float32)
+    lines = trunk if trunk.any() else present
+    center_x = float((m[lines] @ columns).sum() / counts[lines].sum())
+    center_y = float((counts[lines] * rows[lines]).sum() / counts[lines].sum())
+    center = (int(center_x), int(center_y))
+    if wide.sum() < min_rows:
+        return JunctionFit(Junction.STRAIGHT, True, center, nan, nan, nan)
+
+    # Края линии в строках ответвлений
+    left_edge = m[wide].argmax(axis=1)
+    right_edge = width - 1 - m[wide][:, ::-1].argmax(axis=1)
+    reach = arm * line_width
+    has_left = int((left_edge < center_x - reach).sum()) >= min_rows
+    has_right = int((right_edge > center_x + reach).sum()) >= min_rows
+    if not (has_left or has_right):
+        return JunctionFit(Junction.STRAIGHT, True, center, nan, nan, nan)
+
+    wide_rows = np.nonzero(wide)[0]
+    forward = int(trunk[:wide_rows[0]].sum()) >= min_rows  # Линия над ответвлениями
+    kind = Junction.CROSS if has_left and has_right else Junction.LEFT if has_left else Junction.RIGHT
+    return JunctionFit(kind, forward, center, float(wide_rows.mean()),
+                       float(left_edge.min()) if has_left else nan,
+                       float(right_edge.max()) if has_right else nan)
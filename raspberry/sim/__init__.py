@@ -0,0 +1,7 @@
+"""
+Моделирование следования по линии без поля и платы: кинематика привода, отрисовка кадров камеры
+по карте трассы и фиктивная плата Firmata.
+"""
+from .board import FakeArduino, FirmataWire
+from .kinematics import DiffDrive, SimChassis
+from .track import PerspectiveRenderer, SimCapture, TrackMap
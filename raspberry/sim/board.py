@@ -0,0 +1,139 @@
+from typing import Dict, List, Optional, Tuple
+
+import pyfirmata
+
+
+class FirmataWire:
+    """
+    Последовательный порт фиктивной платы: разбирает поток сообщений Firmata (в том числе разбитых между
+    записями) и хранит состояние пинов на стороне платы — как его видела бы прошивка StandardFirmata.
+    """
+
+    def __init__(self, on_change=None):
+        """
+        :param on_change: Функция без аргументов, вызываемая после каждой записи, изменившей пины.
+        """
+        self.on_change = on_change
+        self.modes: Dict[int, int] = {}  # Режимы пинов (SET_PIN_MODE)
+        self.levels: Dict[int, int] = {}  # Уровни цифровых пинов
+        self.duty: Dict[int, int] = {}  # Скважность ШИМ (0-255)
+        self.buffer = bytearray()  # Незавершённое сообщение
+
+        # Счётчики
+        self.writes = 0  # Вызовов write (записей в порт)
+        self.bytes = 0
+        self.messages = 0
+
+    def write(self, data) -> int:
+        self.writes += 1
+        self.bytes += len(data)
+        self.buffer += data
+        changed = False
+        while self.buffer:
+            command = self.buffer[0]
+            if command == pyfirmata.START_SYSEX:
+                end = self.buffer.find(pyfirmata.END_SYSEX)
+                if end < 0:
+                    break
+                del self.buffer[:end + 1]
+                self.messages += 1
+                continue
+            if command < 0x80:
+                del self.buffer[0]  # Байт данных вне сообщения: пропускаем
+                continue
+            if len(self.buffer) < 3:
+                break
+            _, lsb, msb = self.buffer[:3]
+            del self.buffer[:3]
+            self.messages += 1
+            value = lsb | msb << 7
+            if command == pyfirmata.SET_PIN_MODE:
+                self.modes[lsb] = msb
+            elif command & 0xF0 == pyfirmata.DIGITAL_MESSAGE:
+                port = command & 0x0F
+                for bit in range(8):
+                    self.levels[port * 8 + bit] = value >> bit & 1
+            elif command & 0xF0 == pyfirmata.ANALOG_MESSAGE:
+                self.duty[command & 0x0F] = value
+            changed = True
+        if changed and self.on_change:
+            self.on_change()
+        return len(data)
+
+    def motor_power(self, inA: int, inB: int, pwm: int) -> float:
+        """
+        Мощность мотора по состоянию пинов драйвера (как в hardware.Motor: inA — вперёд, inB — назад).
+
+        :return: Мощность в диапазоне от -1.0 до 1.0.
+        """
+        duty = self.duty.get(pwm, 0) / 255
+        a, b = self.levels.get(inA, 0), self.levels.get(inB, 0)
+        if a and not b:
+            return duty
+        if b and not a:
+            return -duty
+        return 0.0
+
+    def stats(self) -> Dict[str, int]:
+        return {"writes": self.writes, "bytes": self.bytes, "messages": self.messages}
+
+    def close(self) -> None:
+        pass
+
+
+class FakeArduino:
+    """
+    Фиктивная плата с интерфейсом pyfirmata.Arduino (digital, analog, sp): пины — объекты pyfirmata,
+    записи в порт разбираются FirmataWire. К плате можно привязать модель привода: мощности моторов
+    передаются ей после каждой записи.
+    """
+
+    def __init__(self, layout: Optional[dict] = None, name: str = "sim"):
+        """
+        :param layout: Описание пинов платы (по умолчанию pyfirmata.BOARDS["arduino"]).
+        :param name: Имя платы.
+        """
+        layout = layout or pyfirmata.BOARDS["arduino"]
+        self.name = name
+        self.sp = FirmataWire(self._update)
+        self.analog = [pyfirmata.Pin(self, i) for i in layout["analog"]]
+        self.digital_ports = [pyfirmata.Port(self, i) for i in range((len(layout["digital"]) + 7) // 8)]
+        self.digital: List[pyfirmata.Pin] = [pin for port in self.digital_ports for pin in port.pins]
+        self.digital = self.digital[:len(layout["digital"])]
+        for i in layout["pwm"]:
+            self.digital[i].PWM_CAPABLE = True
+        for i in layout.get("disabled", ()):
+            self.digital[i].mode = pyfirmata.UNAVAILABLE
+
+        self.model = None
+        self.motors: Tuple[Tuple[int, int, int], Tuple[int, int, int]] = ((0, 0, 0), (0, 0, 0))
+
+    def __str__(self):
+        return f"FakeArduino {self.name}"
+
+    def bind(self, model, left: Tuple[int, int, int], right: Tuple[int, int, int]) -> None:
+        """
+        Передаёт мощности моторов модели привода (sim.kinematics.DiffDrive.command).
+
+        :param model: Модель привода.
+        :param left: Пины (inA, inB, PWM) левого мотора.
+        :param right: Пины (inA, inB, PWM) правого мотора.
+        """
+        self.model = model
+        self.motors = (left, right)
+
+    def power(self) -> Tuple[float, float]:
+        """
+        Мощности (левый, правый) по состоянию пинов платы.
+        """
+        return self.sp.motor_power(*self.motors[0]), self.sp.motor_power(*self.motors[1])
+
+    def _update(self) -> None:
+        if self.model is not None:
+            self.model.command(*self.power())
+
+    def iterate(self) -> None:
+        pass
+
+    def exit(self) -> None:
+        self.sp.close()
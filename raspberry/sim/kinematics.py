@@ -0,0 +1,133 @@
+from collections import deque
+from math import cos, exp, sin
+from typing import Tuple
+
+from robot.hardware import Chassis
+
+
+class DiffDrive:
+    """
+    Кинематика робота с дифференциальным приводом: мощности моторов переводятся в скорости колёс
+    (с мёртвой зоной и инерцией мотора первого порядка), положение интегрируется по дуге.
+
+    Подключение моторов повторяет робота: отрицательная мощность — вперёд (Chassis.steer),
+    мотор "left" вращает правое колесо, "right" — левое.
+    """
+
+    def __init__(self, wheel_base: float = 0.16, max_speed: float = 0.8, time_constant: float = 0.08,
+                 deadband: float = 0.05, latency: float = 0.0, invert: bool = True, swap: bool = True):
+        """
+        :param wheel_base: Расстояние между колёсами, м.
+        :param max_speed: Скорость колеса при мощности 1.0, м/с.
+        :param time_constant: Постоянная времени разгона мотора, сек.
+        :param deadband: Мощность, ниже которой колесо не вращается.
+        :param latency: Задержка от команды до мотора (порт, прошивка), сек.
+        :param invert: Положительная мощность вращает колесо назад.
+        :param swap: Мотор "left" вращает правое колесо.
+        """
+        self.wheel_base = wheel_base
+        self.max_speed = max_speed
+        self.time_constant = time_constant
+        self.deadband = deadband
+        self.latency = latency
+        self.invert = invert
+        self.swap = swap
+
+        self.time = 0.0  # Время моделирования, сек
+        self.x = self.y = self.heading = 0.0  # Положение (м) и курс (рад, против часовой стрелки)
+        self.speeds = (0.0, 0.0)  # Скорости левого и правого колёс, м/с
+        self.targets = (0.0, 0.0)  # Установившиеся скорости колёс по последней команде
+        self.pending: deque = deque()  # Команды, ещё не дошедшие до моторов: (время, левое, правое)
+        self.distance = 0.0  # Пройденный путь, м
+
+    def reset(self, x: float = 0.0, y: float = 0.0, heading: float = 0.0) -> None:
+        """
+        Ставит робота в точку (x, y) с курсом heading и останавливает колёса.
+        """
+        self.x, self.y, self.heading = x, y, heading
+        self.speeds = self.targets = (0.0, 0.0)
+        self.pending.clear()
+        self.time = self.distance = 0.0
+
+    def wheel_speed(self, power: float) -> float:
+        """
+        Установившаяся скорость колеса при заданной мощности мотора, м/с.
+        """
+        if abs(power) < self.deadband:
+            return 0.0
+        speed = max(-1.0, min(1.0, power)) * self.max_speed
+        return -speed if self.invert else speed
+
+    def command(self, lpower: float, rpower: float) -> None:
+        """
+        Мощности моторов (как в Chassis.set_power).
+
+        :param lpower: Мощность мотора "left" в диапазоне от -1.0 до 1.0.
+        :param rpower: Мощность мотора "right" в диапазоне от -1.0 до 1.0.
+        """
+        left, right = self.wheel_speed(lpower), self.wheel_speed(rpower)
+        if self.swap:
+            left, right = right, left
+        if self.latency:
+            self.pending.append((self.time + self.latency, left, right))
+        else:
+            self.targets = (left, right)
+
+    def step(self, dt: float) -> None:
+        """
+        Продвигает модель на dt секунд.
+        """
+        self.time += dt
+        while self.pending and self.pending[0][0] <= self.time:
+            _, left, right = self.pending.popleft()
+            self.targets = (left, right)
+
+        # Инерция мотора: экспоненциальное приближение к установившейся скорости
+        a = 1.0 - exp(-dt / self.time_constant) if self.time_constant > 0 else 1.0
+        left = self.speeds[0] + (self.targets[0] - self.speeds[0]) * a
+        right = self.speeds[1] + (self.targets[1] - self.speeds[1]) * a
+        self.speeds = (left, right)
+
+        v = (left + right) / 2
+        w = (right - left) / self.wheel_base
+        if abs(w) < 1e-9:
+            self.x += v * dt * cos(self.heading)
+            self.y += v * dt * sin(self.heading)
+        else:
+            # Точное интегрирование движения по дуге
+            heading = self.heading + w * dt
+            self.x += v / w * (sin(heading) - sin(self.heading))
+            self.y -= v / w * (cos(heading) - cos(self.heading))
+            self.heading = heading
+        self.distance += abs(v) * dt
+
+    @property
+    def pose(self) -> Tuple[float, float, float]:
+        """
+        Положение (x, y) в метрах и курс в радианах.
+        """
+        return self.x, self.y, self.heading
+
+
+class SimChassis(Chassis):
+    """
+    Шасси без платы: мощности передаются модели DiffDrive вместо моторов.
+    """
+
+    def __init__(self, model: DiffDrive, max_power: float = 0.3, k: float = 1.5, verbose: bool = False):
+        """
+        :param model: Модель привода.
+        :param max_power: Максимальная мощность, передаваемая на моторы.
+        :param k: Коэффициент коррекции мощности при поворотах.
+        :param verbose: Выводить рассчитанные мощности на каждом кадре.
+        """
+        super().__init__(None, None, max_power, k, verbose)
+        self.model = model
+        self.power: Tuple[float, float] = (0.0, 0.0)  # Последние отправленные мощности
+
+    def set_power(self, lpower: float, rpower: float) -> None:
+        t = self.telemetry.now()
+        self.power = (lpower, rpower)
+        self.model.command(lpower, rpower)
+        self.telemetry.record("actuate", t)
+        self.telemetry.actuated()
@@ -0,0 +1,211 @@
+import json
+from math import atan2, cos, radians, sin, tan
+from typing import Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+# Яркость покрытия поля и линии на карте
+FLOOR = 200
+LINE = 30
+
+
+class TrackMap:
+    """
+    Карта поля сверху: растр с линией и средняя линия трассы для расчёта отклонения и прогресса по кругу.
+    """
+
+    def __init__(self, points: Sequence[Tuple[float, float]], width: float = 0.025, closed: bool = True,
+                 resolution: float = 0.004, margin: float = 0.6, step: float = 0.005):
+        """
+        :param points: Вершины средней линии трассы, м.
+        :param width: Ширина линии, м.
+        :param closed: Трасса замкнута (круг).
+        :param resolution: Размер пикселя карты, м.
+        :param margin: Поле вокруг трассы, м.
+        :param step: Шаг дискретизации средней линии, м.
+        """
+        points = np.asarray(points, np.float64)
+        if closed and not np.allclose(points[0], points[-1]):
+            points = np.vstack([points, points[:1]])
+        self.width = width
+        self.closed = closed
+        self.resolution = resolution
+
+        # Средняя линия с равномерным шагом и длина дуги до каждой точки
+        segments = np.linalg.norm(np.diff(points, axis=0), axis=1)
+        arc = np.concatenate([[0.0], np.cumsum(segments)])
+        self.length = float(arc[-1])
+        self.s = np.arange(0.0, self.length, step)
+        self.path = np.column_stack([np.interp(self.s, arc, points[:, 0]), np.interp(self.s, arc, points[:, 1])])
+
+        # Растр: пиксель (строка, столбец) соответствует точке (origin + столбец * resolution, ...)
+        self.origin = points.min(axis=0) - margin
+        size = np.ceil((points.max(axis=0) + margin - self.origin) / resolution).astype(int) + 1
+        self.image = np.full((size[1], size[0]), FLOOR, np.uint8)
+        shift = 4  # Субпиксельная точность отрисовки
+        pixels = np.round((points - self.origin) / resolution * (1 << shift)).astype(np.int32)
+        cv2.polylines(self.image, [pixels], closed, LINE, max(1, int(round(width / resolution))), cv2.LINE_AA, shift)
+
+    @classmethod
+    def oval(cls, straight: float = 1.5, radius: float = 0.5, **options) -> "TrackMap":
+        """
+        Овальная трасса: две прямые и два полукруга, старт в начале нижней прямой, движение против часовой стрелки.
+
+        :param straight: Длина прямых, м.
+        :param radius: Радиус поворотов, м.
+        :param options: Параметры TrackMap (width, resolution и т.д.).
+        """
+        angles = np.linspace(-np.pi / 2, np.pi / 2, 64)
+        right = np.column_stack([straight + radius * np.cos(angles), radius + radius * np.sin(angles)])
+        left = np.column_stack([-radius * np.cos(angles), radius - radius * np.sin(angles)])
+        return cls(np.vstack([[0.0, 0.0], right, left]), closed=True, **options)
+
+    @classmethod
+    def load(cls, path: str, **options) -> "TrackMap":
+        """
+        Загружает трассу из JSON: {"points": [[x, y], ...], "width": 0.025, "closed": true}.
+
+        :param path: Путь к файлу.
+        """
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data["points"], data.get("width", 0.025), data.get("closed", True), **options)
+
+    def start(self) -> Tuple[float, float, float]:
+        """
+        Начальное положение: начало средней линии, курс по касательной.
+        """
+        (x0, y0), (x1, y1) = self.path[0], self.path[1]
+        return float(x0), float(y0), atan2(y1 - y0, x1 - x0)
+
+    def nearest(self, x: float, y: float) -> Tuple[float, float]:
+        """
+        Ближайшая точка средней линии.
+
+        :return: Отклонение от средней линии (м) и длина дуги до ближайшей точки (м).
+        """
+        d = (self.path[:, 0] - x) ** 2 + (self.path[:, 1] - y) ** 2
+        i = int(np.argmin(d))
+        return float(np.sqrt(d[i])), float(self.s[i])
+
+
+class PerspectiveRenderer:
+    """
+    Кадр камеры робота по карте поля: для каждого пикселя заранее вычисляется точка пола в системе
+    координат робота (камера на высоте height, наклонена вниз на pitch), на каждом кадре точки
+    поворачиваются и сдвигаются в положение робота одной матричной операцией и выбираются из карты (cv2.remap).
+    """
+
+    def __init__(self, track: TrackMap, width: int = 640, height: int = 480, camera_height: float = 0.12,
+                 pitch: float = 25.0, fov: float = 62.0, offset: float = 0.05, max_range: float = 3.0,
+                 rows: Optional[Tuple[int, int]] = None, color: bool = True, noise: float = 0.0, seed: int = 0):
+        """
+        :param track: Карта поля.
+        :param width: Ширина кадра, пиксели.
+        :param height: Высота кадра, пиксели.
+        :param camera_height: Высота камеры над полом, м.
+        :param pitch: Наклон камеры вниз, градусы.
+        :param fov: Горизонтальный угол обзора, градусы.
+        :param offset: Смещение камеры вперёд от оси колёс, м.
+        :param max_range: Дальность, дальше которой пол не рисуется, м.
+        :param rows: Отрисовываемые строки (начало, конец) — например, только рабочая область Camera;
+                     остальные строки заполнены цветом пола.
+        :param color: Кадр BGR (иначе — оттенки серого).
+        :param noise: СКО шума яркости.
+        :param seed: Начальное значение генератора шума.
+        """
+        self.track = track
+        self.width = width
+        self.height = height
+        self.rows = rows or (0, height)
+        self.color = color
+        self.noise = noise
+        self.rng = np.random.default_rng(seed)
+
+        # Луч каждого пикселя в системе координат робота (x — вперёд, y — влево, z — вверх)
+        f = width / 2 / tan(radians(fov) / 2)
+        v, u = np.mgrid[self.rows[0]:self.rows[1], 0:width].astype(np.float64)
+        xc, yc = (u - (width - 1) / 2) / f, (v - (height - 1) / 2) / f
+        cp, sp = np.cos(radians(pitch)), np.sin(radians(pitch))
+        down = sp + yc * cp  # Составляющая луча вниз
+        with np.errstate(divide="ignore"):
+            t = np.where(down > 1e-6, camera_height / down, np.inf)
+        forward = offset + t * (cp - yc * sp)
+        left = -t * xc
+        visible = np.isfinite(t) & (forward - offset < max_range)
+        # Невидимые точки уводятся за карту (заполняются цветом пола)
+        self.forward = np.where(visible, forward, -1e6).astype(np.float32)
+        self.left = np.where(visible, left, 0.0).astype(np.float32)
+
+        self.frame = np.full((height, width, 3) if color else (height, width), FLOOR, np.uint8)
+
+    def render(self, x: float, y: float, heading: float) -> np.ndarray:
+        """
+        Кадр камеры робота в положении (x, y) с курсом heading.
+
+        :return: Кадр (общий буфер: перезаписывается следующим вызовом).
+        """
+        c, s = cos(heading), sin(heading)
+        scale = 1.0 / self.track.resolution
+        ox, oy = self.track.origin
+        # Координаты точек пола в пикселях карты
+        map_x = (self.forward * (c * scale) - self.left * (s * scale)) + float((x - ox) * scale)
+        map_y = (self.forward * (s * scale) + self.left * (c * scale)) + float((y - oy) * scale)
+        gray = cv2.remap(self.track.image, map_x, map_y, cv2.INTER_LINEAR,
+                         borderMode=cv2.BORDER_CONSTANT, borderValue=FLOOR)
+        if self.noise:
+            gray = np.clip(gray + self.rng.normal(0.0, self.noise, gray.shape), 0, 255).astype(np.uint8)
+        top, bottom = self.rows
+        if self.color:
+            self.frame[top:bottom] = gray[..., None]
+        else:
+            self.frame[top:bottom] = gray
+        return self.frame
+
+
+class SimCapture:
+    """
+    Источник кадров с интерфейсом cv2.VideoCapture (read/get/release): на каждом чтении модель привода
+    продвигается на один период кадра и рисуется кадр из нового положения. Время — модельное,
+    поэтому моделирование идёт быстрее реального времени.
+    """
+
+    def __init__(self, model, renderer: PerspectiveRenderer, fps: float = 30.0, frames: int = 0, copy: bool = True):
+        """
+        :param model: Модель привода (sim.kinematics.DiffDrive).
+        :param renderer: Отрисовка кадров.
+        :param fps: Частота кадров камеры.
+        :param frames: Число кадров до конца "записи" (0 — без ограничения).
+        :param copy: Возвращать копию кадра (приёмники кадров хранят кадры в очереди);
+                     False — общий буфер отрисовки, перезаписываемый следующим чтением.
+        """
+        self.model = model
+        self.renderer = renderer
+        self.fps = fps
+        self.frames = frames
+        self.copy = copy
+        self.count = 0
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        if self.frames and self.count >= self.frames:
+            return False, None
+        if self.count:
+            self.model.step(1.0 / self.fps)
+        self.count += 1
+        frame = self.renderer.render(*self.model.pose)
+        return True, frame.copy() if self.copy else frame
+
+    def get(self, prop: int) -> float:
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self.renderer.width
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self.renderer.height
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return self.frames
+        return 0.0
+
+    def release(self) -> None:
+        pass
@@ -0,0 +1,235 @@
+import argparse
+import csv
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from math import inf
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from robot import Robot, Callback
+from robot.software import Camera
+from sim import DiffDrive, FakeArduino, PerspectiveRenderer, SimCapture, SimChassis, TrackMap
+
+# Параметры моделирования по умолчанию
+DEFAULTS = {
+    "max_power": 0.3,  # Максимальная мощность шасси
+    "k": 1.5,  # Коэффициент поворота шасси
+    "work_pos": 0.8,  # Верхняя граница рабочей области, доля высоты кадра
+    "work_width": 0.6,  # Ширина рабочей области, доля ширины кадра
+    "work_height": 40,  # Высота полосы рабочей области, пиксели
+    "bands": 1,  # Число полос детектора
+    "threshold": "adaptive",  # Режим бинаризации Camera
+    "fps": 30.0,  # Частота кадров камеры
+    "latency": 0.03,  # Задержка от кадра до моторов, сек
+    "noise": 0.0,  # СКО шума яркости кадра
+    "laps": 1,  # Число кругов
+    "timeout": 60.0,  # Максимальное модельное время, сек
+    "max_offset": 0.15,  # Отклонение от линии, при котором робот считается сошедшим с трассы, м
+    "firmata": False,  # Команды через Chassis и фиктивную плату Firmata (иначе — SimChassis)
+    "track": None,  # JSON-файл трассы (по умолчанию овал)
+    "camera": None,  # Параметры обработки Camera (словарь или JSON-файл sweep.py); ROI задаётся work_*
+    "temporal": False,  # Окно вокруг предыдущего центра и пропуск неизменившихся кадров (Camera temporal)
+}
+
+# Пины моторов, как в main.py
+LEFT_PINS = (3, 7, 5)
+RIGHT_PINS = (2, 4, 6)
+
+
+@lru_cache(maxsize=4)
+def load_track(path: Optional[str]) -> TrackMap:
+    """
+    Карта трассы (одна на процесс: растр строится один раз для всех наборов параметров).
+    """
+    return TrackMap.load(path) if path else TrackMap.oval()
+
+
+def simulate(params: Dict) -> Dict:
+    """
+    Проезжает трассу с заданными параметрами: кадры рисуются по положению модели, обрабатываются
+    Camera.process_frame и передаются Callback.follow_line, мощности моторов управляют моделью привода.
+
+    :param params: Параметры (см. DEFAULTS; неуказанные берутся по умолчанию).
+    :return: Параметры и результаты: время круга, отклонение от линии, доля кадров с линией, ускорение.
+    """
+    params = {**DEFAULTS, **params}
+    track = load_track(params["track"])
+    model = DiffDrive(latency=params["latency"])
+    model.reset(*track.start())
+
+    # Рисуются только строки рабочей области: остальная часть кадра детектором не используется
+    width, height = 640, 480
+    work_pos = int(height * params["work_pos"])
+    work_height = int(params["work_height"])
+    top = max(0, work_pos - (params["bands"] - 1) * work_height)
+    renderer = PerspectiveRenderer(track, width, height, rows=(top, min(height, work_pos + work_height)),
+                                   noise=params["noise"])
+    cap = SimCapture(model, renderer, params["fps"], copy=False)
+    camera = Camera(cap, save_video=False, headless=True, threshold=params["threshold"], bands=params["bands"],
+                    config=params["camera"], temporal=params["temporal"])
+    camera.set_roi(work_pos, int(width * params["work_width"]), work_height)
+
+    robot = Robot(None, verbose=False)
+    robot.camera = camera
+    if params["firmata"]:
+        # Те же Motor и Chassis, что на роботе: мощности проходят через сообщения Firmata
+        robot.board = FakeArduino()
+        robot.setup_motors(LEFT_PINS, RIGHT_PINS, params["max_power"], params["k"])
+        robot.board.bind(model, LEFT_PINS, RIGHT_PINS)
+    else:
+        robot.chassis = SimChassis(model, params["max_power"], params["k"])
+    callback = Callback(robot)
+
+    frames = detected = 0
+    errors: List[float] = []
+    laps: List[float] = []
+    progress = 0.0
+    _, previous = track.nearest(model.x, model.y)
+    started = time.perf_counter()
+    completed = False
+    while model.time < params["timeout"]:
+        _, frame = cap.read()
+        _, _, center = camera.process_frame(frame)
+        callback.follow_line(center)
+        frames += 1
+        detected += center is not None
+
+        # Отклонение от средней линии и пройденная доля круга
+        error, s = track.nearest(model.x, model.y)
+        errors.append(error)
+        if error > params["max_offset"]:
+            break
+        ds = s - previous
+        if ds < -track.length / 2:
+            ds += track.length
+        elif ds > track.length / 2:
+            ds -= track.length
+        progress += ds
+        previous = s
+        if progress >= track.length * (len(laps) + 1):
+            laps.append(model.time - sum(laps))
+            if len(laps) >= params["laps"]:
+                completed = True
+                break
+    elapsed = time.perf_counter() - started
+
+    errors = np.array(errors)
+    return {
+        **params,
+        "completed": completed,
+        "lap_time": float(np.mean(laps)) if laps else inf,
+        "best_lap": min(laps) if laps else inf,
+        "progress": progress / track.length,
+        "cte_mean": float(errors.mean()) if errors.size else 0.0,
+        "cte_rms": float(np.sqrt(np.mean(errors ** 2))) if errors.size else 0.0,
+        "cte_max": float(errors.max()) if errors.size else 0.0,
+        "detection_rate": detected / frames if frames else 0.0,
+        "frames": frames,
+        "sim_time": model.time,
+        "speedup": model.time / elapsed if elapsed else 0.0,
+        **(camera.temporal_stats() if params["temporal"] else {}),
+    }
+
+
+def rank(result: Dict):
+    """
+    Порядок результатов: сначала прошедшие все круги, затем по времени круга и отклонению от линии.
+    """
+    return not result["completed"], result["lap_time"], result["cte_rms"], -result["progress"]
+
+
+def sweep(grid: Dict[str, List], workers: int = 0, **fixed) -> List[Dict]:
+    """
+    Перебирает все сочетания параметров в пуле процессов.
+
+    :param grid: Значения перебираемых параметров, например {"max_power": [0.2, 0.3], "k": [1.0, 1.5]}.
+    :param workers: Число процессов (0 — по числу ядер).
+    :param fixed: Общие параметры всех прогонов.
+    :return: Результаты, отсортированные от лучшего.
+    """
+    names = list(grid)
+    configs = [{**fixed, **dict(zip(names, values))} for values in itertools.product(*grid.values())]
+    with ProcessPoolExecutor(workers or os.cpu_count()) as executor:
+        results = list(executor.map(simulate, configs))
+    return sorted(results, key=rank)
+
+
+def print_result(result: Dict) -> None:
+    lap = f"{result['lap_time']:6.2f} с" if result["completed"] else f"сход ({result['progress'] * 100:3.0f}%)"
+    print(f"    max_power {result['max_power']:.2f}  k {result['k']:.2f}  "
+          f"ROI {result['work_pos']:.2f}/{result['work_width']:.2f}/{result['work_height']}  "
+          f"круг {lap}  CTE rms {result['cte_rms'] * 1000:5.1f} мм, max {result['cte_max'] * 1000:5.1f} мм  "
+          f"линия {result['detection_rate'] * 100:5.1f}%  x{result['speedup']:.0f}")
+
+
+def run(args):
+    result = simulate(dict(max_power=args.max_power[0], k=args.k[0], work_pos=args.work_pos[0],
+                           work_width=args.work_width[0], work_height=args.work_height[0], **common(args)))
+    print_result(result)
+
+
+def grid(args):
+    grid = {"max_power": args.max_power, "k": args.k, "work_pos": args.work_pos,
+            "work_width": args.work_width, "work_height": args.work_height}
+    started = time.perf_counter()
+    results = sweep(grid, args.workers, **common(args))
+    print(f"[+] Наборов параметров: {len(results)} за {time.perf_counter() - started:.1f} с")
+    for result in results[:args.top]:
+        print_result(result)
+    if args.output:
+        with open(args.output, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+        print(f"[+] Результаты: {args.output}")
+
+
+def common(args) -> Dict:
+    return dict(bands=args.bands, threshold=args.threshold, fps=args.fps, latency=args.latency, noise=args.noise,
+                laps=args.laps, timeout=args.timeout, firmata=args.firmata, track=args.track, camera=args.camera,
+                temporal=args.temporal)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Моделирование следования по линии без поля и платы")
+    commands = parser.add_subparsers(dest="command", required=True)
+    parser_run = commands.add_parser("run", help="один проезд")
+    parser_run.set_defaults(run=run)
+    parser_sweep = commands.add_parser("sweep", help="перебор параметров в пуле процессов")
+    parser_sweep.add_argument("--workers", type=int, default=0, help="число процессов (0 — по числу ядер)")
+    parser_sweep.add_argument("--top", type=int, default=10, help="число лучших наборов в выводе")
+    parser_sweep.add_argument("-o", "--output", default="sweep.csv", help="CSV-файл со всеми результатами")
+    parser_sweep.set_defaults(run=grid)
+
+    for sub in (parser_run, parser_sweep):
+        sub.add_argument("--max-power", type=float, nargs="+", default=[DEFAULTS["max_power"]])
+        sub.add_argument("--k", type=float, nargs="+", default=[DEFAULTS["k"]])
+        sub.add_argument("--work-pos", type=float, nargs="+", default=[DEFAULTS["work_pos"]],
+                         help="верхняя граница рабочей области, доля высоты кадра")
+        sub.add_argument("--work-width", type=float, nargs="+", default=[DEFAULTS["work_width"]],
+                         help="ширина рабочей области, доля ширины кадра")
+        sub.add_argument("--work-height", type=int, nargs="+", default=[DEFAULTS["work_height"]],
+                         help="высота полосы рабочей области, пиксели")
+        sub.add_argument("--bands", type=int, default=DEFAULTS["bands"])
+        sub.add_argument("--threshold", choices=["adaptive", "global", "fixed"], default=DEFAULTS["threshold"])
+        sub.add_argument("--fps", type=float, default=DEFAULTS["fps"], help="частота кадров камеры")
+        sub.add_argument("--latency", type=float, default=DEFAULTS["latency"], help="задержка до моторов, сек")
+        sub.add_argument("--noise", type=float, default=DEFAULTS["noise"], help="СКО шума яркости")
+        sub.add_argument("--laps", type=int, default=DEFAULTS["laps"], help="число кругов")
+        sub.add_argument("--timeout", type=float, default=DEFAULTS["timeout"], help="модельное время, сек")
+        sub.add_argument("--firmata", action="store_true", help="команды через Chassis и фиктивную плату Firmata")
+        sub.add_argument("--track", help="JSON-файл трассы (по умолчанию овал)")
+        sub.add_argument("--camera", help="параметры обработки Camera (JSON-файл sweep.py)")
+        sub.add_argument("--temporal", action="store_true",
+                         help="окно вокруг предыдущего центра и пропуск неизменившихся кадров")
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
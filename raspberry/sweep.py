@@ -0,0 +1,311 @@
+import argparse
+import itertools
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+from bench import _FrameSource, load_frames
+from robot.software import Camera
+from robot.threshold import ThresholdTracker
+
+# Значения параметров обработки кадра для перебора (dt включает прежний список grab_image.dts)
+SPACE: Dict[str, list] = {
+    "work_pos": [0.6, 0.7, 0.75, 0.8, 0.85, 0.9],  # Доля высоты кадра
+    "work_width": [0.4, 0.5, 0.6, 0.7, 0.8, 1.0],  # Доля ширины кадра
+    "work_height": [20, 30, 40, 60],  # Пиксели
+    "blur": [5, 9, 13, 17, 21],
+    "threshold": ["adaptive", "global", "fixed"],
+    "block": [15, 21, 31, 41, 51],
+    "c": [5, 10, 15, 20, 25],
+    "dt": [10, 20, 30, 40, 50, 60, 80, 100, 115, 130],
+}
+
+# Параметры, от которых зависит размытая рабочая область (результат кэшируется для всех порогов)
+PREPROCESS = ("work_pos", "work_width", "work_height", "blur")
+# Параметры бинаризации
+THRESHOLD = ("threshold", "block", "c", "dt")
+
+# Веса оценки: доля кадров с линией минус штрафы за мерцание, дрожание центра и время кадра
+WEIGHTS = {"flicker": 1.0, "jitter": 2.0, "cost": 0.02}
+
+# Кадры записи в оттенках серого (в каждом процессе пула)
+_frames: List[np.ndarray] = []
+# Размытые рабочие области по параметрам PREPROCESS (в каждом процессе пула)
+_blurred: Dict[Tuple, Tuple[List[np.ndarray], float]] = {}
+
+
+def canonical(params: Dict) -> Dict:
+    """
+    Убирает параметры, не влияющие на результат (block и c — только для "adaptive", dt — для "global" и "fixed"),
+    чтобы одинаковые наборы не оценивались дважды.
+    """
+    params = dict(params)
+    if params["threshold"] == "adaptive":
+        params["dt"] = 100
+    else:
+        params["block"], params["c"] = 31, 15
+    return params
+
+
+def key(params: Dict) -> Tuple:
+    return tuple(params[name] for name in PREPROCESS + THRESHOLD)
+
+
+def _init(frames: List[np.ndarray]) -> None:
+    global _frames
+    _frames = frames
+
+
+def _camera(params: Dict) -> Camera:
+    """
+    Camera без камеры с параметрами обработки (детектор тот же, что на роботе).
+    """
+    camera = Camera(_FrameSource(_frames[0]), save_video=False, headless=True)
+    camera.apply_config(params)
+    return camera
+
+
+def _preprocess(params: Dict) -> Tuple[List[np.ndarray], float]:
+    """
+    Размытые рабочие области всех кадров (из кэша процесса) и время размытия на кадр, ms.
+    """
+    group = tuple(params[name] for name in PREPROCESS)
+    if group not in _blurred:
+        if len(_blurred) >= 4:
+            _blurred.pop(next(iter(_blurred)))  # Группы приходят подряд: старые больше не понадобятся
+        camera = _camera(params)
+        started = time.perf_counter()
+        blurred = [camera.preprocess(camera.crop(frame)) for frame in _frames]
+        _blurred[group] = blurred, (time.perf_counter() - started) / len(_frames) * 1000
+    return _blurred[group]
+
+
+def evaluate(variants: List[Dict], max_fill: float = 0.5) -> List[Dict]:
+    """
+    Оценивает наборы параметров с одинаковой рабочей областью и размытием (в процессе пула).
+
+    :param variants: Наборы параметров (PREPROCESS у всех одинаковые).
+    :param max_fill: Доля белых пикселей маски, выше которой найденный центр считается ложным
+                     (например, вся рабочая область ниже порога).
+    :return: Метрики каждого набора: доля кадров с линией, мерцание, дрожание центра, заполнение маски, время.
+    """
+    blurred, blur_ms = _preprocess(variants[0])
+    results = []
+    for params in variants:
+        camera = _camera(params)
+        camera.threshold_tracker = ThresholdTracker(camera.work_height * camera.bands, camera.dt)
+        xs = np.full(len(blurred), np.nan)
+        fill = np.zeros(len(blurred))
+        started = time.perf_counter()
+        for i, gray in enumerate(blurred):
+            mask = camera.binarize(gray)
+            center = camera.locate(mask)
+            fill[i] = cv2.countNonZero(mask) / mask.size
+            if center is not None and fill[i] < max_fill:
+                xs[i] = center[0] + (camera.width - camera.work_width) // 2  # В координатах кадра
+        cost = (time.perf_counter() - started) / len(blurred) * 1000 + blur_ms
+
+        detected = ~np.isnan(xs)
+        # Дрожание: вторая разность центра по соседним кадрам (плавное движение линии почти не штрафуется)
+        d2 = xs[2:] - 2 * xs[1:-1] + xs[:-2]
+        d2 = d2[~np.isnan(d2)]
+        results.append({
+            **params,
+            "detection": float(detected.mean()),
+            "flicker": float(np.count_nonzero(detected[1:] != detected[:-1]) / max(1, len(xs) - 1)),
+            "jitter": float(np.sqrt(np.mean(d2 ** 2))) if d2.size else float(camera.width),
+            "fill": float(fill.mean()),
+            "cost_ms": cost,
+        })
+    return results
+
+
+def score(result: Dict, width: int, weights: Dict[str, float] = WEIGHTS) -> float:
+    """
+    Итоговая оценка набора (больше — лучше).
+
+    :param result: Метрики evaluate.
+    :param width: Ширина кадра (дрожание нормируется на неё).
+    :param weights: Веса штрафов.
+    """
+    return (result["detection"] - weights["flicker"] * result["flicker"]
+            - weights["jitter"] * result["jitter"] / width - weights["cost"] * result["cost_ms"])
+
+
+def grid_candidates(space: Dict[str, list]) -> List[Dict]:
+    """
+    Все сочетания значений space (без повторов после canonical).
+    """
+    names = list(space)
+    unique = {}
+    for values in itertools.product(*space.values()):
+        params = canonical(dict(zip(names, values)))
+        unique.setdefault(key(params), params)
+    return list(unique.values())
+
+
+def random_candidates(space: Dict[str, list], count: int, rng: random.Random) -> List[Dict]:
+    """
+    Случайные наборы параметров из space.
+    """
+    return [canonical({name: rng.choice(values) for name, values in space.items()}) for _ in range(count)]
+
+
+def neighbours(params: Dict, space: Dict[str, list]) -> List[Dict]:
+    """
+    Наборы, отличающиеся от params одним параметром (соседнее значение в space).
+    """
+    result = []
+    for name, values in space.items():
+        if params[name] not in values:
+            continue
+        i = values.index(params[name])
+        for j in (i - 1, i + 1) if name != "threshold" else range(len(values)):
+            if 0 <= j < len(values) and j != i:
+                result.append(canonical({**params, name: values[j]}))
+    return result
+
+
+def search(frames: List[np.ndarray], space: Dict[str, list], mode: str = "random", samples: int = 200,
+           refine: int = 2, top: int = 5, workers: int = 0, weights: Dict[str, float] = WEIGHTS,
+           seed: int = 0) -> List[Dict]:
+    """
+    Подбирает параметры обработки кадра по записи.
+
+    :param frames: Кадры записи в оттенках серого.
+    :param space: Значения параметров (см. SPACE).
+    :param mode: "grid" — все сочетания, "random" — samples случайных наборов.
+    :param samples: Число случайных наборов.
+    :param refine: Число раундов уточнения: соседи top лучших наборов по каждому параметру.
+    :param top: Число наборов, вокруг которых ищутся соседи.
+    :param workers: Число процессов (0 — по числу ядер).
+    :param weights: Веса штрафов оценки.
+    :param seed: Начальное значение генератора.
+    :return: Результаты с оценкой, отсортированные от лучшего.
+    """
+    width = frames[0].shape[1]
+    results: Dict[Tuple, Dict] = {}  # Результаты по полному набору параметров: не пересчитываются
+    rng = random.Random(seed)
+
+    def run(candidates):
+        # Наборы с одинаковой рабочей областью и размытием оцениваются одной задачей (общий кэш размытия)
+        groups: Dict[Tuple, List[Dict]] = {}
+        for params in candidates:
+            if key(params) not in results:
+                groups.setdefault(tuple(params[name] for name in PREPROCESS), {})[key(params)] = params
+        for evaluated in executor.map(evaluate, [list(group.values()) for group in groups.values()]):
+            for result in evaluated:
+                result["score"] = score(result, width, weights)
+                results[key(result)] = result
+        return sum(len(group) for group in groups.values())
+
+    with ProcessPoolExecutor(workers or os.cpu_count(), initializer=_init, initargs=(frames,)) as executor:
+        started = time.perf_counter()
+        count = run(grid_candidates(space) if mode == "grid" else random_candidates(space, samples, rng))
+        print(f"[+] Оценено наборов: {count} за {time.perf_counter() - started:.1f} с")
+        for round_number in range(refine):
+            best = sorted(results.values(), key=lambda result: -result["score"])[:top]
+            started = time.perf_counter()
+            count = run([params for result in best for params in neighbours(result, space)])
+            print(f"[+] Уточнение {round_number + 1}: {count} новых наборов за {time.perf_counter() - started:.1f} с")
+            if not count:
+                break
+    return sorted(results.values(), key=lambda result: -result["score"])
+
+
+def tune_gains(camera: Dict, max_power: List[float], k: List[float], workers: int = 0) -> List[Dict]:
+    """
+    Подбирает max_power и k в модели (simulate.py) с найденными параметрами обработки кадра.
+    """
+    from simulate import sweep as simulate_sweep
+
+    roi = {name: camera[name] for name in ("work_pos", "work_width", "work_height")}
+    return simulate_sweep({"max_power": max_power, "k": k}, workers, camera=camera, **roi)
+
+
+def parse_space(overrides: List[str]) -> Dict[str, list]:
+    """
+    Заменяет значения SPACE: "blur=9,13" или "threshold=adaptive".
+    """
+    space = dict(SPACE)
+    for item in overrides:
+        name, values = item.split("=", 1)
+        if name not in space:
+            raise ValueError(f"Неизвестный параметр {name}: {', '.join(space)}")
+        kind = type(SPACE[name][0])
+        space[name] = [kind(value) for value in values.split(",")]
+    return space
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Подбор параметров обработки кадра по записи")
+    parser.add_argument("source", help="видеофайл (например output/output.mp4) или папка с изображениями")
+    parser.add_argument("-o", "--output", default="camera.json",
+                        help="JSON с лучшими параметрами и рейтингом (Camera(config=...), main.py --camera=...)")
+    parser.add_argument("--mode", choices=["grid", "random"], default="random", help="перебор всех сочетаний или случайных")
+    parser.add_argument("--samples", type=int, default=200, help="число случайных наборов")
+    parser.add_argument("--refine", type=int, default=2, help="раундов уточнения вокруг лучших наборов")
+    parser.add_argument("--top", type=int, default=5, help="число лучших наборов для уточнения")
+    parser.add_argument("--set", nargs="*", default=[], metavar="NAME=V1,V2",
+                        help=f"значения параметров вместо стандартных ({', '.join(SPACE)})")
+    parser.add_argument("--limit", type=int, default=300, help="число кадров записи")
+    parser.add_argument("--workers", type=int, default=0, help="число процессов (0 — по числу ядер)")
+    parser.add_argument("--rank", type=int, default=20, help="число наборов в рейтинге файла")
+    parser.add_argument("--seed", type=int, default=0)
+    for name, value in WEIGHTS.items():
+        parser.add_argument(f"--{name}-weight", type=float, default=value, help=f"вес штрафа {name}")
+    parser.add_argument("--gains", action="store_true", help="также подобрать max_power и k в модели (simulate.py)")
+    parser.add_argument("--max-power", type=float, nargs="+", default=[0.2, 0.3, 0.4, 0.5])
+    parser.add_argument("--k", type=float, nargs="+", default=[1.0, 1.5, 2.0, 2.5])
+    args = parser.parse_args()
+
+    frames = load_frames(args.source, args.limit)
+    if not frames:
+        print(f"[!] Нет кадров в {args.source}")
+        return
+    # Перевод в оттенки серого один раз для всех наборов (рабочая область — срез кадра)
+    frames = [frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) for frame in frames]
+    weights = {name: getattr(args, f"{name}_weight") for name in WEIGHTS}
+    print(f"[+] Кадров: {len(frames)} ({frames[0].shape[1]}x{frames[0].shape[0]})")
+
+    results = search(frames, parse_space(args.set), args.mode, args.samples, args.refine, args.top,
+                     args.workers, weights, args.seed)
+    for result in results[:10]:
+        print(f"    {result['score']:6.3f}  ROI {result['work_pos']:.2f}/{result['work_width']:.2f}/"
+              f"{result['work_height']}  blur {result['blur']}  {result['threshold']} "
+              f"(block {result['block']}, C {result['c']}, dt {result['dt']})  "
+              f"линия {result['detection'] * 100:5.1f}%  мерцание {result['flicker'] * 100:4.1f}%  "
+              f"дрожание {result['jitter']:5.1f} px  {result['cost_ms']:.3f} ms")
+
+    best = results[0]
+    output = {
+        "source": args.source,
+        "frames": len(frames),
+        "weights": weights,
+        "camera": {name: best[name] for name in PREPROCESS + THRESHOLD},
+        "ranking": results[:args.rank],
+    }
+    if args.gains:
+        gains = tune_gains(output["camera"], args.max_power, args.k, args.workers)
+        if gains[0]["completed"]:
+            output["chassis"] = {"max_power": gains[0]["max_power"], "k": gains[0]["k"]}
+            print(f"[+] Модель: max_power {gains[0]['max_power']}, k {gains[0]['k']}, "
+                  f"круг {gains[0]['lap_time']:.2f} с, CTE rms {gains[0]['cte_rms'] * 1000:.1f} мм")
+        else:
+            print("[!] В модели ни один набор max_power и k не прошёл круг")
+        output["gains"] = [{name: result[name] for name in ("max_power", "k", "completed", "lap_time", "cte_rms")}
+                           for result in gains[:args.rank]]
+
+    with open(args.output, "w") as f:
+        json.dump(output, f, indent=4)
+    print(f"[+] Параметры: {args.output}")
+
+
+if __name__ == "__main__":
+    main()